@@ -0,0 +1,54 @@
+"""Serve the assessment API with an event-loop lag probe for the benchmarks
+
+    python -m benchmarks.app_server --port 8101
+"""
+import argparse
+import asyncio
+import time
+import uvicorn
+from main import app
+
+PROBE_INTERVAL = 0.01
+
+_lag_samples = []
+
+
+async def probe_loop_lag():
+    # A sleep that wakes late means something else held the event loop for that long
+    while True:
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        _lag_samples.append(max(0.0, time.perf_counter() - expected))
+
+
+@app.on_event("startup")
+async def start_probe():
+    app.state.lag_probe = asyncio.create_task(probe_loop_lag())
+
+
+@app.get("/__benchmark__/loop-lag", include_in_schema=False)
+async def loop_lag(reset: bool = False):
+    """Event-loop lag percentiles in milliseconds since the last reset"""
+    samples = sorted(_lag_samples)
+    if reset:
+        _lag_samples.clear()
+    if not samples:
+        return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "samples": len(samples),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with an event-loop lag probe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Local stand-in for the OpenAI chat completions API used by the benchmarks
+
+Latency is drawn from a seeded log-normal distribution, completions are "generated" at a fixed token
+rate and a configurable share of requests is rejected with 429 or 500, so the app can be load tested
+without a key and with reproducible upstream behaviour.
+
+    python -m benchmarks.fake_openai --port 8100 --latency-ms 300 --tokens-per-second 400 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Every score and text field any evaluator's output model asks for
+SCORE_FIELDS = [
+    "clarity", "specificity", "completeness", "relevance",
+    "structure", "professionalism", "ai_utilization",
+    "organization", "prioritization", "ai_integration", "efficiency",
+    "data_understanding", "analytical_approach", "ai_tool_usage", "visualization_quality", "insights_generation",
+    "content_structure", "visual_design", "audience_engagement", "storytelling",
+    "process_analysis", "automation_strategy", "ai_tool_selection", "efficiency_improvement", "implementation_feasibility"
+]
+
+ANSWER_TEXT = (
+    "Average salary by department: IT 63,333; Finance 55,000; HR 61,500; Marketing 40,000. "
+    "Managers: E010 manages IT, E011 manages Finance, E004 leads HR and E012 leads Marketing."
+)
+
+
+class FakeCompletions:
+    """Seeded upstream behaviour shared by every request the fake server handles"""
+
+    def __init__(self, latency_ms: float, latency_sigma: float, tokens_per_second: float,
+                 error_rate: float, retry_after_ms: int, seed: int):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.retry_after_ms = retry_after_ms
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def first_token_delay(self) -> float:
+        return self.random.lognormvariate(math.log(self.latency_ms / 1000), self.latency_sigma)
+
+    def content(self, body: dict) -> str:
+        # Evaluations ask for JSON; the prompt evaluator's answer generation asks for plain text
+        if "response_format" not in body:
+            return ANSWER_TEXT
+        result = {field: self.random.randint(35, 95) for field in SCORE_FIELDS}
+        result.update(
+            feedback="The approach names concrete AI tools and explains the steps, but could quantify the time saved.",
+            suggestions=["Name the exact tool features you would use", "Add a review step", "Estimate the time saved"],
+            grade_justification="Solid structure with room to be more specific.",
+            efficiency_rating="Good",
+            insight_quality="Good",
+            engagement_level="Good",
+            efficiency_gain="Moderate",
+            implementation_timeline="2-4 weeks",
+            recommended_tools=["Microsoft Copilot", "ChatGPT", "Power Automate"]
+        )
+        return json.dumps(result)
+
+    def usage(self, body: dict, content: str) -> dict:
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", [])) // 4
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0}
+        }
+
+
+def create_app(completions: FakeCompletions) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "requests": completions.requests, "errors": completions.errors}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completions.requests += 1
+        roll = completions.random.random()
+        if roll < completions.error_rate:
+            completions.errors += 1
+            # Mostly rate limits, occasionally a server error, like a saturated upstream
+            if roll < completions.error_rate * 0.8:
+                return JSONResponse(
+                    status_code=429,
+                    headers={"retry-after-ms": str(completions.retry_after_ms)},
+                    content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+                )
+            return JSONResponse(status_code=500, content={"error": {"message": "Upstream error", "type": "server_error"}})
+
+        content = completions.content(body)
+        usage = completions.usage(body, content)
+        delay = completions.first_token_delay()
+        generation_time = usage["completion_tokens"] / completions.tokens_per_second
+        created = int(time.time())
+
+        if body.get("stream"):
+            async def frames():
+                await asyncio.sleep(delay)
+                pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+                for piece in pieces:
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(generation_time / len(pieces))
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": body["model"],
+                        "choices": [], "usage": usage
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(frames(), media_type="text/event-stream")
+
+        await asyncio.sleep(delay + generation_time)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": usage
+        }
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=300, help="median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=400, help="completion generation rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests rejected with 429/500")
+    parser.add_argument("--retry-after-ms", type=int, default=250, help="Retry-After sent with 429s")
+    parser.add_argument("--seed", type=int, default=1234)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    completions = FakeCompletions(
+        args.latency_ms, args.latency_sigma, args.tokens_per_second, args.error_rate, args.retry_after_ms, args.seed
+    )
+    uvicorn.run(create_app(completions), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
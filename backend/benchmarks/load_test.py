@@ -0,0 +1,282 @@
+"""Load and latency benchmark for the assessment API against a local fake OpenAI server
+
+Starts the fake upstream and the app in child processes, replays a seeded mix of evaluate and
+scenario requests at increasing concurrency and reports throughput, latency percentiles and
+event-loop lag for each level. Save a run with --output and compare later runs with --baseline.
+
+    cd backend
+    python -m benchmarks.load_test --concurrency 1,8,32,64 --output bench.json
+    python -m benchmarks.load_test --baseline bench.json
+
+With --cassette the app records every completion it makes, or replays a recording without the fake
+upstream, an API key or network access, so CI can compare runs against the same upstream answers:
+
+    python -m benchmarks.load_test --cassette ci.sqlite3 --cassette-mode record --output bench.json
+    python -m benchmarks.load_test --cassette ci.sqlite3 --cassette-mode replay --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import httpx
+from dotenv import dotenv_values, find_dotenv
+from benchmarks import fake_openai
+from benchmarks.payloads import CATALOGS, build_schedule
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOOP_LAG_NOISE_MS = 10.0
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2)
+    }
+
+
+def start_process(module: str, args: List[str], env: Optional[dict] = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", module, *args], cwd=BACKEND_DIR, env=env)
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+async def fetch_scenario_ids(client: httpx.AsyncClient) -> Dict[str, List[str]]:
+    scenario_ids = {}
+    for kind, (path, key, _) in CATALOGS.items():
+        response = await client.get(path)
+        response.raise_for_status()
+        scenario_ids[kind] = sorted(response.json()[key])
+    return scenario_ids
+
+
+def route_name(method: str, path: str) -> str:
+    # Group per-scenario GETs under one route name
+    if method == "GET" and path.count("/") > 2:
+        path = path.rsplit("/", 1)[0] + "/{id}"
+    return f"{method} {path}"
+
+
+async def run_level(client: httpx.AsyncClient, schedule: List[tuple], concurrency: int) -> dict:
+    """Replay the schedule with `concurrency` closed-loop workers"""
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    position = iter(schedule)
+
+    async def worker():
+        for method, path, body in position:
+            route = route_name(method, path)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+            latencies.setdefault(route, []).append(elapsed)
+
+    await client.get("/__benchmark__/loop-lag", params={"reset": True})
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    loop_lag = (await client.get("/__benchmark__/loop-lag", params={"reset": True})).json()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "concurrency": concurrency,
+        "requests": len(all_latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(all_latencies) / duration, 2) if duration else 0.0,
+        "latency": latency_summary(all_latencies),
+        "routes": {route: latency_summary(values) for route, values in sorted(latencies.items())},
+        "loop_lag": loop_lag
+    }
+
+
+def print_level(result: dict):
+    latency, lag = result["latency"], result["loop_lag"]
+    print(
+        f"c={result['concurrency']:<4} {result['requests']:>6} req  {result['throughput_rps']:>8.1f} req/s  "
+        f"p50 {latency['p50_ms']:>8.1f}  p95 {latency['p95_ms']:>8.1f}  p99 {latency['p99_ms']:>8.1f} ms  "
+        f"loop lag p99 {lag['p99_ms']:>6.1f} max {lag['max_ms']:>6.1f} ms  errors {result['errors']}"
+    )
+
+
+def compare_to_baseline(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` in p95 latency, throughput or loop lag per concurrency level"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in results:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        # (name, before, after, lower is better, smallest absolute change worth reporting)
+        checks = [
+            ("p95 latency", old["latency"]["p95_ms"], level["latency"]["p95_ms"], True, 0),
+            ("p99 latency", old["latency"]["p99_ms"], level["latency"]["p99_ms"], True, 0),
+            ("throughput", old["throughput_rps"], level["throughput_rps"], False, 0),
+            # Lag of a few milliseconds is scheduler noise, not a regression
+            ("loop lag p99", old["loop_lag"]["p99_ms"], level["loop_lag"]["p99_ms"], True, LOOP_LAG_NOISE_MS)
+        ]
+        for name, before, after, lower_is_better, noise in checks:
+            if not before or abs(after - before) < noise:
+                continue
+            change = (after - before) / before
+            if (change > tolerance) if lower_is_better else (change < -tolerance):
+                regressions.append(f"c={level['concurrency']}: {name} {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+async def benchmark(args) -> dict:
+    fake_args = [
+        "--port", str(args.fake_port), "--latency-ms", str(args.latency_ms), "--latency-sigma", str(args.latency_sigma),
+        "--tokens-per-second", str(args.tokens_per_second), "--error-rate", str(args.error_rate),
+        "--retry-after-ms", str(args.retry_after_ms), "--seed", str(args.seed)
+    ]
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="benchmark",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+        # Measure the evaluation path itself unless the cache is what's being benchmarked
+        EVALUATION_CACHE_SIZE=os.environ.get("EVALUATION_CACHE_SIZE", "1024" if args.cache else "0"),
+        LLM_RPM_LIMIT=os.environ.get("LLM_RPM_LIMIT", "0"),
+        LLM_TPM_LIMIT=os.environ.get("LLM_TPM_LIMIT", "0"),
+        # Synthetic grades must not show up in cohort reports
+        RESULTS_DB=""
+    )
+    # Stores configured for a shared-state layout are kept, but in scratch files rather than the real ones,
+    # so benchmark jobs, cache entries and rate budget never mix with production data
+    scratch = tempfile.TemporaryDirectory(prefix="load_test_")
+    configured = {**dotenv_values(find_dotenv()), **os.environ}
+    for name in ("SHARED_STATE_DB", "JOB_STORE_DB", "LLM_BUDGET_DB", "EVALUATION_CACHE_DB"):
+        env[name] = os.path.join(scratch.name, f"{name.lower()}.sqlite3") if configured.get(name) else ""
+    replaying = bool(args.cassette) and args.cassette_mode == "replay"
+    if args.cassette:
+        env.update(LLM_CASSETTE_MODE=args.cassette_mode, LLM_CASSETTE_PATH=os.path.abspath(args.cassette),
+                   LLM_CASSETTE_LATENCY_SCALE=str(args.latency_scale))
+    if replaying:
+        # Any completion missing from the cassette fails instead of reaching a provider
+        env.update(OPENAI_API_KEY="", OPENAI_BASE_URL="http://127.0.0.1:9/v1")
+    processes = [] if replaying else [start_process("benchmarks.fake_openai", fake_args)]
+    app = start_process("benchmarks.app_server", ["--port", str(args.app_port)], env=env)
+    processes.append(app)
+    try:
+        if not replaying:
+            await wait_until_ready(f"http://127.0.0.1:{args.fake_port}/health", processes[0])
+        await wait_until_ready(f"http://127.0.0.1:{args.app_port}/health", app)
+
+        limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", limits=limits,
+                                     timeout=args.request_timeout) as client:
+            scenario_ids = await fetch_scenario_ids(client)
+            # Warm the connection pools and lazy paths so the first level is not penalised
+            await run_level(client, build_schedule(scenario_ids, 12, args.seed + 1, args.get_ratio), 4)
+            levels = []
+            for index, concurrency in enumerate(args.concurrency):
+                count = max(args.min_requests, concurrency * args.requests_per_worker)
+                schedule = build_schedule(scenario_ids, count, args.seed + 100 + index, args.get_ratio)
+                result = await run_level(client, schedule, concurrency)
+                print_level(result)
+                levels.append(result)
+            cassette = (await client.get("/assessment/stats")).json()["cassette"]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        scratch.cleanup()
+    if args.cassette:
+        print(f"Cassette {args.cassette_mode}: {cassette['recorded']} recorded, {cassette['replayed']} replayed, "
+              f"{cassette['misses']} missing")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "seed": args.seed, "latency_ms": args.latency_ms, "latency_sigma": args.latency_sigma,
+            "tokens_per_second": args.tokens_per_second, "error_rate": args.error_rate,
+            "get_ratio": args.get_ratio, "cache": args.cache
+        },
+        "levels": levels,
+        "cassette": cassette
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")], default=[1, 8, 32, 64],
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests-per-worker", type=int, default=10)
+    parser.add_argument("--min-requests", type=int, default=50)
+    parser.add_argument("--get-ratio", type=float, default=0.2, help="share of scenario GET requests in the mix")
+    parser.add_argument("--cache", action="store_true", help="keep the evaluation cache enabled")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--fake-port", type=int, default=8100)
+    parser.add_argument("--app-port", type=int, default=8101)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression vs the baseline")
+    parser.add_argument("--cassette", help="SQLite file of recorded completions")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="replayed latency relative to the recording (0 replays instantly)")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.baseline:
+        # Replay the baseline's upstream settings so the runs are comparable
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, value in baseline["settings"].items():
+            setattr(args, name, value)
+    else:
+        baseline = None
+
+    results = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results["levels"], baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
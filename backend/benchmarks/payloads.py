@@ -0,0 +1,90 @@
+import random
+from typing import Dict, List, Tuple
+
+# Fragments candidates commonly combine; mixing them gives unique but realistic submissions
+OPENERS = [
+    "I would start by", "My first step would be", "To handle this I would begin by", "First, I'd focus on",
+    "The approach I'd take is", "I plan to begin by"
+]
+ACTIONS = [
+    "using Microsoft Copilot to draft a first version from the notes",
+    "asking ChatGPT to summarise the key points and list open questions",
+    "building a Power Automate flow that collects the inputs every Monday",
+    "letting Copilot in Excel group the data by department and flag outliers",
+    "using Canva Magic Design to turn the outline into consistent slides",
+    "prompting the AI to rewrite the draft for a senior audience",
+    "creating a Planner board where AI suggests priorities from deadlines",
+    "having Power BI Copilot build a dashboard of the main trends",
+    "reviewing the AI output myself and correcting any wrong figures",
+    "setting up a template so the same steps run automatically next time"
+]
+OUTCOMES = [
+    "which should cut the time spent from hours to minutes.",
+    "so the team gets a consistent result every week.",
+    "and then I would check the tone and facts before sending it.",
+    "which keeps a human review step before anything goes out.",
+    "so managers can see progress without asking for updates."
+]
+
+PROMPT_ENGINEERING_PROMPTS = [
+    "Calculate the average salary per department from the employee table and list the manager of each department",
+    "Using the employee data, group employees by department, compute the mean salary and show who manages each team",
+    "For each department in the table, give the average salary rounded to whole numbers and the Manager_ID responsible",
+    "Act as a data analyst: summarise salary by department and identify each department's manager from Manager_ID"
+]
+
+# Scenario ids per catalog route, and the evaluate route and payload fields that use them
+CATALOGS = {
+    "writing": ("/assessment/writing-tasks", "tasks", "/assessment/writing-task/{}"),
+    "task_management": ("/assessment/task-management-scenarios", "scenarios", "/assessment/task-management-scenario/{}"),
+    "data_analysis": ("/assessment/data-analysis-scenarios", "scenarios", "/assessment/data-analysis-scenario/{}"),
+    "presentation": ("/assessment/presentation-scenarios", "scenarios", "/assessment/presentation-scenario/{}"),
+    "productivity": ("/assessment/productivity-scenarios", "scenarios", "/assessment/productivity-scenario/{}")
+}
+
+
+def submission_text(rng: random.Random) -> str:
+    steps = rng.sample(ACTIONS, rng.randint(2, 4))
+    return f"{rng.choice(OPENERS)} {steps[0]}, then " + ", then ".join(steps[1:]) + f", {rng.choice(OUTCOMES)}"
+
+
+def evaluate_payload(kind: str, scenario_id: str, rng: random.Random) -> Tuple[str, dict]:
+    """Build the (path, JSON body) of one evaluate request"""
+    if kind == "prompt":
+        prompt = f"{rng.choice(PROMPT_ENGINEERING_PROMPTS)}. {rng.choice(OUTCOMES).capitalize()}"
+        return "/assessment/evaluate-prompt", {"prompt": prompt, "context_data": ""}
+    text = submission_text(rng)
+    if kind == "writing":
+        return "/assessment/evaluate-writing", {"task_type": scenario_id, "content": text, "requirements": []}
+    if kind == "task_management":
+        return "/assessment/evaluate-task-management", {"scenario_type": scenario_id, "user_response": text, "scenario_data": ""}
+    if kind == "data_analysis":
+        return "/assessment/evaluate-data-analysis", {
+            "analysis_type": scenario_id, "user_approach": text, "dataset_context": "", "visualization_requirements": []
+        }
+    if kind == "presentation":
+        return "/assessment/evaluate-presentation", {
+            "presentation_type": scenario_id, "content_approach": text, "audience_context": "", "presentation_requirements": []
+        }
+    return "/assessment/evaluate-productivity", {
+        "automation_type": scenario_id, "workflow_description": text, "current_process": "", "automation_goals": []
+    }
+
+
+def build_schedule(scenario_ids: Dict[str, List[str]], count: int, seed: int,
+                   get_ratio: float = 0.2) -> List[Tuple[str, str, dict]]:
+    """A seeded, repeatable sequence of (method, path, body) requests across every route"""
+    rng = random.Random(seed)
+    kinds = ["prompt"] + list(CATALOGS)
+    schedule = []
+    for _ in range(count):
+        kind = rng.choice(kinds)
+        if kind != "prompt" and rng.random() < get_ratio:
+            list_path, _, item_path = CATALOGS[kind]
+            path = item_path.format(rng.choice(scenario_ids[kind])) if rng.random() < 0.5 else list_path
+            schedule.append(("GET", path, None))
+            continue
+        scenario_id = rng.choice(scenario_ids[kind]) if kind != "prompt" else "default"
+        path, body = evaluate_payload(kind, scenario_id, rng)
+        schedule.append(("POST", path, body))
+    return schedule
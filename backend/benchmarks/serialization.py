@@ -0,0 +1,165 @@
+"""Serialization and compression micro-benchmark for the assessment API's responses
+
+For a representative payload of each route, times FastAPI's default serialization against FastJSONResponse
+and reports the bytes on the wire uncompressed, gzipped and brotli-compressed at the levels the
+compression middleware uses, along with the time each compression takes. Runs in-process without a key.
+
+    cd backend
+    python -m benchmarks.serialization --repeat 200
+"""
+import argparse
+import json
+import random
+import time
+import typing
+from typing import Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from models.assessment import (
+    AssessmentType,
+    EvaluationResponse,
+    WritingEvaluationResponse,
+    TaskManagementEvaluationResponse,
+    DataAnalysisEvaluationResponse,
+    PresentationEvaluationResponse,
+    ProductivityEvaluationResponse,
+    FullAssessmentResponse
+)
+from services.compression import brotli, compress
+from services.evaluator_registry import scenario_catalog
+from services.responses import FastJSONResponse, orjson
+from services.results_store import COLUMNS
+
+FEEDBACK = (
+    "Your approach names concrete AI tools and explains each step in a sensible order. It would be stronger "
+    "if you quantified the time saved, said how you would check the AI's output for errors and described "
+    "who reviews the final version before it reaches the client."
+)
+SUGGESTIONS = [
+    "Name the exact Copilot features you would use for each step",
+    "Add a human review step before anything is sent",
+    "Estimate the time saved compared with doing it by hand"
+]
+
+# Evaluate routes and the response model FastAPI serializes for them
+MODEL_ROUTES = {
+    "/assessment/evaluate-prompt": EvaluationResponse,
+    "/assessment/evaluate-writing": WritingEvaluationResponse,
+    "/assessment/evaluate-task-management": TaskManagementEvaluationResponse,
+    "/assessment/evaluate-data-analysis": DataAnalysisEvaluationResponse,
+    "/assessment/evaluate-presentation": PresentationEvaluationResponse,
+    "/assessment/evaluate-productivity": ProductivityEvaluationResponse,
+    "/assessment/evaluate-all": FullAssessmentResponse,
+}
+
+
+def sample_value(annotation, rng: random.Random):
+    """A realistic value for a response model field, filled in from its type"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return sample_value(next(arg for arg in typing.get_args(annotation) if arg is not type(None)), rng)
+    if origin in (list, List):
+        return list(SUGGESTIONS)
+    if origin in (dict, Dict):
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation.model_validate({
+            name: sample_value(field.annotation, rng) for name, field in annotation.model_fields.items()
+        })
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return rng.randint(55, 95)
+    return FEEDBACK
+
+
+def results_page(rows: int, rng: random.Random) -> dict:
+    """A /assessment/results page as the results store returns it"""
+    results = []
+    for index in range(rows):
+        row = dict.fromkeys(COLUMNS)
+        row.update(
+            id=index, created_at=1760000000 + index * 7.5, candidate_id=f"candidate-{rng.randint(1, 400)}",
+            cohort_id="cohort-2026-10", assessment_type=rng.choice(list(AssessmentType)).value,
+            scenario_id="team_workflow", score=rng.randint(35, 95), grade=rng.choice("ABCDF"),
+            criteria={name: rng.randint(35, 95) for name in ("organization", "prioritization", "ai_integration")},
+            latency_ms=rng.uniform(800, 4000), model="gpt-3.5-turbo", prompt_tokens=rng.randint(900, 2000),
+            completion_tokens=rng.randint(150, 400), trace_id=f"{rng.getrandbits(64):016x}"
+        )
+        results.append(row)
+    return {"results": results, "limit": rows, "offset": 0}
+
+
+def timed(function: Callable, repeat: int) -> float:
+    """Median seconds per call"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)[len(samples) // 2]
+
+
+def measure(route: str, default: Callable[[], bytes], fast: Callable[[], bytes], repeat: int) -> dict:
+    body = default()
+    result = {
+        "route": route,
+        "default_us": round(timed(default, repeat) * 1e6, 1),
+        "fast_us": round(timed(fast, repeat) * 1e6, 1) if fast else None,
+        "bytes": len(body)
+    }
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        result[f"{encoding}_bytes"] = len(compress(body, encoding))
+        result[f"{encoding}_us"] = round(timed(lambda: compress(body, encoding), repeat) * 1e6, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--results-rows", type=int, default=100, help="rows in the sample results page")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    rows = []
+    for route, model in MODEL_ROUTES.items():
+        # FastAPI dumps response models straight to JSON bytes; FastJSONResponse would go through a dict
+        adapter = TypeAdapter(model)
+        response = sample_value(model, rng)
+        rows.append(measure(
+            route, lambda: adapter.dump_json(response),
+            lambda: FastJSONResponse(response.model_dump(mode="json")).body, args.repeat
+        ))
+
+    payloads = {
+        "/assessment/results": results_page(args.results_rows, rng),
+        "/assessment/catalog (rendered per request)": json.loads(scenario_catalog.catalog().body)
+    }
+    for route, payload in payloads.items():
+        # Dict routes go through jsonable_encoder by default; with FAST_JSON_RESPONSES they skip it
+        rows.append(measure(
+            route, lambda: JSONResponse(jsonable_encoder(payload)).body,
+            lambda: FastJSONResponse(payload).body, args.repeat
+        ))
+    # Catalog bytes are built once at startup, so serializing them costs nothing per request
+    catalog = scenario_catalog.catalog()
+    rows.append(measure("/assessment/catalog", lambda: catalog.body, None, args.repeat))
+
+    print(f"JSON: orjson {'installed' if orjson is not None else 'not installed, compact stdlib json'}; "
+          f"brotli {'installed' if brotli is not None else 'not installed'}")
+    print(f"{'route':<46} {'default':>9} {'fast':>9} {'bytes':>8} {'gzip':>8} {'gzip us':>8} {'br':>8} {'br us':>8}")
+    for row in rows:
+        fast = f"{row['fast_us']:>7.1f}us" if row["fast_us"] is not None else f"{'-':>9}"
+        print(f"{row['route']:<46} {row['default_us']:>7.1f}us {fast} {row['bytes']:>8} "
+              f"{row['gzip_bytes']:>8} {row['gzip_us']:>8.1f} {row.get('br_bytes', '-'):>8} {row.get('br_us', '-'):>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "routes": rows}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
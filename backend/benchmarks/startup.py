@@ -0,0 +1,150 @@
+"""Import-time and startup-time benchmark for the assessment API
+
+Measures, over several fresh processes, how long `import main` takes, how long a uvicorn replica takes to
+answer /health, and how long the background warm-up takes to build every evaluator. Exits non-zero when
+the median time to ready exceeds --budget-ms, so it can guard cold starts in CI.
+
+    cd backend
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --without-api-key   # the app must still start
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def child_env(with_api_key: bool) -> dict:
+    env = dict(os.environ)
+    if with_api_key:
+        env.setdefault("OPENAI_API_KEY", "benchmark")
+    else:
+        # An empty value also stops load_dotenv from filling it in from .env
+        env["OPENAI_API_KEY"] = ""
+    return env
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, count: int) -> List[tuple]:
+    """(cumulative ms, module) of the slowest imports under `import main`, from python -X importtime"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def wait_for(client: httpx.Client, url: str, process: subprocess.Popen, timeout: float,
+             check=lambda response: True) -> Optional[float]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            response = client.get(url)
+            if response.status_code == 200 and check(response):
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def measure_startup(env: dict, port: int, timeout: float) -> dict:
+    """Seconds from spawning a uvicorn replica until /health answers and until warm-up has finished"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            ready = wait_for(client, "/health", process, timeout)
+            if ready is None:
+                raise RuntimeError(f"server did not answer /health within {timeout}s")
+            warmed = wait_for(client, "/assessment/stats", process, timeout,
+                              lambda response: response.json()["evaluators"]["warmed_up"])
+            stats = client.get("/assessment/stats").json()["evaluators"]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {
+        "ready_s": ready - started,
+        "warmed_s": (warmed - started) if warmed is not None else None,
+        "warm_up_ms": stats["warm_up_ms"],
+        "build_ms": stats["build_ms"]
+    }
+
+
+def summary(values: List[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 1),
+        "min_ms": round(min(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--budget-ms", type=float, default=1000, help="fail if the median time to ready exceeds this")
+    parser.add_argument("--without-api-key", action="store_true", help="start with OPENAI_API_KEY unset")
+    parser.add_argument("--top-imports", type=int, default=10)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    env = child_env(not args.without_api_key)
+    imports = [measure_import(env) for _ in range(args.runs)]
+    startups = [measure_startup(env, args.port, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": args.runs,
+        "api_key": not args.without_api_key,
+        "import": summary(imports),
+        "ready": summary([run["ready_s"] for run in startups]),
+        "warmed": summary([run["warmed_s"] for run in startups if run["warmed_s"] is not None]),
+        "build_ms": startups[-1]["build_ms"],
+        "slowest_imports": slowest_imports(env, args.top_imports)
+    }
+
+    print(f"import main   median {results['import']['median_ms']:>7.1f} ms  max {results['import']['max_ms']:>7.1f} ms")
+    print(f"ready         median {results['ready']['median_ms']:>7.1f} ms  max {results['ready']['max_ms']:>7.1f} ms")
+    if results["warmed"]:
+        print(f"warmed up     median {results['warmed']['median_ms']:>7.1f} ms  max {results['warmed']['max_ms']:>7.1f} ms")
+    print("build times:  " + ", ".join(f"{name} {ms} ms" for name, ms in results["build_ms"].items()))
+    print("slowest imports (cumulative):")
+    for ms, module in results["slowest_imports"]:
+        print(f"  {ms:>8.1f} ms  {module}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if results["ready"]["median_ms"] > args.budget_ms:
+        print(f"Median time to ready exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
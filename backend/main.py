@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import functools
 import os
+import re
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -8,6 +14,17 @@ load_dotenv()
 
 # Import routes after loading environment variables
 from routes.assessment import router as assessment_router
+from services.openai_client import close_openai_client
+from services.job_queue import job_runner, JOB_WORKER_MODE
+from services.evaluator_registry import warm_up
+from services.token_usage import track_request_usage
+from services.results_store import results_store, set_result_context, reset_result_context
+from services.metrics import registry, http_requests, http_request_duration, http_requests_in_flight
+from services.tracing import configure_logging, trace, slow_traces
+from services.compression import CompressionMiddleware, COMPRESSION_ENABLED
+from services.responses import json_response
+
+configure_logging()
 
 app = FastAPI(title="AI Literacy Assessment API", version="2.0.0")
 
@@ -18,11 +35,110 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+@app.middleware("http")
+async def report_token_usage(request: Request, call_next):
+    # Report the prompt tokens each evaluation used and how many the provider served from its prefix cache
+    usage = track_request_usage()
+    response = await call_next(request)
+    if usage.calls:
+        response.headers["X-Prompt-Tokens"] = str(usage.prompt_tokens)
+        response.headers["X-Cached-Prompt-Tokens"] = str(usage.cached_prompt_tokens)
+        response.headers["X-Completion-Tokens"] = str(usage.completion_tokens)
+    return response
+
+# Candidate and cohort ids tag stored results for reporting; anything longer is not an id
+MAX_RESULT_ID_LENGTH = 128
+
+@app.middleware("http")
+async def attribute_results(request: Request, call_next):
+    candidate_id = request.headers.get("X-Candidate-Id", "")[:MAX_RESULT_ID_LENGTH]
+    cohort_id = request.headers.get("X-Cohort-Id", "")[:MAX_RESULT_ID_LENGTH]
+    token = set_result_context(candidate_id, cohort_id)
+    try:
+        return await call_next(request)
+    finally:
+        reset_result_context(token)
+
+@functools.lru_cache(maxsize=1)
+def templated_routes() -> tuple:
+    """Every route with a path template, each once, in matching order
+
+    Older FastAPI versions copy an included router's routes into app.routes; newer ones keep the router
+    as a single entry without a path, so its routes are listed from the router itself unless already seen.
+    """
+    routes, seen = [], set()
+    for route in (*app.routes, *assessment_router.routes):
+        key = (getattr(route, "path", None), frozenset(getattr(route, "methods", None) or ()))
+        if key[0] is not None and key not in seen:
+            seen.add(key)
+            routes.append(route)
+    return tuple(routes)
+
+def route_template(request: Request) -> str:
+    """The matched route's path template, so per-scenario URLs share one label"""
+    # Routes are resolved before the request is handled so in-flight gauges can be labelled. The first
+    # middleware to ask resolves it and the others reuse it from the request's state.
+    template = getattr(request.state, "route_template", None)
+    if template is None:
+        template = next((route.path for route in templated_routes()
+                         if route.matches(request.scope)[0] == Match.FULL), "unmatched")
+        request.state.route_template = template
+    return template
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    route = route_template(request)
+    http_requests_in_flight.inc(route)
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        http_requests_in_flight.dec(route)
+        http_request_duration.observe(time.perf_counter() - started, request.method, route)
+        http_requests.inc(request.method, route, status)
+
+# Trace ids supplied by callers are reused only if they look like ids, not arbitrary text
+TRACE_ID_RE = re.compile(r"^[A-Za-z0-9-]{8,64}$")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Every request gets a trace id that appears in its logs, spans and X-Trace-Id response header
+    incoming = request.headers.get("X-Trace-Id", "")
+    with trace(f"{request.method} {route_template(request)}",
+               trace_id=incoming if TRACE_ID_RE.match(incoming) else None) as root:
+        response = await call_next(request)
+        root.set(status=response.status_code)
+        response.headers["X-Trace-Id"] = root.trace_id
+        return response
+
+# Added last so it wraps everything above and compresses the final response, headers included
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(assessment_router)
 
+@app.on_event("startup")
+async def startup():
+    # Accept requests right away and build evaluators, catalogs and the OpenAI client in the background
+    app.state.warm_up = asyncio.create_task(warm_up())
+    # Evaluate submitted jobs here unless separate worker processes are running them
+    if JOB_WORKER_MODE == "inprocess":
+        job_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_runner.stop()
+    await results_store.close()
+    # Release the pooled OpenAI connections
+    await close_openai_client()
+
 @app.get("/")
 async def root():
     return {
@@ -37,4 +153,14 @@ async def health_check():
         "status": "healthy", 
         "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
         "version": "2.0.0"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, model call, parse and score metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/slow-traces")
+async def get_slow_traces():
+    """Full span trees of the most recent requests over SLOW_TRACE_THRESHOLD_MS"""
+    return json_response({"traces": list(slow_traces)})
@@ -12,13 +12,27 @@ from .assessment import (
     DataAnalysisCriteria,
     PresentationCriteria,
     ProductivityCriteria,
+    PromptEvaluationOutput,
+    WritingEvaluationOutput,
+    TaskManagementEvaluationOutput,
+    DataAnalysisEvaluationOutput,
+    PresentationEvaluationOutput,
+    ProductivityEvaluationOutput,
     EvaluationResponse,
     WritingEvaluationResponse,
     TaskManagementEvaluationResponse,
     DataAnalysisEvaluationResponse,
     PresentationEvaluationResponse,
     ProductivityEvaluationResponse,
-    AssessmentQuestion
+    AssessmentQuestion,
+    BatchEvaluationItem,
+    BatchEvaluationRequest,
+    BatchEvaluationResult,
+    FullAssessmentRequest,
+    FullAssessmentResponse,
+    JobStatus,
+    EvaluationJobRequest,
+    EvaluationJob
 )
 
 __all__ = [
@@ -35,11 +49,25 @@ __all__ = [
     "DataAnalysisCriteria",
     "PresentationCriteria",
     "ProductivityCriteria",
+    "PromptEvaluationOutput",
+    "WritingEvaluationOutput",
+    "TaskManagementEvaluationOutput",
+    "DataAnalysisEvaluationOutput",
+    "PresentationEvaluationOutput",
+    "ProductivityEvaluationOutput",
     "EvaluationResponse",
     "WritingEvaluationResponse",
     "TaskManagementEvaluationResponse",
     "DataAnalysisEvaluationResponse",
     "PresentationEvaluationResponse",
     "ProductivityEvaluationResponse",
-    "AssessmentQuestion"
+    "AssessmentQuestion",
+    "BatchEvaluationItem",
+    "BatchEvaluationRequest",
+    "BatchEvaluationResult",
+    "FullAssessmentRequest",
+    "FullAssessmentResponse",
+    "JobStatus",
+    "EvaluationJobRequest",
+    "EvaluationJob"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 class AssessmentType(str, Enum):
@@ -79,12 +79,49 @@ class ProductivityCriteria(BaseModel):
     ai_tool_selection: int
     efficiency_improvement: int
     implementation_feasibility: int
+# Shapes the evaluators ask the model to return, used for structured output and validation
+class PromptEvaluationOutput(EvaluationCriteria):
+    feedback: str
+
+class WritingEvaluationOutput(WritingCriteria):
+    feedback: str
+    suggestions: List[str]
+    grade_justification: str = ""
+
+class TaskManagementEvaluationOutput(TaskManagementCriteria):
+    feedback: str
+    suggestions: List[str]
+    efficiency_rating: str
+    grade_justification: str = ""
+
+class DataAnalysisEvaluationOutput(DataAnalysisCriteria):
+    feedback: str
+    suggestions: List[str]
+    insight_quality: str
+    recommended_tools: List[str]
+    grade_justification: str = ""
+
+class PresentationEvaluationOutput(PresentationCriteria):
+    feedback: str
+    suggestions: List[str]
+    engagement_level: str
+    recommended_tools: List[str]
+    grade_justification: str = ""
+
+class ProductivityEvaluationOutput(ProductivityCriteria):
+    feedback: str
+    suggestions: List[str]
+    efficiency_gain: str
+    recommended_tools: List[str]
+    implementation_timeline: str
+    grade_justification: str = ""
 class EvaluationResponse(BaseModel):
     isGoodPrompt: bool
     score: int
     criteria: EvaluationCriteria
     feedback: str
     answer: str
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 
 class WritingEvaluationResponse(BaseModel):
     isGoodWork: bool
@@ -93,6 +130,7 @@ class WritingEvaluationResponse(BaseModel):
     feedback: str
     suggestions: List[str]
     grade: str  # A, B, C, D, F
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 
 class TaskManagementEvaluationResponse(BaseModel):
     isGoodApproach: bool
@@ -102,6 +140,7 @@ class TaskManagementEvaluationResponse(BaseModel):
     suggestions: List[str]
     grade: str  # A, B, C, D, F
     efficiency_rating: str  # Excellent, Good, Fair, Needs Improvement
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 
 class DataAnalysisEvaluationResponse(BaseModel):
     isGoodAnalysis: bool
@@ -112,6 +151,7 @@ class DataAnalysisEvaluationResponse(BaseModel):
     grade: str  # A, B, C, D, F
     insight_quality: str  # Excellent, Good, Fair, Needs Improvement
     recommended_tools: List[str]
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 
 class PresentationEvaluationResponse(BaseModel):
     isGoodPresentation: bool
@@ -122,6 +162,7 @@ class PresentationEvaluationResponse(BaseModel):
     grade: str  # A, B, C, D, F
     engagement_level: str  # Excellent, Good, Fair, Needs Improvement
     recommended_tools: List[str]
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 
 class ProductivityEvaluationResponse(BaseModel):
     isGoodAutomation: bool
@@ -133,6 +174,7 @@ class ProductivityEvaluationResponse(BaseModel):
     efficiency_gain: str  # High, Medium, Low, Minimal
     recommended_tools: List[str]
     implementation_timeline: str
+    provisional: bool = False  # scored locally while the AI grader was unavailable; not a grade
 class AssessmentQuestion(BaseModel):
     id: str
     type: AssessmentType
@@ -140,4 +182,61 @@ class AssessmentQuestion(BaseModel):
     description: str
     instructions: str
     sample_data: Optional[str] = None
-    requirements: List[str]
\ No newline at end of file
+    requirements: List[str]
+
+class BatchEvaluationItem(BaseModel):
+    type: AssessmentType
+    request: Dict[str, Any]  # body of the matching evaluate-* request
+    id: Optional[str] = None  # caller's reference, echoed back in the result
+
+class BatchEvaluationRequest(BaseModel):
+    items: List[BatchEvaluationItem]
+    max_concurrency: Optional[int] = None
+
+class BatchEvaluationResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    type: AssessmentType
+    status: str  # ok, error
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class FullAssessmentRequest(BaseModel):
+    prompt: PromptRequest
+    writing: WritingRequest
+    task_management: TaskManagementRequest
+    data_analysis: DataAnalysisRequest
+    presentation: PresentationRequest
+    productivity: ProductivityRequest
+
+class FullAssessmentResponse(BaseModel):
+    overall_score: Optional[int] = None  # as on the frontend's results page; None when a step failed
+    level: Optional[str] = None  # Explorer, Practitioner, Innovator
+    prompt: Optional[EvaluationResponse] = None
+    writing: Optional[WritingEvaluationResponse] = None
+    task_management: Optional[TaskManagementEvaluationResponse] = None
+    data_analysis: Optional[DataAnalysisEvaluationResponse] = None
+    presentation: Optional[PresentationEvaluationResponse] = None
+    productivity: Optional[ProductivityEvaluationResponse] = None
+    errors: Dict[str, str] = {}  # step -> error, for steps that could not be evaluated
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class EvaluationJobRequest(BaseModel):
+    type: AssessmentType
+    request: Dict[str, Any]  # body of the matching evaluate-* request
+
+class EvaluationJob(BaseModel):
+    id: str
+    type: AssessmentType
+    status: JobStatus
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0  # evaluations that ended with the provider unavailable
@@ -0,0 +1,315 @@
+"""Re-score stored submissions through the evaluator services, e.g. after a rubric change
+
+Reads JSONL or CSV rows, evaluates them with bounded concurrency under the LLM rate budget and appends one
+JSON line per row to the output file. Progress is checkpointed next to the output, so re-running the same
+command after a crash or Ctrl-C continues where it stopped. Memory use does not grow with the input size.
+
+    cd backend
+    python rescore.py submissions.jsonl rescored.jsonl --concurrency 16 --rpm 600
+    python rescore.py answers.csv rescored.jsonl --type task_management
+
+Each row needs an assessment type ("type" field, or --type for the whole file) and the fields of that
+type's evaluate request, either as a "request" object (JSONL) or as the row's own fields/columns. An "id"
+is echoed in the output; "candidate_id" and "cohort_id" attribute results when --record-results is given.
+Every row is evaluated afresh unless --use-cache is given.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import signal
+import sys
+import time
+from typing import Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Row fields that describe the row rather than the evaluate request
+ROW_FIELDS = ("type", "id", "candidate_id", "cohort_id")
+
+
+def detect_format(path: str, requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(path: str, file_format: str) -> Iterator[dict]:
+    """Yield raw rows one at a time; a line that is not valid JSON is yielded as {"_error": ...}"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            for row in csv.DictReader(f):
+                yield {key: csv_value(value) for key, value in row.items() if key is not None}
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"_error": f"invalid JSON: {e}"}
+
+
+def csv_value(value: Optional[str]):
+    # List fields such as a writing task's requirements are stored as JSON arrays
+    if value and value.lstrip().startswith("["):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            pass
+    return value
+
+
+def count_rows(path: str, file_format: str) -> int:
+    return sum(1 for _ in read_rows(path, file_format))
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+class Checkpoint:
+    """Rows done so far: every row below `next_index`, plus the few finished out of order above it"""
+
+    def __init__(self, path: str, source: dict):
+        self.path = path
+        self.source = source
+        self.next_index = 0
+        self.done = set()
+        self.output_bytes = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state["source"] != self.source:
+            raise SystemExit(f"{self.path} belongs to a different input file; pass --restart to start over")
+        self.next_index = state["next_index"]
+        self.done = set(state["done"])
+        self.output_bytes = state["output_bytes"]
+        return True
+
+    def is_done(self, index: int) -> bool:
+        return index < self.next_index or index in self.done
+
+    def mark(self, index: int):
+        self.done.add(index)
+        while self.next_index in self.done:
+            self.done.remove(self.next_index)
+            self.next_index += 1
+
+    def save(self, output_bytes: int):
+        """Atomically record progress; called only after the output up to output_bytes is on disk"""
+        self.output_bytes = output_bytes
+        state = {"source": self.source, "next_index": self.next_index, "done": sorted(self.done),
+                 "output_bytes": output_bytes, "saved_at": time.time()}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.path)
+
+
+class Progress:
+    """Throughput and ETA for the rows evaluated in this run"""
+
+    def __init__(self, total: Optional[int], already_done: int):
+        self.total = total
+        self.done = already_done
+        self.evaluated = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def record(self, ok: bool):
+        self.done += 1
+        self.evaluated += 1
+        self.errors += not ok
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.evaluated / elapsed if elapsed else 0.0
+        text = f"{self.done:,}"
+        if self.total:
+            text += f"/{self.total:,} rows ({self.done / self.total:.1%})"
+        else:
+            text += " rows"
+        text += f" | {rate:.1f} rows/s | errors {self.errors:,} | elapsed {format_duration(elapsed)}"
+        if self.total and rate:
+            text += f" | ETA {format_duration(max(0, self.total - self.done) / rate)}"
+        return text
+
+
+async def rescore(args) -> int:
+    # Imported after the command line has set the rate limit and results store environment
+    from models.assessment import AssessmentType, BatchEvaluationItem
+    from services.batch_evaluator import evaluate_item
+    from services.llm_scheduler import llm_priority, llm_scheduler, BATCH
+    from services.openai_client import close_openai_client
+    from services.results_store import results_store, set_result_context, reset_result_context
+
+    file_format = detect_format(args.input, args.format)
+    stat = os.stat(args.input)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint",
+                            {"input": os.path.abspath(args.input), "size": stat.st_size, "mtime": stat.st_mtime})
+    resumed = not args.restart and checkpoint.load()
+    if resumed:
+        # Drop lines written after the last checkpoint; those rows are evaluated again
+        output = open(args.output, "r+b")
+        output.truncate(checkpoint.output_bytes)
+        output.seek(checkpoint.output_bytes)
+        print(f"Resuming from row {checkpoint.next_index:,} ({len(checkpoint.done)} later rows already done)",
+              file=sys.stderr)
+    else:
+        output = open(args.output, "wb")
+
+    total = None if args.no_count else count_rows(args.input, file_format)
+    already_done = checkpoint.next_index + len(checkpoint.done)
+    progress = Progress(total, already_done)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    def parse(row) -> Tuple[Optional[BatchEvaluationItem], Optional[str]]:
+        if not isinstance(row, dict):
+            return None, "row is not an object"
+        if "_error" in row:
+            return None, row["_error"]
+        try:
+            assessment_type = AssessmentType(args.type or row.get("type"))
+        except ValueError:
+            return None, f"unknown assessment type {args.type or row.get('type')!r}"
+        request = row.get("request")
+        if not isinstance(request, dict):
+            request = {key: value for key, value in row.items() if key not in ROW_FIELDS}
+        # Ids are echoed back as strings; numeric ids are common in exported data
+        row_id = row.get("id")
+        return BatchEvaluationItem(type=assessment_type, request=request,
+                                   id=None if row_id is None else str(row_id)), None
+
+    async def evaluate(index: int, row) -> dict:
+        """The output line for one row; rows that fail are written with status "error" """
+        item, error = parse(row)
+        if item is None:
+            return {"index": index, "status": "error", "error": error}
+        token = set_result_context(row.get("candidate_id"), row.get("cohort_id"))
+        try:
+            result = await evaluate_item(index, item)
+        finally:
+            reset_result_context(token)
+        line = result.model_dump(mode="json", exclude_none=True)
+        if row.get("candidate_id"):
+            line["candidate_id"] = row["candidate_id"]
+        return line
+
+    def write(line: dict):
+        output.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+        checkpoint.mark(line["index"])
+        progress.record(line["status"] == "ok")
+
+    async def worker():
+        # Rows from a re-scoring run wait behind any interactive evaluations sharing the rate budget
+        with llm_priority(BATCH):
+            while True:
+                index, row = await queue.get()
+                try:
+                    try:
+                        line = await evaluate(index, row)
+                    except Exception as e:
+                        # A row that breaks before reaching an evaluator must not take its worker down with it
+                        line = {"index": index, "status": "error", "error": str(e)}
+                    write(line)
+                finally:
+                    queue.task_done()
+
+    async def feed():
+        for index, row in enumerate(read_rows(args.input, file_format)):
+            if not checkpoint.is_done(index):
+                await queue.put((index, row))
+        await queue.join()
+
+    async def report():
+        last_saved = time.monotonic()
+        saved_at_done = progress.done
+        while True:
+            await asyncio.sleep(args.progress_interval)
+            print(progress.line(), file=sys.stderr)
+            if progress.done - saved_at_done >= args.checkpoint_every or time.monotonic() - last_saved >= 30:
+                save()
+                last_saved, saved_at_done = time.monotonic(), progress.done
+
+    def save():
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint.save(output.tell())
+
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    reporter = asyncio.create_task(report())
+    feeder = asyncio.create_task(feed())
+    stopper = asyncio.create_task(stop.wait())
+    try:
+        await asyncio.wait([feeder, stopper], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Rows still being evaluated are not in the checkpoint, so they run again on resume
+        for task in (feeder, stopper, reporter, *workers):
+            task.cancel()
+        await asyncio.gather(feeder, stopper, reporter, *workers, return_exceptions=True)
+        save()
+        output.close()
+        await results_store.close()
+        await close_openai_client()
+
+    print(progress.line(), file=sys.stderr)
+    if stop.is_set():
+        print(f"Stopped; run the same command again to resume from {checkpoint.path}", file=sys.stderr)
+        return 130
+    scheduler = llm_scheduler.stats()
+    print(f"Done: {progress.evaluated:,} rows evaluated, {progress.errors:,} errors, "
+          f"{scheduler['retries']} retries, {scheduler['rate_limited']} rate limited", file=sys.stderr)
+    os.remove(checkpoint.path)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[2:]))
+    parser.add_argument("input", help="JSONL or CSV file of submissions")
+    parser.add_argument("output", help="JSONL file of results, one line per input row")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from the extension)")
+    parser.add_argument("--type", help="assessment type of every row, when rows have no \"type\" field")
+    parser.add_argument("--concurrency", type=int, default=8, help="rows evaluated at once")
+    parser.add_argument("--rpm", type=int, help="provider requests per minute (sets LLM_RPM_LIMIT)")
+    parser.add_argument("--tpm", type=int, help="provider tokens per minute (sets LLM_TPM_LIMIT)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=500, help="rows between checkpoints")
+    parser.add_argument("--progress-interval", type=float, default=5, help="seconds between progress lines")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--no-count", action="store_true", help="skip counting rows up front (no ETA)")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="reuse cached grades (EVALUATION_CACHE_*) instead of evaluating every row again")
+    parser.add_argument("--record-results", action="store_true",
+                        help="also record results in the results store (RESULTS_DB)")
+    args = parser.parse_args()
+
+    if args.rpm is not None:
+        os.environ["LLM_RPM_LIMIT"] = str(args.rpm)
+    if args.tpm is not None:
+        os.environ["LLM_TPM_LIMIT"] = str(args.tpm)
+    if not args.use_cache:
+        # Cached grades predate the change being re-scored for unless the prompt version was bumped;
+        # this also turns off near-duplicate reuse
+        os.environ["EVALUATION_CACHE_SIZE"] = "0"
+    if not args.record_results:
+        # Re-scored history should not show up in live cohort reports
+        os.environ["RESULTS_DB"] = ""
+    from services.tracing import configure_logging
+    configure_logging()
+    sys.exit(asyncio.run(rescore(args)))
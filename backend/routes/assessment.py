@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from models.assessment import (
     PromptRequest, 
     WritingRequest,
@@ -12,30 +15,53 @@ from models.assessment import (
     DataAnalysisEvaluationResponse,
     PresentationEvaluationResponse,
     ProductivityEvaluationResponse,
+    BatchEvaluationRequest,
+    FullAssessmentRequest,
+    FullAssessmentResponse,
+    EvaluationJobRequest,
+    EvaluationJob,
     AssessmentType
 )
-from services.prompt_evaluator import PromptEvaluatorService
-from services.writing_evaluator import WritingEvaluatorService
-from services.task_management_evaluator import TaskManagementEvaluatorService
-from services.data_analysis_evaluator import DataAnalysisEvaluatorService
-from services.presentation_evaluator import PresentationEvaluatorService
-from services.productivity_evaluator import ProductivityEvaluatorService
+from services.evaluator_registry import get_evaluator, registry_stats, scenario_catalog
+from services.evaluation_cache import evaluation_cache
+from services.similarity_index import similarity_index
+from services.prescreen import prescreen_stats
+from services.copy_detection import scenario_index, submission_index
+from services.token_usage import usage_stats
+from services.prompt_templates import template_stats
+from services.json_output import parse_stats
+from services.model_cascade import cascade_stats
+from services.llm_scheduler import llm_scheduler, LLMUnavailableError
+from services.llm_resilience import llm_resilience
+from services.llm_cassette import llm_cassette
+from services import batch_evaluator
+from services.full_assessment import evaluate_all
+from services.job_queue import job_runner
+from services.event_stream import stream_evaluation
+from services.results_store import results_store, RESULTS_MAX_PAGE
+from services.responses import json_response
 import json
 
 router = APIRouter(prefix="/assessment", tags=["assessment"])
 
-# Initialize services
-prompt_service = PromptEvaluatorService()
-writing_service = WritingEvaluatorService()
-task_management_service = TaskManagementEvaluatorService()
-data_analysis_service = DataAnalysisEvaluatorService()
-presentation_service = PresentationEvaluatorService()
-productivity_service = ProductivityEvaluatorService()
+def evaluator(assessment_type: AssessmentType):
+    """The evaluate method of an assessment's service, built on first use"""
+    return get_evaluator(assessment_type)[1]
+
+def service_unavailable(error: LLMUnavailableError) -> HTTPException:
+    """Tell the client to retry later instead of reporting a rate-limited evaluation as a server error"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, round(error.retry_after)))}
+    )
 
 @router.post("/evaluate-prompt", response_model=EvaluationResponse)
 async def evaluate_prompt(request: PromptRequest):
     try:
-        return await prompt_service.evaluate_prompt(request)
+        return await evaluator(AssessmentType.PROMPT_ENGINEERING)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
@@ -44,7 +70,9 @@ async def evaluate_prompt(request: PromptRequest):
 @router.post("/evaluate-writing", response_model=WritingEvaluationResponse)
 async def evaluate_writing(request: WritingRequest):
     try:
-        return await writing_service.evaluate_writing(request)
+        return await evaluator(AssessmentType.WRITING_AUTOMATION)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
@@ -53,7 +81,9 @@ async def evaluate_writing(request: WritingRequest):
 @router.post("/evaluate-task-management", response_model=TaskManagementEvaluationResponse)
 async def evaluate_task_management(request: TaskManagementRequest):
     try:
-        return await task_management_service.evaluate_task_management(request)
+        return await evaluator(AssessmentType.TASK_MANAGEMENT)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
@@ -62,7 +92,9 @@ async def evaluate_task_management(request: TaskManagementRequest):
 @router.post("/evaluate-data-analysis", response_model=DataAnalysisEvaluationResponse)
 async def evaluate_data_analysis(request: DataAnalysisRequest):
     try:
-        return await data_analysis_service.evaluate_data_analysis(request)
+        return await evaluator(AssessmentType.DATA_ANALYSIS)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
@@ -71,7 +103,9 @@ async def evaluate_data_analysis(request: DataAnalysisRequest):
 @router.post("/evaluate-presentation", response_model=PresentationEvaluationResponse)
 async def evaluate_presentation(request: PresentationRequest):
     try:
-        return await presentation_service.evaluate_presentation(request)
+        return await evaluator(AssessmentType.AI_PRESENTATIONS)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
@@ -80,81 +114,209 @@ async def evaluate_presentation(request: PresentationRequest):
 @router.post("/evaluate-productivity", response_model=ProductivityEvaluationResponse)
 async def evaluate_productivity(request: ProductivityRequest):
     try:
-        return await productivity_service.evaluate_productivity(request)
+        return await evaluator(AssessmentType.WORKFLOW_AUTOMATION)(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error evaluating productivity: {str(e)}")
+
+def event_stream_response(evaluate, request) -> StreamingResponse:
+    """Stream an evaluation's progress and final response as Server-Sent Events"""
+    return StreamingResponse(
+        stream_evaluation(evaluate, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/evaluate-prompt/stream")
+async def evaluate_prompt_stream(request: PromptRequest):
+    """Streaming variant of /evaluate-prompt: answer_delta events, then the result"""
+    return event_stream_response(evaluator(AssessmentType.PROMPT_ENGINEERING), request)
+
+@router.post("/evaluate-writing/stream")
+async def evaluate_writing_stream(request: WritingRequest):
+    return event_stream_response(evaluator(AssessmentType.WRITING_AUTOMATION), request)
+
+@router.post("/evaluate-task-management/stream")
+async def evaluate_task_management_stream(request: TaskManagementRequest):
+    return event_stream_response(evaluator(AssessmentType.TASK_MANAGEMENT), request)
+
+@router.post("/evaluate-data-analysis/stream")
+async def evaluate_data_analysis_stream(request: DataAnalysisRequest):
+    return event_stream_response(evaluator(AssessmentType.DATA_ANALYSIS), request)
+
+@router.post("/evaluate-presentation/stream")
+async def evaluate_presentation_stream(request: PresentationRequest):
+    return event_stream_response(evaluator(AssessmentType.AI_PRESENTATIONS), request)
+
+@router.post("/evaluate-productivity/stream")
+async def evaluate_productivity_stream(request: ProductivityRequest):
+    return event_stream_response(evaluator(AssessmentType.WORKFLOW_AUTOMATION), request)
+
+@router.post("/evaluate-batch")
+async def evaluate_batch(request: BatchEvaluationRequest):
+    """Evaluate a mix of assessment submissions, streaming one JSON line per item as each finishes"""
+    if len(request.items) > batch_evaluator.MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {batch_evaluator.MAX_ITEMS} items")
+
+    async def stream_results():
+        async for result in batch_evaluator.evaluate_batch(request.items, request.max_concurrency):
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.post("/evaluate-all", response_model=FullAssessmentResponse)
+async def evaluate_full_assessment(request: FullAssessmentRequest):
+    """Evaluate all six steps of an assessment in one call and return their results with the overall level"""
+    try:
+        return await evaluate_all(request)
+    except LLMUnavailableError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating assessment: {str(e)}")
+
+@router.post("/jobs", response_model=EvaluationJob, status_code=202)
+async def submit_job(job_request: EvaluationJobRequest, response: Response):
+    """Queue an evaluation and return its job id immediately; poll GET /assessment/jobs/{id} for the result"""
+    request_model, _ = get_evaluator(job_request.type)
+    try:
+        # Reject malformed submissions now rather than as a failed job later
+        request_model.model_validate(job_request.request)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    job = await job_runner.submit(job_request.type, job_request.request)
+    response.headers["Location"] = f"/assessment/jobs/{job.id}"
+    return job
+
+@router.get("/jobs/{job_id}", response_model=EvaluationJob)
+async def get_job(job_id: str):
+    """Get a queued evaluation's status, and its result once completed"""
+    job = await job_runner.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/results")
+async def get_results(
+    candidate_id: Optional[str] = None,
+    cohort_id: Optional[str] = None,
+    assessment_type: Optional[AssessmentType] = None,
+    since: Optional[float] = Query(None, description="Unix timestamp, inclusive"),
+    until: Optional[float] = Query(None, description="Unix timestamp, exclusive"),
+    limit: int = Query(100, ge=1, le=RESULTS_MAX_PAGE),
+    offset: int = Query(0, ge=0)
+):
+    """Stored evaluation results, most recent first"""
+    if not results_store.enabled:
+        raise HTTPException(status_code=404, detail="Results store is disabled")
+    results = await results_store.query(
+        candidate_id, cohort_id, assessment_type.value if assessment_type else None, since, until, limit, offset
+    )
+    return json_response({"results": results, "limit": limit, "offset": offset})
+
+@router.get("/results/summary")
+async def get_results_summary(
+    candidate_id: Optional[str] = None,
+    cohort_id: Optional[str] = None,
+    assessment_type: Optional[AssessmentType] = None,
+    since: Optional[float] = Query(None, description="Unix timestamp, inclusive"),
+    until: Optional[float] = Query(None, description="Unix timestamp, exclusive")
+):
+    """Result counts, scores and token totals per assessment type for reporting"""
+    if not results_store.enabled:
+        raise HTTPException(status_code=404, detail="Results store is disabled")
+    summary = await results_store.summary(
+        candidate_id, cohort_id, assessment_type.value if assessment_type else None, since, until
+    )
+    return json_response({"assessments": summary})
+
+@router.get("/catalog")
+async def get_catalog(request: Request):
+    """Get the scenarios and tasks of every assessment in one document"""
+    return scenario_catalog.catalog().response(request)
+
+@router.get("/catalog/{assessment_type}/{item_id}")
+async def get_catalog_item(assessment_type: AssessmentType, item_id: str, request: Request):
+    """Get one scenario or task of an assessment"""
+    entry = scenario_catalog.item(assessment_type, item_id, fallback=False)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return entry.response(request)
+
 @router.get("/writing-tasks")
-async def get_writing_tasks():
+async def get_writing_tasks(request: Request):
     """Get available writing task types and their details"""
-    return {
-        "tasks": writing_service.writing_tasks
-    }
+    return scenario_catalog.listing(AssessmentType.WRITING_AUTOMATION).response(request)
 
 @router.get("/task-management-scenarios")
-async def get_task_management_scenarios():
+async def get_task_management_scenarios(request: Request):
     """Get available task management scenario types and their details"""
-    return {
-        "scenarios": task_management_service.scenarios
-    }
+    return scenario_catalog.listing(AssessmentType.TASK_MANAGEMENT).response(request)
 
 @router.get("/task-management-scenario/{scenario_type}")
-async def get_task_management_scenario(scenario_type: str):
+async def get_task_management_scenario(scenario_type: str, request: Request):
     """Get specific task management scenario details"""
-    scenario = task_management_service.get_scenario(scenario_type)
-    if not scenario:
-        raise HTTPException(status_code=404, detail="Scenario type not found")
-    return scenario
+    return scenario_catalog.item(AssessmentType.TASK_MANAGEMENT, scenario_type).response(request)
 
 @router.get("/data-analysis-scenarios")
-async def get_data_analysis_scenarios():
+async def get_data_analysis_scenarios(request: Request):
     """Get available data analysis scenario types and their details"""
-    return {
-        "scenarios": data_analysis_service.analysis_scenarios
-    }
+    return scenario_catalog.listing(AssessmentType.DATA_ANALYSIS).response(request)
 
 @router.get("/presentation-scenarios")
-async def get_presentation_scenarios():
+async def get_presentation_scenarios(request: Request):
     """Get available presentation scenario types and their details"""
-    return {
-        "scenarios": presentation_service.presentation_scenarios
-    }
+    return scenario_catalog.listing(AssessmentType.AI_PRESENTATIONS).response(request)
 
 @router.get("/presentation-scenario/{presentation_type}")
-async def get_presentation_scenario(presentation_type: str):
+async def get_presentation_scenario(presentation_type: str, request: Request):
     """Get specific presentation scenario details"""
-    scenario = presentation_service.get_presentation_scenario(presentation_type)
-    if not scenario:
-        raise HTTPException(status_code=404, detail="Presentation type not found")
-    return scenario
+    return scenario_catalog.item(AssessmentType.AI_PRESENTATIONS, presentation_type).response(request)
 
 @router.get("/productivity-scenarios")
-async def get_productivity_scenarios():
+async def get_productivity_scenarios(request: Request):
     """Get available productivity automation scenario types and their details"""
-    return {
-        "scenarios": productivity_service.automation_scenarios
-    }
+    return scenario_catalog.listing(AssessmentType.WORKFLOW_AUTOMATION).response(request)
 
 @router.get("/productivity-scenario/{automation_type}")
-async def get_productivity_scenario(automation_type: str):
+async def get_productivity_scenario(automation_type: str, request: Request):
     """Get specific productivity automation scenario details"""
-    scenario = productivity_service.get_automation_scenario(automation_type)
-    if not scenario:
-        raise HTTPException(status_code=404, detail="Automation type not found")
-    return scenario
+    return scenario_catalog.item(AssessmentType.WORKFLOW_AUTOMATION, automation_type).response(request)
+
 @router.get("/data-analysis-scenario/{analysis_type}")
-async def get_data_analysis_scenario(analysis_type: str):
+async def get_data_analysis_scenario(analysis_type: str, request: Request):
     """Get specific data analysis scenario details"""
-    scenario = data_analysis_service.get_analysis_scenario(analysis_type)
-    if not scenario:
-        raise HTTPException(status_code=404, detail="Analysis type not found")
-    return scenario
+    return scenario_catalog.item(AssessmentType.DATA_ANALYSIS, analysis_type).response(request)
 
 @router.get("/writing-task/{task_type}")
-async def get_writing_task(task_type: str):
+async def get_writing_task(task_type: str, request: Request):
     """Get specific writing task details"""
-    task = writing_service.get_writing_task(task_type)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task type not found")
-    return task
\ No newline at end of file
+    return scenario_catalog.item(AssessmentType.WRITING_AUTOMATION, task_type).response(request)
+
+@router.get("/stats")
+async def get_stats():
+    """Get evaluation cache, pre-screen, copy-detection and token usage counters"""
+    return json_response({
+        "cache": evaluation_cache.stats(),
+        "similarity": similarity_index.stats(),
+        "prescreen": prescreen_stats.stats(),
+        "parsing": parse_stats.stats(),
+        "cascade": cascade_stats.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "resilience": llm_resilience.stats(),
+        "cassette": llm_cassette.stats(),
+        "jobs": await job_runner.stats(),
+        "results": results_store.stats(),
+        "catalog": scenario_catalog.stats(),
+        "evaluators": registry_stats(),
+        "copy_detection": {
+            "scenarios": scenario_index.stats(),
+            "submissions": submission_index.stats()
+        },
+        "tokens": {
+            "by_operation": usage_stats(),
+            "templates": template_stats()
+        }
+    })
\ No newline at end of file
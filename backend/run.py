@@ -1,10 +1,65 @@
+import argparse
+import importlib.util
+import os
 import uvicorn
+from dotenv import load_dotenv
 
-if __name__ == "__main__":
+# Load environment variables
+load_dotenv()
+
+# "development" reloads on code changes; "production" runs WEB_CONCURRENCY worker processes
+APP_ENV = os.getenv("APP_ENV", "development").lower()
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+# In-flight requests get this long to finish after SIGTERM before connections are closed
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+# Cache, rate budget and jobs for all workers when the specific *_DB settings are not given
+DEFAULT_SHARED_STATE_DB = "shared_state.sqlite3"
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_production(host: str, port: int, workers: int):
+    if workers > 1:
+        # Workers are separate processes; without a shared store each would get its own
+        # cache and a full rate budget, multiplying LLM spend and 429s
+        os.environ.setdefault("SHARED_STATE_DB", DEFAULT_SHARED_STATE_DB)
+    loop = "uvloop" if installed("uvloop") else "asyncio"
+    http = "httptools" if installed("httptools") else "h11"
+    print(f"Starting {workers} workers on {host}:{port} ({loop}, {http}), "
+          f"shared state: {os.getenv('SHARED_STATE_DB') or 'per process'}")
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
         log_level="info"
-    )
\ No newline at end of file
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the assessment API")
+    parser.add_argument("--production", action="store_true", default=APP_ENV == "production",
+                        help="multiple workers, no reload (same as APP_ENV=production)")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="worker processes in production mode")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    if args.production:
+        run_production(args.host, args.port, args.workers)
+    else:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info"
+        )
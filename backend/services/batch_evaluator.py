@@ -0,0 +1,45 @@
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional
+from dotenv import load_dotenv
+from models.assessment import BatchEvaluationItem, BatchEvaluationResult
+from services.evaluator_registry import get_evaluator
+from services.llm_scheduler import llm_priority, BATCH
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "8"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+
+
+async def evaluate_item(index: int, item: BatchEvaluationItem) -> BatchEvaluationResult:
+    """Evaluate one batch item, turning any failure into an error result"""
+    try:
+        request_model, evaluate = get_evaluator(item.type)
+        response = await evaluate(request_model.model_validate(item.request))
+        return BatchEvaluationResult(index=index, id=item.id, type=item.type, status="ok", result=response.model_dump())
+    except Exception as e:
+        return BatchEvaluationResult(index=index, id=item.id, type=item.type, status="error", error=str(e))
+
+
+async def evaluate_batch(items: List[BatchEvaluationItem], max_concurrency: Optional[int] = None) -> AsyncIterator[BatchEvaluationResult]:
+    """Evaluate items with bounded concurrency, yielding each result as soon as it finishes"""
+    concurrency = max(1, min(max_concurrency or DEFAULT_CONCURRENCY, MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: BatchEvaluationItem) -> BatchEvaluationResult:
+        # Interactive submissions are admitted ahead of queued batch work
+        with llm_priority(BATCH):
+            async with semaphore:
+                return await evaluate_item(index, item)
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # Stop outstanding work if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
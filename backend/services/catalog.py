@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from models.assessment import AssessmentType
+
+# Load environment variables
+load_dotenv()
+
+# Scenario text only changes on deploy, so browsers and CDNs may reuse it for a while and revalidate with ETags
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "300"))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_STALE_WHILE_REVALIDATE", "86400"))
+# Tiny bodies are not worth the gzip header
+MIN_GZIP_SIZE = 256
+
+
+class CatalogEntry:
+    """A JSON document serialized and gzipped once, with a strong ETag per encoding"""
+
+    __slots__ = ("body", "gzipped", "etag", "gzip_etag")
+
+    def __init__(self, document):
+        self.body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # mtime=0 keeps the compressed bytes, and so the ETag, identical across workers and restarts
+        compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.gzipped = compressed if len(self.body) >= MIN_GZIP_SIZE and len(compressed) < len(self.body) else None
+        self.gzip_etag = f'"{digest}-gz"'
+
+    def matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return self.etag in tags or self.gzip_etag in tags
+
+    def response(self, request: Request) -> Response:
+        """The entry as a 200, gzipped if the client accepts it, or a 304 if the client's copy is current"""
+        use_gzip = self.gzipped is not None and "gzip" in request.headers.get("accept-encoding", "")
+        headers = {
+            "ETag": self.gzip_etag if use_gzip else self.etag,
+            "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE}",
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzipped, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class ScenarioCatalog:
+    """Scenario and task documents of every assessment, pre-serialized for the read-only routes"""
+
+    def __init__(self, sources: Dict[AssessmentType, tuple]):
+        # assessment type -> (list route key, function returning {item id: item}, default item id)
+        self.sources = sources
+        self.lists: Dict[AssessmentType, CatalogEntry] = {}
+        self.items: Dict[AssessmentType, Dict[str, CatalogEntry]] = {}
+        self.defaults: Dict[AssessmentType, str] = {}
+        self.full: Optional[CatalogEntry] = None
+
+    def build(self):
+        """Serialize and compress every document; run at startup so requests only copy bytes"""
+        full = {}
+        for assessment_type, (key, get_items, default_id) in self.sources.items():
+            items = get_items()
+            self.lists[assessment_type] = CatalogEntry({key: items})
+            self.items[assessment_type] = {item_id: CatalogEntry(item) for item_id, item in items.items()}
+            self.defaults[assessment_type] = default_id
+            full[assessment_type.value] = items
+        self.full = CatalogEntry({"assessments": full})
+
+    def _built(self):
+        if self.full is None:
+            self.build()
+
+    def catalog(self) -> CatalogEntry:
+        self._built()
+        return self.full
+
+    def listing(self, assessment_type: AssessmentType) -> CatalogEntry:
+        self._built()
+        return self.lists[assessment_type]
+
+    def item(self, assessment_type: AssessmentType, item_id: str, fallback: bool = True) -> Optional[CatalogEntry]:
+        """One scenario; unknown ids get the assessment's default scenario unless `fallback` is off"""
+        self._built()
+        items = self.items.get(assessment_type, {})
+        entry = items.get(item_id)
+        if entry is None and fallback:
+            entry = items.get(self.defaults.get(assessment_type))
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "items": sum(len(items) for items in self.items.values()),
+            "bytes": len(self.full.body) if self.full else 0,
+            "gzip_bytes": len(self.full.gzipped) if self.full and self.full.gzipped else 0
+        }
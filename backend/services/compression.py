@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import os
+from typing import Optional
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+from services.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without brotli
+    brotli = None
+
+# Load environment variables
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies fit in a packet or two anyway; compressing them only adds headers and CPU time
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Bodies at least this large (e.g. full results pages) are compressed off the event loop
+COMPRESSION_THREAD_SIZE = int(os.getenv("COMPRESSION_THREAD_SIZE", "262144"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv")
+
+compressed_bytes = registry.counter(
+    "http_response_compressed_bytes_total", "Response bytes before and after compression, by encoding",
+    ["encoding", "stage"])
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding the client accepts: br when available, then gzip"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        offered[name.strip()] = quality
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in supported:
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli compression of complete responses above a size threshold
+
+    Responses that are already encoded (the catalog's pre-gzipped bytes), declared smaller than the
+    threshold or not JSON/text (event streams, NDJSON batches) are passed through untouched and unbuffered.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                length = headers.get("content-length")
+                if ("content-encoding" in headers or message["status"] in (204, 304)
+                        or (length is not None and int(length) < self.minimum_size)
+                        or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                    await send(message)
+                else:
+                    start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            # Outer middleware re-streams every response in chunks, so collect the whole body first
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(scope=start)
+            if len(body) >= self.minimum_size:
+                if len(body) >= COMPRESSION_THREAD_SIZE:
+                    compressed = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    compressed = compress(body, encoding)
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if len(compressed) < len(body):
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(compressed))
+                    # The bytes differ from the identity response, so a strong validator no longer applies
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+                    compressed_bytes.inc(encoding, "in", amount=len(body))
+                    compressed_bytes.inc(encoding, "out", amount=len(compressed))
+                    body = compressed
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
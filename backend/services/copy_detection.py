@@ -0,0 +1,199 @@
+import os
+import re
+import zlib
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from dotenv import load_dotenv
+from models.assessment import AssessmentType
+
+# Load environment variables
+load_dotenv()
+
+SHINGLE_SIZE = 3
+SIGNATURE_BINS = 64
+LSH_BANDS = 16
+LSH_ROWS = SIGNATURE_BINS // LSH_BANDS
+_EMPTY_BIN = 0xFFFFFFFF
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def shingle_hashes(words: List[str], size: int = SHINGLE_SIZE) -> FrozenSet[int]:
+    """Hash every run of `size` consecutive words; shorter texts become a single shingle"""
+    if len(words) < size:
+        return frozenset([zlib.crc32(" ".join(words).encode("utf-8"))]) if words else frozenset()
+    return frozenset(
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    )
+
+
+def minhash_signature(hashes: FrozenSet[int]) -> Tuple[int, ...]:
+    """One-permutation MinHash: a single pass over the shingles fills every bin"""
+    bins = [_EMPTY_BIN] * SIGNATURE_BINS
+    for value in hashes:
+        mixed = (value * 0x9E3779B1) & 0xFFFFFFFF
+        index = mixed % SIGNATURE_BINS
+        if mixed < bins[index]:
+            bins[index] = mixed
+    # Densify: empty bins borrow the next filled bin so short texts still compare
+    if _EMPTY_BIN in bins and len(hashes) > 0:
+        for i in range(SIGNATURE_BINS):
+            j = i
+            while bins[j % SIGNATURE_BINS] == _EMPTY_BIN:
+                j += 1
+            if j != i:
+                bins[i] = bins[j % SIGNATURE_BINS]
+    return tuple(bins)
+
+
+class ReferenceText:
+    """A scenario text with its word set and shingles precomputed once
+
+    Word sets are whitespace-separated, punctuation included, as in the original copy checks, so
+    their overlap thresholds keep giving the same verdicts; shingles use punctuation-free tokens.
+    """
+
+    def __init__(self, text: str):
+        self.text = text.lower().strip()
+        self.words = frozenset(self.text.split())
+        self.shingles = shingle_hashes(tokenize(text))
+
+
+class Submission:
+    """A candidate's text, tokenized once and shared by every copy check"""
+
+    def __init__(self, text: str):
+        self.text = text.lower().strip()
+        self.words = frozenset(self.text.split())
+        self.shingles = shingle_hashes(tokenize(text))
+
+    def word_coverage(self, reference: ReferenceText) -> float:
+        """Share of the reference's words that appear in the submission"""
+        if not reference.words:
+            return 0.0
+        return len(reference.words & self.words) / len(reference.words)
+
+    def word_similarity(self, reference: ReferenceText) -> float:
+        """Word overlap relative to the smaller of the two texts"""
+        if not reference.words or not self.words:
+            return 0.0
+        return len(reference.words & self.words) / min(len(reference.words), len(self.words))
+
+
+class ScenarioCopyIndex:
+    """Precomputed shingles of every scenario's question and requirements, keyed by assessment"""
+
+    def __init__(self):
+        self._references: Dict[Tuple[AssessmentType, str], List[ReferenceText]] = {}
+        self._shingles: Dict[Tuple[AssessmentType, str], FrozenSet[int]] = {}
+        self._defaults: Dict[AssessmentType, str] = {}
+
+    def register(self, assessment_type: AssessmentType, scenario_id: str, texts: List[str],
+                 default: bool = False) -> List[ReferenceText]:
+        references = [ReferenceText(text) for text in texts if text and text.strip()]
+        self._references[(assessment_type, scenario_id)] = references
+        self._shingles[(assessment_type, scenario_id)] = frozenset().union(*(r.shingles for r in references))
+        if default or assessment_type not in self._defaults:
+            self._defaults[assessment_type] = scenario_id
+        return references
+
+    def _key(self, assessment_type: AssessmentType, scenario_id: str) -> Optional[Tuple[AssessmentType, str]]:
+        # Unknown scenario ids fall back to the default scenario, like the services' get_* lookups
+        if (assessment_type, scenario_id) in self._references:
+            return assessment_type, scenario_id
+        default = self._defaults.get(assessment_type)
+        return (assessment_type, default) if default is not None else None
+
+    def copied_fraction(self, assessment_type: AssessmentType, scenario_id: str, submission: Submission) -> float:
+        """Share of the submission's shingles that come straight from the scenario text"""
+        key = self._key(assessment_type, scenario_id)
+        if key is None or not submission.shingles:
+            return 0.0
+        return len(submission.shingles & self._shingles[key]) / len(submission.shingles)
+
+    def stats(self) -> dict:
+        return {
+            "scenarios": len(self._references),
+            "reference_texts": sum(len(references) for references in self._references.values())
+        }
+
+
+class SubmissionIndex:
+    """Bounded MinHash/LSH index of prior submissions for cross-candidate near-copy detection"""
+
+    def __init__(self, max_entries: int = 50000, threshold: float = 0.8):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple, List[str]] = {}
+        self._order = deque()
+        self.queries = 0
+        self.matches = 0
+
+    def _band_keys(self, scope: Tuple, signature: Tuple[int, ...]) -> List[Tuple]:
+        return [
+            (scope, band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            for band in range(LSH_BANDS)
+        ]
+
+    def query(self, scope: Tuple, submission: Submission) -> List[Tuple[str, float]]:
+        """Return (submission id, estimated Jaccard similarity) for prior near-copies in the same scope"""
+        self.queries += 1
+        if not submission.shingles:
+            return []
+        signature = minhash_signature(submission.shingles)
+        candidates = set()
+        for band_key in self._band_keys(scope, signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = []
+        for candidate in candidates:
+            other = self._signatures[candidate]
+            similarity = sum(1 for a, b in zip(signature, other) if a == b) / SIGNATURE_BINS
+            if similarity >= self.threshold:
+                matches.append((candidate, similarity))
+        if matches:
+            self.matches += 1
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def add(self, scope: Tuple, submission_id: str, submission: Submission):
+        if not submission.shingles or submission_id in self._signatures:
+            return
+        signature = minhash_signature(submission.shingles)
+        self._signatures[submission_id] = signature
+        for band_key in self._band_keys(scope, signature):
+            self._buckets.setdefault(band_key, []).append(submission_id)
+        self._order.append((scope, submission_id))
+        while len(self._order) > self.max_entries:
+            self._evict(*self._order.popleft())
+
+    def _evict(self, scope: Tuple, submission_id: str):
+        signature = self._signatures.pop(submission_id)
+        for band_key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.remove(submission_id)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._signatures),
+            "max_entries": self.max_entries,
+            "queries": self.queries,
+            "near_copies": self.matches,
+            "near_copy_rate": round(self.matches / self.queries, 4) if self.queries else 0.0
+        }
+
+
+scenario_index = ScenarioCopyIndex()
+
+SUBMISSION_INDEX_ENABLED = os.getenv("SUBMISSION_INDEX_ENABLED", "false").lower() == "true"
+submission_index = SubmissionIndex(
+    max_entries=int(os.getenv("SUBMISSION_INDEX_SIZE", "50000")),
+    threshold=float(os.getenv("SUBMISSION_INDEX_THRESHOLD", "0.8"))
+)
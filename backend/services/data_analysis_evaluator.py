@@ -1,20 +1,22 @@
-import openai
-import json
-import os
 from dotenv import load_dotenv
 from typing import List
-from models.assessment import DataAnalysisRequest, DataAnalysisEvaluationResponse, DataAnalysisCriteria
+from services.model_cascade import cascade_structured, GRADE_BOUNDARIES
+from services.evaluation_cache import cached_evaluation
+from services.prescreen import prescreened, circuit_fallback
+from services.metrics import observed_evaluation
+from services.results_store import recorded_evaluation
+from services.copy_detection import scenario_index
+from services.prompt_templates import PromptTemplate
+from models.assessment import DataAnalysisRequest, DataAnalysisEvaluationResponse, DataAnalysisCriteria, DataAnalysisEvaluationOutput, AssessmentType
 
 # Load environment variables
 load_dotenv()
 
 class DataAnalysisEvaluatorService:
     def __init__(self):
-        # Initialize OpenAI client properly with error handling
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.model = "gpt-3.5-turbo"
+        # Bump whenever the evaluation prompt changes so cached results are not reused
+        self.prompt_version = "2"
         
         # Use the same employee data from prompt engineering
         self.employee_data = """
@@ -46,91 +48,118 @@ E015 | Esperance | Mukandayisenga | HR | Specialist | 48000 | 5 | E004 | PROJ_C
                 "prompt": "You have 6 months of customer transaction data across different branches. Management wants to identify top-performing branches, trends in deposits and withdrawals, and highlight any unusual activity. How would you approach this data analysis task?"
             }
         }
+        
+        # Precompute copy-detection shingles for every scenario once at startup
+        for analysis_type, scenario in self.analysis_scenarios.items():
+            scenario_index.register(AssessmentType.DATA_ANALYSIS, analysis_type, [scenario["dataset_context"], scenario["scenario"], scenario["prompt"]] + scenario["requirements"], default=analysis_type == "employee_analysis")
+        
+        # Build each scenario's evaluation template once so its prefix stays byte-identical across requests
+        self.templates = {analysis_type: self.build_template(analysis_type, scenario) for analysis_type, scenario in self.analysis_scenarios.items()}
 
     def get_analysis_scenario(self, analysis_type: str) -> dict:
         return self.analysis_scenarios.get(analysis_type, self.analysis_scenarios["employee_analysis"])
 
+    def build_template(self, analysis_type: str, scenario: dict) -> PromptTemplate:
+        """Rubric and scenario form a stable prefix; the user's response is the only per-request content"""
+        return PromptTemplate(
+            f"data_analysis_evaluation:{analysis_type}",
+            system="You are a data analysis and business intelligence expert evaluating AI-powered analytical approaches. Always respond with valid JSON.",
+            static_context="""
+            You are evaluating a data analysis and visualization assessment for AI literacy.
+            
+            SCENARIO: {title}
+            DESCRIPTION: {description}
+            DATA CONTEXT: {dataset_context}
+            BUSINESS CONTEXT: {scenario}
+            ANALYSIS QUESTION: {prompt}
+            
+            EVALUATION FRAMEWORK:
+            Analyze the user's response to determine their AI data analysis literacy:
+            
+            EXPLORER LEVEL (0-50%): Basic/manual approaches
+            - Examples: "I'd manually calculate totals per branch and make basic charts in Excel"
+            - Shows minimal or NO awareness of AI tools for data analysis
+            - Manual processes, basic Excel without AI features
+            - No mention of automation or AI assistance
+            
+            PRACTITIONER LEVEL (51-75%): Some AI-assisted tools mentioned
+            - Examples: "I'd use Excel or Power BI with AI/Copilot to summarize deposits/withdrawals, calculate branch performance, and create visual charts"
+            - Must mention specific AI tools like Copilot, Power BI AI features
+            - Shows some understanding of AI-enhanced analysis
+            
+            INNOVATOR LEVEL (76-100%): Advanced AI integration and automation
+            - Examples: "I'd automate data cleaning, generate AI-driven insights on branch performance and trends, create interactive dashboards, and flag anomalies or unusual transactions automatically"
+            - Must mention automation, AI-driven insights, anomaly detection
+            - Shows sophisticated understanding of AI-powered analytics and automation
+            
+            STRICT SCORING RULES:
+            - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
+            - If NO AI tools mentioned: Maximum 25% on all criteria
+            - If only basic Excel mentioned: Maximum 35% on all criteria  
+            - If mentions "AI" but no specific tools: Maximum 45% on all criteria
+            - If mentions specific AI tools (Copilot, Power BI AI): Can score 60-75%
+            - If mentions automation + AI insights + anomaly detection: Can score 76-100%
+            - Random or very short responses: Maximum 10% on all criteria
+            
+            CRITICAL: Check response length and meaningfulness:
+            - Responses under 10 characters or single words: Maximum 5%
+            - Responses like "okay", "yes", "good", "fine": Maximum 5%
+            - Responses under 50 characters with no substance: Maximum 15%
+            
+            EVALUATION CRITERIA (score each out of 100):
+            1. Data Understanding: How well does the user understand the dataset and business context?
+            2. Analytical Approach: Is the analytical methodology sound and appropriate for the problem?
+            3. AI Tool Usage: How effectively are AI tools integrated into the analysis workflow?
+            4. Visualization Quality: Are the proposed visualizations clear, relevant, and insightful?
+            5. Insights Generation: Does the approach lead to actionable business insights?
+            
+            Please respond in this exact JSON format:
+            {{
+                "data_understanding": <score 0-100>,
+                "analytical_approach": <score 0-100>,
+                "ai_tool_usage": <score 0-100>,
+                "visualization_quality": <score 0-100>,
+                "insights_generation": <score 0-100>,
+                "feedback": "<detailed feedback about the data analysis approach and AI usage>",
+                "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
+                "insight_quality": "<Excellent/Good/Fair/Needs Improvement>",
+                "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
+                "grade_justification": "<explanation of the overall grade>"
+            }}
+            """,
+            request_template="""
+            USER'S APPROACH:
+            {submission}
+            """,
+            title=scenario["title"],
+            description=scenario["description"],
+            dataset_context=scenario["dataset_context"],
+            scenario=scenario["scenario"],
+            prompt=scenario["prompt"]
+        )
+
+    def get_template(self, analysis_type: str) -> PromptTemplate:
+        return self.templates.get(analysis_type, self.templates["employee_analysis"])
+
+    @observed_evaluation(AssessmentType.DATA_ANALYSIS)
+    @circuit_fallback(AssessmentType.DATA_ANALYSIS)
+    @recorded_evaluation(AssessmentType.DATA_ANALYSIS)
+    @prescreened(AssessmentType.DATA_ANALYSIS)
+    @cached_evaluation(AssessmentType.DATA_ANALYSIS)
     async def evaluate_data_analysis(self, request: DataAnalysisRequest) -> DataAnalysisEvaluationResponse:
-        scenario_info = self.get_analysis_scenario(request.analysis_type)
-        
-        evaluation_prompt = f"""
-        You are evaluating a data analysis and visualization assessment for AI literacy.
-        
-        SCENARIO: {scenario_info['title']}
-        DESCRIPTION: {scenario_info['description']}
-        DATA CONTEXT: {scenario_info['dataset_context']}
-        BUSINESS CONTEXT: {scenario_info['scenario']}
-        ANALYSIS QUESTION: {scenario_info['prompt']}
-        
-        USER'S APPROACH:
-        {request.user_approach}
-        
-        EVALUATION FRAMEWORK:
-        Analyze the user's response to determine their AI data analysis literacy:
-        
-        EXPLORER LEVEL (0-50%): Basic/manual approaches
-        - Examples: "I'd manually calculate totals per branch and make basic charts in Excel"
-        - Shows minimal or NO awareness of AI tools for data analysis
-        - Manual processes, basic Excel without AI features
-        - No mention of automation or AI assistance
-        
-        PRACTITIONER LEVEL (51-75%): Some AI-assisted tools mentioned
-        - Examples: "I'd use Excel or Power BI with AI/Copilot to summarize deposits/withdrawals, calculate branch performance, and create visual charts"
-        - Must mention specific AI tools like Copilot, Power BI AI features
-        - Shows some understanding of AI-enhanced analysis
-        
-        INNOVATOR LEVEL (76-100%): Advanced AI integration and automation
-        - Examples: "I'd automate data cleaning, generate AI-driven insights on branch performance and trends, create interactive dashboards, and flag anomalies or unusual transactions automatically"
-        - Must mention automation, AI-driven insights, anomaly detection
-        - Shows sophisticated understanding of AI-powered analytics and automation
-        
-        STRICT SCORING RULES:
-        - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
-        - If NO AI tools mentioned: Maximum 25% on all criteria
-        - If only basic Excel mentioned: Maximum 35% on all criteria  
-        - If mentions "AI" but no specific tools: Maximum 45% on all criteria
-        - If mentions specific AI tools (Copilot, Power BI AI): Can score 60-75%
-        - If mentions automation + AI insights + anomaly detection: Can score 76-100%
-        - Random or very short responses: Maximum 10% on all criteria
-        
-        CRITICAL: Check response length and meaningfulness:
-        - Responses under 10 characters or single words: Maximum 5%
-        - Responses like "okay", "yes", "good", "fine": Maximum 5%
-        - Responses under 50 characters with no substance: Maximum 15%
-        
-        EVALUATION CRITERIA (score each out of 100):
-        1. Data Understanding: How well does the user understand the dataset and business context?
-        2. Analytical Approach: Is the analytical methodology sound and appropriate for the problem?
-        3. AI Tool Usage: How effectively are AI tools integrated into the analysis workflow?
-        4. Visualization Quality: Are the proposed visualizations clear, relevant, and insightful?
-        5. Insights Generation: Does the approach lead to actionable business insights?
-        
-        Please respond in this exact JSON format:
-        {{
-            "data_understanding": <score 0-100>,
-            "analytical_approach": <score 0-100>,
-            "ai_tool_usage": <score 0-100>,
-            "visualization_quality": <score 0-100>,
-            "insights_generation": <score 0-100>,
-            "feedback": "<detailed feedback about the data analysis approach and AI usage>",
-            "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
-            "insight_quality": "<Excellent/Good/Fair/Needs Improvement>",
-            "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
-            "grade_justification": "<explanation of the overall grade>"
-        }}
-        """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a data analysis and business intelligence expert evaluating AI-powered analytical approaches. Always respond with valid JSON."},
-                {"role": "user", "content": evaluation_prompt}
-            ],
+        template = self.get_template(request.analysis_type)
+        
+        output = await cascade_structured(
+            DataAnalysisEvaluationOutput,
+            DataAnalysisCriteria,
+            GRADE_BOUNDARIES,
+            operation=template.name,
+            model=self.model,
+            messages=template.messages(submission=request.user_approach),
             temperature=0.3,
             max_tokens=1500
         )
-        
-        result = json.loads(response.choices[0].message.content)
+        result = output.model_dump()
         
         criteria_scores = {
             "data_understanding": result["data_understanding"],
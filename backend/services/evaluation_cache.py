@@ -0,0 +1,258 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+from dotenv import load_dotenv
+from models.assessment import AssessmentType
+from services.similarity_index import similarity_index
+from services.submissions import submission_parts, normalize_text
+from services.token_usage import current_evaluation_usage, mark_fallback_evaluation
+from services.tracing import span
+
+# Load environment variables
+load_dotenv()
+
+# Set by evaluators when a result came from a fallback path and must not be reused
+_cache_state: ContextVar[Optional[dict]] = ContextVar("evaluation_cache_state", default=None)
+
+
+def mark_uncacheable():
+    """Prevent the evaluation currently in progress from being stored in the cache"""
+    state = _cache_state.get()
+    if state is not None:
+        state["cacheable"] = False
+
+
+class EvaluationCache:
+    """Content-addressed LRU/TTL cache of evaluation results with an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.enabled = max_entries > 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> Future shared by concurrent identical submissions
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes_since_purge = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, assessment_type: AssessmentType, scenario_id: str, submission: str,
+                 prompt_version: str, model: str) -> str:
+        """Hash the normalized submission together with everything that affects its grade"""
+        material = json.dumps(
+            [assessment_type.value, scenario_id, normalize_text(submission), prompt_version, model],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self.db_path:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                self._remember(key, value, expires_at)
+                self.disk_hits += 1
+                return value
+
+        return None
+
+    async def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def clear(self):
+        self._entries.clear()
+        if self.db_path:
+            with self._db_lock:
+                self._connection().execute("DELETE FROM evaluation_cache")
+                self._connection().commit()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits + self.coalesced
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_enabled": bool(self.db_path),
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            # Several API workers may write the same file; wait for their locks rather than failing
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS evaluation_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key: str, now: float):
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT expires_at, value FROM evaluation_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_set(self, key: str, value: dict, expires_at: float):
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO evaluation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._writes_since_purge += 1
+            if self._writes_since_purge >= 500:
+                db.execute("DELETE FROM evaluation_cache WHERE expires_at <= ?", (time.time(),))
+                self._writes_since_purge = 0
+            db.commit()
+
+
+evaluation_cache = EvaluationCache(
+    max_entries=int(os.getenv("EVALUATION_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("EVALUATION_CACHE_TTL", "86400")),
+    db_path=os.getenv("EVALUATION_CACHE_DB") or os.getenv("SHARED_STATE_DB") or None
+)
+
+
+def cached_evaluation(assessment_type: AssessmentType):
+    """Wrap an evaluate_* method so identical submissions reuse a previous result
+
+    With SIMILAR_REUSE_ENABLED, a free-text submission (SIMILAR_REUSE_TYPES) that misses the exact cache but
+    is nearly identical to an already graded one for the same scenario, prompt version and model reuses
+    that grade as well.
+    """
+    def decorator(func):
+        response_model = func.__annotations__["return"]
+
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            if not evaluation_cache.enabled:
+                return await func(self, request)
+
+            scenario_id, submission = submission_parts(assessment_type, request)
+            key = evaluation_cache.make_key(assessment_type, scenario_id, submission, self.prompt_version, self.model)
+
+            with span("cache.lookup") as lookup:
+                cached = await evaluation_cache.get(key)
+                lookup.set(hit=cached is not None)
+            if cached is not None:
+                return response_model.model_validate(cached)
+
+            # Double-clicks and retries arrive together: wait for the evaluation already running
+            pending = evaluation_cache._inflight.get(key)
+            if pending is not None:
+                evaluation_cache.coalesced += 1
+            while pending is not None:
+                try:
+                    with span("cache.coalesced"):
+                        value, cacheable, fallback = await asyncio.shield(pending)
+                    # Whatever kept the leader's result out of the cache and the results store applies to this copy too
+                    if not cacheable:
+                        mark_uncacheable()
+                    if fallback:
+                        mark_fallback_evaluation()
+                    return response_model.model_validate(value)
+                except asyncio.CancelledError:
+                    # The leading request was cancelled (e.g. its client disconnected), not this one:
+                    # the first waiter to wake up evaluates the submission and the rest wait for it
+                    if not pending.cancelled() or asyncio.current_task().cancelling():
+                        raise
+                pending = evaluation_cache._inflight.get(key)
+
+            evaluation_cache.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            evaluation_cache._inflight[key] = future
+            state = {"cacheable": True}
+            token = _cache_state.set(state)
+            scope = (assessment_type.value, scenario_id, self.prompt_version, self.model)
+            vector = similar = None
+            try:
+                if similarity_index.applies_to(assessment_type.value):
+                    with span("cache.similar") as lookup:
+                        vector = similarity_index.vector(submission)
+                        similar = similarity_index.match(scope, vector)
+                        lookup.set(hit=similar is not None, similarity=round(similar[0], 4) if similar else None)
+                if similar is not None and not similarity_index.should_audit():
+                    similarity_index.record_lookup(assessment_type.value, "reused")
+                    result = response_model.model_validate(similar[1])
+                    # Already indexed; keeping one vector per graded submission keeps reuse from chaining
+                    vector = None
+                else:
+                    result = await func(self, request)
+                    if similar is not None:
+                        similarity_index.record_lookup(assessment_type.value, "audited")
+                        similarity_index.record_drift(similar[1]["score"], result.score)
+                    elif vector is not None:
+                        similarity_index.record_lookup(assessment_type.value, "miss")
+                value = result.model_dump(mode="json")
+                usage = current_evaluation_usage()
+                future.set_result((value, state["cacheable"], usage is not None and usage.fallback))
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Nobody else may be waiting; don't warn about an unretrieved exception
+                future.exception()
+                raise
+            finally:
+                _cache_state.reset(token)
+                del evaluation_cache._inflight[key]
+
+            if state["cacheable"]:
+                await evaluation_cache.set(key, value)
+                if vector is not None:
+                    similarity_index.add(scope, vector, value)
+            return result
+
+        return wrapper
+    return decorator
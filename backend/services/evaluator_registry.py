@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Tuple, Type
+from pydantic import BaseModel
+from models.assessment import (
+    AssessmentType,
+    PromptRequest,
+    WritingRequest,
+    TaskManagementRequest,
+    DataAnalysisRequest,
+    PresentationRequest,
+    ProductivityRequest
+)
+from services.prompt_evaluator import PromptEvaluatorService
+from services.writing_evaluator import WritingEvaluatorService
+from services.task_management_evaluator import TaskManagementEvaluatorService
+from services.data_analysis_evaluator import DataAnalysisEvaluatorService
+from services.presentation_evaluator import PresentationEvaluatorService
+from services.productivity_evaluator import ProductivityEvaluatorService
+from services.catalog import ScenarioCatalog
+from services.openai_client import get_openai_client
+from services.prompt_templates import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Request model, service class and evaluate method for each assessment type; services are built on first use
+EVALUATORS = {
+    AssessmentType.PROMPT_ENGINEERING: (PromptRequest, PromptEvaluatorService, "evaluate_prompt"),
+    AssessmentType.WRITING_AUTOMATION: (WritingRequest, WritingEvaluatorService, "evaluate_writing"),
+    AssessmentType.TASK_MANAGEMENT: (TaskManagementRequest, TaskManagementEvaluatorService, "evaluate_task_management"),
+    AssessmentType.DATA_ANALYSIS: (DataAnalysisRequest, DataAnalysisEvaluatorService, "evaluate_data_analysis"),
+    AssessmentType.AI_PRESENTATIONS: (PresentationRequest, PresentationEvaluatorService, "evaluate_presentation"),
+    AssessmentType.WORKFLOW_AUTOMATION: (ProductivityRequest, ProductivityEvaluatorService, "evaluate_productivity"),
+}
+
+_services: Dict[AssessmentType, object] = {}
+_build_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+_warm_up_seconds = None
+
+
+def get_service(assessment_type: AssessmentType):
+    """Return the evaluator service for an assessment type, building it on first use"""
+    service = _services.get(assessment_type)
+    if service is None:
+        # Warm-up builds services in a thread while requests may already be asking for them
+        with _lock:
+            service = _services.get(assessment_type)
+            if service is None:
+                started = time.perf_counter()
+                service = EVALUATORS[assessment_type][1]()
+                _build_seconds[assessment_type.value] = time.perf_counter() - started
+                _services[assessment_type] = service
+    return service
+
+
+def get_evaluator(assessment_type: AssessmentType) -> Tuple[Type[BaseModel], Callable]:
+    """Return the request model and evaluate method for an assessment type"""
+    request_model, _, method = EVALUATORS[assessment_type]
+    return request_model, getattr(get_service(assessment_type), method)
+
+
+# Former module-level service instances, still importable and built when first accessed
+SERVICE_NAMES = {
+    "prompt_service": AssessmentType.PROMPT_ENGINEERING,
+    "writing_service": AssessmentType.WRITING_AUTOMATION,
+    "task_management_service": AssessmentType.TASK_MANAGEMENT,
+    "data_analysis_service": AssessmentType.DATA_ANALYSIS,
+    "presentation_service": AssessmentType.AI_PRESENTATIONS,
+    "productivity_service": AssessmentType.WORKFLOW_AUTOMATION,
+}
+
+
+def __getattr__(name: str):
+    if name in SERVICE_NAMES:
+        return get_service(SERVICE_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _scenarios(assessment_type: AssessmentType, attribute: str) -> Callable[[], dict]:
+    return lambda: getattr(get_service(assessment_type), attribute)
+
+
+# Scenario documents for the read-only catalog routes: (list key, items, default item id)
+scenario_catalog = ScenarioCatalog({
+    AssessmentType.WRITING_AUTOMATION: (
+        "tasks", _scenarios(AssessmentType.WRITING_AUTOMATION, "writing_tasks"), "business_email"),
+    AssessmentType.TASK_MANAGEMENT: (
+        "scenarios", _scenarios(AssessmentType.TASK_MANAGEMENT, "scenarios"), "team_workflow"),
+    AssessmentType.DATA_ANALYSIS: (
+        "scenarios", _scenarios(AssessmentType.DATA_ANALYSIS, "analysis_scenarios"), "employee_analysis"),
+    AssessmentType.AI_PRESENTATIONS: (
+        "scenarios", _scenarios(AssessmentType.AI_PRESENTATIONS, "presentation_scenarios"), "executive_briefing"),
+    AssessmentType.WORKFLOW_AUTOMATION: (
+        "scenarios", _scenarios(AssessmentType.WORKFLOW_AUTOMATION, "automation_scenarios"), "email_automation"),
+})
+
+
+def _warm_up():
+    for assessment_type in EVALUATORS:
+        get_service(assessment_type)
+    scenario_catalog.build()
+    count_tokens("")
+    started = time.perf_counter()
+    try:
+        get_openai_client()
+    except ValueError as e:
+        # Serve catalogs and pre-screened results anyway; evaluations needing the model will report the error
+        logger.warning("OpenAI client not available: %s", e)
+    _build_seconds["openai_client"] = time.perf_counter() - started
+
+
+async def warm_up():
+    """Build every service, the catalog and the shared OpenAI client off the event loop
+
+    Started in the background at startup so the app accepts requests at once; a request that arrives
+    first simply builds what it needs.
+    """
+    global _warm_up_seconds
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warm_up)
+    except Exception as e:
+        logger.error("Evaluator warm-up failed: %s", e)
+        return
+    _warm_up_seconds = time.perf_counter() - started
+    logger.info("Evaluators warmed up in %.0f ms", _warm_up_seconds * 1000)
+
+
+def registry_stats() -> dict:
+    return {
+        "services_built": sorted(assessment_type.value for assessment_type in _services),
+        "warmed_up": _warm_up_seconds is not None,
+        "warm_up_ms": round(_warm_up_seconds * 1000, 1) if _warm_up_seconds is not None else None,
+        "build_ms": {name: round(seconds * 1000, 2) for name, seconds in _build_seconds.items()}
+    }
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+# Queue of the Server-Sent Events stream the current evaluation reports progress to, if any
+_event_queue: ContextVar[Optional[asyncio.Queue]] = ContextVar("evaluation_event_queue", default=None)
+
+
+def is_streaming() -> bool:
+    """Whether the evaluation in progress has a client listening for progress events"""
+    return _event_queue.get() is not None
+
+
+def publish(event: str, data: dict):
+    """Send a progress event to the listening client; a no-op for non-streaming requests"""
+    queue = _event_queue.get()
+    if queue is not None:
+        queue.put_nowait((event, data))
+
+
+def format_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_evaluation(evaluate: Callable[..., Awaitable], request) -> AsyncIterator[str]:
+    """Run an evaluation, yielding its progress events and then the final response as SSE frames"""
+    queue = asyncio.Queue()
+
+    async def run():
+        _event_queue.set(queue)
+        return await evaluate(request)
+
+    task = asyncio.create_task(run())
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        # Flush something straight away so the client sees the first byte immediately
+        yield format_event("started", {})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield format_event(*item)
+
+        try:
+            response = task.result()
+        except Exception as e:
+            yield format_event("error", {"detail": str(e)})
+        else:
+            yield format_event("result", response.model_dump())
+    finally:
+        task.cancel()
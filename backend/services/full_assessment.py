@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import math
+from typing import Optional
+from models.assessment import AssessmentType, FullAssessmentRequest, FullAssessmentResponse
+from services.evaluator_registry import get_evaluator
+from services.llm_scheduler import LLMUnavailableError
+from services.llm_resilience import CircuitOpenError
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Request field -> assessment type, in the order the frontend walks through the steps
+STEPS = {
+    "prompt": AssessmentType.PROMPT_ENGINEERING,
+    "writing": AssessmentType.WRITING_AUTOMATION,
+    "task_management": AssessmentType.TASK_MANAGEMENT,
+    "data_analysis": AssessmentType.DATA_ANALYSIS,
+    "presentation": AssessmentType.AI_PRESENTATIONS,
+    "productivity": AssessmentType.WORKFLOW_AUTOMATION,
+}
+
+# Steps ResultsStep.calculateOverallScore counts; presentation is shown but not part of the overall score
+SCORED_STEPS = ("prompt", "writing", "task_management", "data_analysis", "productivity")
+
+# Same thresholds as the frontend's level badges
+INNOVATOR_SCORE = 75
+PRACTITIONER_SCORE = 50
+
+
+def combined_score(results: dict) -> int:
+    """The frontend's overall score: mean of the scored steps' non-zero scores, halves rounded up (Math.round)"""
+    scores = [results[field].score for field in SCORED_STEPS if field in results and results[field].score]
+    if not scores:
+        return 0
+    return math.floor(sum(scores) / len(scores) + 0.5)
+
+
+def overall_level(score: int) -> str:
+    if score >= INNOVATOR_SCORE:
+        return "Innovator"
+    if score >= PRACTITIONER_SCORE:
+        return "Practitioner"
+    return "Explorer"
+
+
+async def evaluate_all(request: FullAssessmentRequest) -> FullAssessmentResponse:
+    """Evaluate every step concurrently, so the whole assessment takes as long as its slowest step
+
+    The overall score and level are computed as in the interactive flow's results page. A step that fails,
+    or only has a provisional score, is reported in `errors` and the response has no overall score or level,
+    since leaving the step out could raise the candidate's level. If no step could be evaluated the first
+    error is raised instead.
+    """
+    async def evaluate_step(field: str):
+        _, evaluate = get_evaluator(STEPS[field])
+        return await evaluate(getattr(request, field))
+
+    with span("evaluate_all"):
+        outcomes = await asyncio.gather(*(evaluate_step(field) for field in STEPS), return_exceptions=True)
+
+    results, errors = {}, {}
+    for field, outcome in zip(STEPS, outcomes):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, Exception):
+                raise outcome
+            logger.error("Full assessment step %s failed: %s", field, outcome)
+            errors[field] = outcome
+        else:
+            results[field] = outcome
+            if outcome.provisional:
+                # Its placeholder score of 0 would otherwise just be left out of the average
+                errors[field] = CircuitOpenError("AI service is unavailable; this step only has a provisional score")
+    if not results:
+        # Prefer the retryable error so the client is told to come back later
+        raise next((e for e in errors.values() if isinstance(e, LLMUnavailableError)), next(iter(errors.values())))
+
+    overall_score: Optional[int] = None if errors else combined_score(results)
+    return FullAssessmentResponse(
+        overall_score=overall_score,
+        level=overall_level(overall_score) if overall_score is not None else None,
+        errors={field: str(error) for field, error in errors.items()},
+        **results
+    )
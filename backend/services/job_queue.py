@@ -0,0 +1,349 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+from models.assessment import AssessmentType, EvaluationJob, JobStatus
+from services.evaluator_registry import get_evaluator
+from services.llm_scheduler import LLMUnavailableError
+from services.llm_resilience import llm_resilience
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "inprocess" runs workers inside the API process; "external" leaves jobs for `python worker.py` processes
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "inprocess").lower()
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+# External workers and multi-process API deployments need a store shared between processes
+JOB_STORE_DB = os.getenv("JOB_STORE_DB") or os.getenv("SHARED_STATE_DB") or None
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+# Running jobs older than this are assumed orphaned by a crashed worker and handed out again
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+# On shutdown running jobs get this long to finish before they are handed back to the queue
+JOB_DRAIN_SECONDS = float(os.getenv("JOB_DRAIN_SECONDS", "30"))
+# Jobs whose evaluation found the provider unavailable are queued again after a growing delay, this many times
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+
+
+class InMemoryJobStore:
+    """Jobs kept in this process; fine for a single API process with in-process workers"""
+
+    def __init__(self, retention_seconds: float = 86400):
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Tuple[EvaluationJob, dict]] = {}
+        self._queued = deque()
+        self._delayed = []  # heap of (available_at, job id) for jobs retried later
+        self._finished = deque()  # (finished_at, job id) in completion order, for expiry
+
+    async def create(self, job: EvaluationJob, request: dict):
+        self._jobs[job.id] = (job, request)
+        self._queued.append(job.id)
+        self._expire()
+
+    async def get(self, job_id: str) -> Optional[EvaluationJob]:
+        entry = self._jobs.get(job_id)
+        return entry[0].model_copy() if entry is not None else None
+
+    async def claim(self) -> Optional[Tuple[EvaluationJob, dict]]:
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._queued.append(heapq.heappop(self._delayed)[1])
+        while self._queued:
+            entry = self._jobs.get(self._queued.popleft())
+            if entry is not None:
+                job, request = entry
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                return job.model_copy(), request
+        return None
+
+    async def finish(self, job: EvaluationJob):
+        self._jobs[job.id] = (job, {})
+        self._finished.append((job.finished_at, job.id))
+
+    async def requeue(self, job_id: str):
+        entry = self._jobs.get(job_id)
+        if entry is not None and entry[0].status == JobStatus.RUNNING:
+            entry[0].status = JobStatus.QUEUED
+            entry[0].started_at = None
+            self._queued.appendleft(job_id)
+
+    async def retry(self, job: EvaluationJob, delay: float):
+        entry = self._jobs.get(job.id)
+        if entry is not None and entry[0].status == JobStatus.RUNNING:
+            entry[0].status = JobStatus.QUEUED
+            entry[0].started_at = None
+            entry[0].attempts = job.attempts
+            heapq.heappush(self._delayed, (time.time() + delay, job.id))
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        while self._finished and self._finished[0][0] < cutoff:
+            self._jobs.pop(self._finished.popleft()[1], None)
+
+    async def stats(self) -> dict:
+        counts = {}
+        for job, _ in self._jobs.values():
+            counts[job.status.value] = counts.get(job.status.value, 0) + 1
+        return {"backend": "memory", "jobs": counts}
+
+
+class SQLiteJobStore:
+    """Jobs in a SQLite WAL database shared by the API and external worker processes"""
+
+    def __init__(self, db_path: str, retention_seconds: float = 86400, timeout_seconds: float = 600):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self.timeout_seconds = timeout_seconds
+        self._db = None
+        self._lock = threading.Lock()
+        self._claims_since_purge = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS evaluation_jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, request TEXT NOT NULL, status TEXT NOT NULL, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL)"
+            )
+            # Stores created before jobs were retried lack the retry columns
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(evaluation_jobs)")}
+            if "attempts" not in columns:
+                self._db.execute("ALTER TABLE evaluation_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+                self._db.execute("ALTER TABLE evaluation_jobs ADD COLUMN available_at REAL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS evaluation_jobs_status ON evaluation_jobs (status, created_at)")
+        return self._db
+
+    @staticmethod
+    def _job(row) -> EvaluationJob:
+        return EvaluationJob(
+            id=row[0], type=AssessmentType(row[1]), status=JobStatus(row[2]),
+            result=json.loads(row[3]) if row[3] else None, error=row[4],
+            created_at=row[5], started_at=row[6], finished_at=row[7], attempts=row[8]
+        )
+
+    def _create(self, job: EvaluationJob, request: dict):
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO evaluation_jobs (id, type, request, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job.id, job.type.value, json.dumps(request), job.status.value, job.created_at)
+            )
+
+    def _get(self, job_id: str) -> Optional[EvaluationJob]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, type, status, result, error, created_at, started_at, finished_at, attempts "
+                "FROM evaluation_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._job(row) if row is not None else None
+
+    def _claim(self) -> Optional[Tuple[EvaluationJob, dict]]:
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            # BEGIN IMMEDIATE takes the write lock so two workers can't claim the same job
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id, type, status, result, error, created_at, started_at, finished_at, attempts, request "
+                    "FROM evaluation_jobs WHERE (status = ? AND (available_at IS NULL OR available_at <= ?)) "
+                    "OR (status = ? AND started_at < ?) ORDER BY created_at LIMIT 1",
+                    (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now - self.timeout_seconds)
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE evaluation_jobs SET status = ?, started_at = ? WHERE id = ?",
+                        (JobStatus.RUNNING.value, now, row[0])
+                    )
+                self._claims_since_purge += 1
+                if self._claims_since_purge >= 500:
+                    db.execute(
+                        "DELETE FROM evaluation_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                        (now - self.retention_seconds,)
+                    )
+                    self._claims_since_purge = 0
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._job(row)
+        job.status = JobStatus.RUNNING
+        job.started_at = now
+        return job, json.loads(row[9])
+
+    def _finish(self, job: EvaluationJob):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE evaluation_jobs SET status = ?, result = ?, error = ?, finished_at = ?, attempts = ? WHERE id = ?",
+                (job.status.value, json.dumps(job.result) if job.result is not None else None,
+                 job.error, job.finished_at, job.attempts, job.id)
+            )
+
+    def _requeue(self, job_id: str):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE evaluation_jobs SET status = ?, started_at = NULL WHERE id = ? AND status = ?",
+                (JobStatus.QUEUED.value, job_id, JobStatus.RUNNING.value)
+            )
+
+    def _retry(self, job: EvaluationJob, delay: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE evaluation_jobs SET status = ?, started_at = NULL, attempts = ?, available_at = ? "
+                "WHERE id = ? AND status = ?",
+                (JobStatus.QUEUED.value, job.attempts, time.time() + delay, job.id, JobStatus.RUNNING.value)
+            )
+
+    def _stats(self) -> dict:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM evaluation_jobs GROUP BY status"
+            ).fetchall()
+        return {"backend": "sqlite", "jobs": dict(rows)}
+
+    async def create(self, job: EvaluationJob, request: dict):
+        await asyncio.to_thread(self._create, job, request)
+
+    async def get(self, job_id: str) -> Optional[EvaluationJob]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def claim(self) -> Optional[Tuple[EvaluationJob, dict]]:
+        return await asyncio.to_thread(self._claim)
+
+    async def finish(self, job: EvaluationJob):
+        await asyncio.to_thread(self._finish, job)
+
+    async def requeue(self, job_id: str):
+        await asyncio.to_thread(self._requeue, job_id)
+
+    async def retry(self, job: EvaluationJob, delay: float):
+        await asyncio.to_thread(self._retry, job, delay)
+
+    async def stats(self) -> dict:
+        return await asyncio.to_thread(self._stats)
+
+
+def create_job_store():
+    if JOB_STORE_DB:
+        return SQLiteJobStore(JOB_STORE_DB, JOB_RETENTION_SECONDS, JOB_TIMEOUT_SECONDS)
+    if JOB_WORKER_MODE == "external":
+        raise ValueError("JOB_WORKER_MODE=external needs JOB_STORE_DB so workers can share the job store")
+    return InMemoryJobStore(JOB_RETENTION_SECONDS)
+
+
+job_store = create_job_store()
+
+
+class JobRunner:
+    """Pool of asyncio workers that evaluate queued jobs with the shared evaluator services"""
+
+    def __init__(self, store, workers: int):
+        self.store = store
+        self.workers = workers
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def submit(self, assessment_type: AssessmentType, request: dict) -> EvaluationJob:
+        job = EvaluationJob(id=uuid.uuid4().hex, type=assessment_type, status=JobStatus.QUEUED, created_at=time.time())
+        await self.store.create(job, request)
+        self._wakeup.set()
+        return job
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, drain_seconds: float = JOB_DRAIN_SECONDS):
+        """Stop claiming jobs and let running ones finish; any still running after `drain_seconds` are requeued"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=drain_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._stopping = False
+
+    async def _work(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            claimed = await self.store.claim()
+            if claimed is None:
+                # Submissions in this process wake workers at once; jobs from other processes are polled
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run(*claimed)
+
+    async def run(self, job: EvaluationJob, request: dict):
+        try:
+            request_model, evaluate = get_evaluator(job.type)
+            response = await evaluate(request_model.model_validate(request))
+            if response.provisional:
+                # Scored locally while the circuit breaker is open; the job is for the real grade
+                raise LLMUnavailableError("AI service is unavailable", llm_resilience.breaker.retry_after())
+            job.status = JobStatus.COMPLETED
+            job.result = response.model_dump(mode="json")
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Interrupted by shutdown: hand the job back so another worker evaluates it
+            await self.store.requeue(job.id)
+            raise
+        except LLMUnavailableError as e:
+            # Provider bursts are what the job API absorbs: try again later rather than failing the job
+            job.attempts += 1
+            if job.attempts < JOB_MAX_ATTEMPTS:
+                delay = min(JOB_RETRY_MAX_DELAY, max(e.retry_after, JOB_RETRY_DELAY * 2 ** (job.attempts - 1)))
+                logger.warning("Job %s found the AI service unavailable, retrying in %.1fs (attempt %d of %d)",
+                               job.id, delay, job.attempts, JOB_MAX_ATTEMPTS)
+                await self.store.retry(job, delay)
+                self.retried += 1
+                return
+            logger.error("Job %s failed after %d attempts: %s", job.id, job.attempts, e)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            self.failed += 1
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.id, e)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            self.failed += 1
+        job.finished_at = time.time()
+        await self.store.finish(job)
+
+    async def stats(self) -> dict:
+        return {
+            "mode": JOB_WORKER_MODE,
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            **await self.store.stats()
+        }
+
+
+job_runner = JobRunner(job_store, JOB_WORKERS)
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+from typing import AsyncIterator, Optional, Type, TypeVar
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+from services.openai_client import create_chat_completion
+from services.event_stream import is_streaming
+from services.metrics import output_parses, service_name
+from services.tracing import span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "json_schema" constrains output to the evaluator's model, "json_object" only to valid JSON, "none" sends nothing
+RESPONSE_FORMAT = os.getenv("OPENAI_RESPONSE_FORMAT", "json_object").lower()
+REPAIR_RETRY_ENABLED = os.getenv("JSON_REPAIR_RETRY", "true").lower() == "true"
+
+OutputModel = TypeVar("OutputModel", bound=BaseModel)
+
+_ESCAPED_CONTROL_CHARS = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+REPAIR_SYSTEM_PROMPT = (
+    "You fix malformed JSON. Return only the corrected JSON object, keeping every value the original "
+    "contains and adding any missing fields required by the schema. Always respond with valid JSON."
+)
+
+
+class OutputParseError(json.JSONDecodeError):
+    """A completion that could not be parsed or validated into the expected output model"""
+
+
+class IncrementalJSONParser:
+    """Single-pass parser that extracts the first JSON object from text fed in chunks
+
+    Text before the object (prose, code fences) and after it is ignored, raw control characters inside
+    strings are escaped and trailing commas are dropped, so the common model quirks need no re-parse.
+    """
+
+    def __init__(self):
+        self._chars = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._seen = []
+        self.complete = False
+
+    def feed(self, text: str) -> bool:
+        """Consume the next chunk of text, returning True once the top-level object is closed"""
+        if self.complete:
+            return True
+        self._seen.append(text)
+        chars = self._chars
+        for char in text:
+            if self._depth == 0 and char != "{":
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                elif char < " ":
+                    char = _ESCAPED_CONTROL_CHARS.get(char, "")
+                chars.append(char)
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._drop_trailing_comma()
+                self._depth -= 1
+            chars.append(char)
+            if self._depth == 0:
+                self.complete = True
+                return True
+        return False
+
+    def _drop_trailing_comma(self):
+        index = len(self._chars) - 1
+        while index >= 0 and self._chars[index].isspace():
+            index -= 1
+        if index >= 0 and self._chars[index] == ",":
+            del self._chars[index]
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, for error reports and repair prompts"""
+        return "".join(self._seen)
+
+    def result(self) -> dict:
+        document = "".join(self._chars)
+        if not self.complete:
+            raise OutputParseError("Incomplete JSON object in model response", self.text, len(self.text))
+        try:
+            value = json.loads(document)
+        except json.JSONDecodeError as e:
+            raise OutputParseError(e.msg, document, e.pos)
+        if not isinstance(value, dict):
+            raise OutputParseError("Model response is not a JSON object", document, 0)
+        return value
+
+
+def parse_output(text: Optional[str], output_model: Type[OutputModel]) -> OutputModel:
+    """Parse a complete model response and validate it into `output_model`"""
+    parser = IncrementalJSONParser()
+    parser.feed(text or "")
+    return validate_output(parser, output_model)
+
+
+def validate_output(parser: IncrementalJSONParser, output_model: Type[OutputModel]) -> OutputModel:
+    with span("llm.parse", model=output_model.__name__):
+        value = parser.result()
+        try:
+            return output_model.model_validate(value)
+        except ValidationError as e:
+            raise OutputParseError(f"Response does not match {output_model.__name__}: {e}", parser.text, 0)
+
+
+async def parse_stream(stream: AsyncIterator, output_model: Type[OutputModel]) -> OutputModel:
+    """Parse a streamed completion as its chunks arrive instead of buffering the whole text"""
+    parser = IncrementalJSONParser()
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parser.feed(chunk.choices[0].delta.content)
+    return validate_output(parser, output_model)
+
+
+def output_schema(output_model: Type[BaseModel]) -> dict:
+    """JSON schema for strict structured output: every field required, no extra fields"""
+    schema = output_model.model_json_schema()
+    schema["required"] = list(schema["properties"])
+    schema["additionalProperties"] = False
+    for field in schema["properties"].values():
+        field.pop("default", None)
+        field.pop("title", None)
+    return schema
+
+
+def response_format(output_model: Type[BaseModel]) -> Optional[dict]:
+    if RESPONSE_FORMAT == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": output_model.__name__, "schema": output_schema(output_model), "strict": True}
+        }
+    if RESPONSE_FORMAT == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+class ParseStats:
+    """Counts how model responses were turned into output models"""
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, operation: str, outcome: str):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        output_parses.inc(service_name(operation), outcome)
+
+    def stats(self) -> dict:
+        total = self.parsed + self.repaired + self.failed
+        return {
+            "response_format": RESPONSE_FORMAT,
+            "parsed": self.parsed,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "repair_rate": round(self.repaired / total, 4) if total else 0.0
+        }
+
+
+parse_stats = ParseStats()
+
+
+async def complete_structured(output_model: Type[OutputModel], operation: str, **kwargs) -> OutputModel:
+    """Run a chat completion and return its response validated into `output_model`
+
+    A response that fails to parse gets one cheap repair call that only fixes the JSON, instead of
+    failing the request or re-running the whole evaluation.
+    """
+    format_ = response_format(output_model)
+    if format_ is not None:
+        kwargs.setdefault("response_format", format_)
+    try:
+        if is_streaming():
+            stream = await create_chat_completion(operation=operation, stream=True, **kwargs)
+            result = await parse_stream(stream, output_model)
+        else:
+            response = await create_chat_completion(operation=operation, **kwargs)
+            result = parse_output(response.choices[0].message.content, output_model)
+        parse_stats.record(operation, "parsed")
+        return result
+    except OutputParseError as e:
+        if not REPAIR_RETRY_ENABLED:
+            parse_stats.record(operation, "failed")
+            raise
+        logger.warning("Repairing %s response: %s", operation, e.msg)
+        try:
+            with span("llm.repair", error=e.msg):
+                result = await repair_output(e, output_model, operation, kwargs)
+        except OutputParseError:
+            parse_stats.record(operation, "failed")
+            raise
+        parse_stats.record(operation, "repaired")
+        return result
+
+
+async def repair_output(error: OutputParseError, output_model: Type[OutputModel], operation: str,
+                        kwargs: dict) -> OutputModel:
+    # Only the broken response and the schema are sent, not the rubric and submission again
+    repair_kwargs = {"max_tokens": kwargs["max_tokens"]} if "max_tokens" in kwargs else {}
+    if RESPONSE_FORMAT != "none":
+        repair_kwargs["response_format"] = {"type": "json_object"}
+    response = await create_chat_completion(
+        operation=f"{operation}:repair",
+        model=kwargs["model"],
+        messages=[
+            {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+            {"role": "user", "content": (
+                f"SCHEMA:\n{json.dumps(output_schema(output_model))}\n\n"
+                f"ERROR: {error.msg}\n\nMALFORMED JSON:\n{error.doc}"
+            )}
+        ],
+        temperature=0,
+        **repair_kwargs
+    )
+    return parse_output(response.choices[0].message.content, output_model)
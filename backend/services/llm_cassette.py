@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from services.llm_scheduler import LLMUnavailableError
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "record" saves every completion with its latency; "replay" serves them back without calling the provider
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.sqlite3")
+# Replayed latency relative to the recorded one: 1 is as recorded, 0 replays instantly
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1"))
+
+# Stream options only shape the provider's transport, not the completion
+UNFINGERPRINTED_FIELDS = ("stream_options",)
+
+
+class CassetteMissError(LLMUnavailableError):
+    """Replay was asked for a completion that was never recorded"""
+
+
+def fingerprint(kwargs: dict) -> str:
+    """Hash of everything in a completion request that affects its result"""
+    material = {key: value for key, value in kwargs.items() if key not in UNFINGERPRINTED_FIELDS}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMCassette:
+    """Records completions to a SQLite file and replays them with their original, scaled latency
+
+    Identical requests are recorded in order and replayed in the same order, cycling when a run makes
+    more of them than were recorded. Streamed completions keep the timing of every chunk.
+    """
+
+    def __init__(self, mode: str, db_path: str, latency_scale: float):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"LLM_CASSETTE_MODE must be off, record or replay, not {mode!r}")
+        self.mode = mode
+        self.db_path = db_path
+        self.latency_scale = latency_scale
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        self._recordings: Optional[Dict[str, List[tuple]]] = None  # fingerprint -> [(kind, latency, body)]
+        self._counts: Dict[str, int] = {}  # fingerprint -> requests seen in this process
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def active(self) -> bool:
+        """Recording or replaying: a run must then request the same completions every time"""
+        return self.mode != "off"
+
+    def wrap(self, create: Callable[[], Awaitable], operation: str, kwargs: dict) -> Callable[[], Awaitable]:
+        """The provider call to make for a completion request: the real one, recorded, or a replay"""
+        if self.mode == "off":
+            return create
+        key = fingerprint(kwargs)
+        if self.mode == "record":
+            return lambda: self._record(create, key, operation, kwargs)
+        return lambda: self._replay(key, operation)
+
+    async def _record(self, create: Callable[[], Awaitable], key: str, operation: str, kwargs: dict):
+        started = time.monotonic()
+        response = await create()
+        if kwargs.get("stream"):
+            return self._record_stream(response, key, operation, kwargs, started)
+        await self._save(key, operation, kwargs.get("model", ""), "completion", time.monotonic() - started,
+                         response.model_dump_json())
+        return response
+
+    async def _record_stream(self, stream, key: str, operation: str, kwargs: dict, started: float):
+        chunks = []
+        async for chunk in stream:
+            chunks.append([time.monotonic() - started, chunk.model_dump_json()])
+            yield chunk
+        latency = chunks[-1][0] if chunks else time.monotonic() - started
+        await self._save(key, operation, kwargs.get("model", ""), "stream", latency, json.dumps(chunks))
+
+    async def _save(self, key: str, operation: str, model: str, kind: str, latency: float, body: str):
+        await asyncio.to_thread(self._insert, key, operation, model, kind, latency, body)
+        self.recorded += 1
+
+    def _insert(self, key: str, operation: str, model: str, kind: str, latency: float, body: str):
+        with self._db_lock:
+            db = self._connection()
+            # Identical requests are numbered so replays can serve their answers in the same order; one
+            # statement, so workers recording into the same file can't take the same number
+            db.execute(
+                "INSERT INTO llm_cassette (fingerprint, sequence, operation, model, kind, latency, body) "
+                "SELECT ?, COUNT(*), ?, ?, ?, ?, ? FROM llm_cassette WHERE fingerprint = ?",
+                (key, operation, model, kind, latency, zlib.compress(body.encode("utf-8")), key)
+            )
+            db.commit()
+
+    async def _replay(self, key: str, operation: str):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk  # already loaded with the SDK
+
+        recordings = (await self._recorded()).get(key)
+        if not recordings:
+            self.misses += 1
+            logger.error("No recorded completion for %s request %s in %s", operation, key[:12], self.db_path)
+            raise CassetteMissError(f"No recorded completion for this {operation} request", 1.0)
+        occurrence = self._counts.get(key, 0)
+        self._counts[key] = occurrence + 1
+        kind, latency, body = recordings[occurrence % len(recordings)]
+        self.replayed += 1
+        if kind == "stream":
+            return self._replay_stream(json.loads(body), ChatCompletionChunk)
+        await asyncio.sleep(latency * self.latency_scale)
+        return ChatCompletion.model_validate_json(body)
+
+    async def _replay_stream(self, chunks: List[list], chunk_model):
+        started = time.monotonic()
+        for offset, chunk in chunks:
+            delay = offset * self.latency_scale - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk_model.model_validate_json(chunk)
+
+    async def _recorded(self) -> Dict[str, List[tuple]]:
+        if self._recordings is None:
+            async with self._load_lock:
+                if self._recordings is None:
+                    self._recordings = await asyncio.to_thread(self._load)
+                    logger.info("Replaying %d recorded completions from %s",
+                                sum(len(recordings) for recordings in self._recordings.values()), self.db_path)
+        return self._recordings
+
+    def _load(self) -> Dict[str, List[tuple]]:
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"LLM cassette {self.db_path} does not exist; record one first")
+        recordings: Dict[str, List[tuple]] = {}
+        with self._db_lock:
+            rows = self._connection().execute(
+                "SELECT fingerprint, kind, latency, body FROM llm_cassette ORDER BY fingerprint, sequence"
+            ).fetchall()
+        for key, kind, latency, body in rows:
+            recordings.setdefault(key, []).append((kind, latency, zlib.decompress(body).decode("utf-8")))
+        return recordings
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            # Several API workers may record into the same file
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cassette ("
+                "fingerprint TEXT NOT NULL, sequence INTEGER NOT NULL, operation TEXT NOT NULL, model TEXT NOT NULL, "
+                "kind TEXT NOT NULL, latency REAL NOT NULL, body BLOB NOT NULL, PRIMARY KEY (fingerprint, sequence))"
+            )
+            self._db.commit()
+        return self._db
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "path": self.db_path if self.mode != "off" else None,
+            "latency_scale": self.latency_scale,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses
+        }
+
+
+llm_cassette = LLMCassette(LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_LATENCY_SCALE)
@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+from services.llm_scheduler import llm_scheduler, LLMUnavailableError
+from services.metrics import registry
+from services.tracing import span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Give up on a single provider attempt (and let the scheduler retry it) after this long
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "30"))
+
+# Send a duplicate request when the first is slower than this percentile of recent calls, and use whichever
+# answers first. Hedges only go out when the rate budget has room and stay under HEDGE_MAX_RATE of calls.
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+# Also the delay used until HEDGE_MIN_SAMPLES latencies have been seen for an operation
+HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+
+# Stop calling the provider when at least BREAKER_ERROR_RATE of the calls in the last BREAKER_WINDOW seconds
+# failed; after BREAKER_COOLDOWN seconds a single probe decides whether to close again
+BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "20"))
+BREAKER_WINDOW = float(os.getenv("LLM_BREAKER_WINDOW", "60"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# "fail" answers 503 while the breaker is open; "local" answers with a provisional, locally built result
+# (prescreen.circuit_fallback) that is neither cached nor recorded as a grade
+BREAKER_FALLBACK = os.getenv("LLM_BREAKER_FALLBACK", "fail")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+hedges = registry.counter(
+    "llm_hedges_total", "Hedged completion requests by outcome (won, lost, failed, skipped_budget, skipped_rate)",
+    ["outcome"])
+breaker_transitions = registry.counter(
+    "llm_circuit_breaker_transitions_total", "Circuit breaker state changes by the state entered", ["state"])
+attempt_timeouts = registry.counter(
+    "llm_attempt_timeouts_total", "Provider attempts abandoned after LLM_ATTEMPT_TIMEOUT", ["operation"])
+
+
+class CircuitOpenError(Exception):
+    """The provider is failing and the circuit breaker is not sending it requests"""
+
+
+def provider_failure_types() -> Tuple[type, ...]:
+    import openai  # already loaded by the client making the call
+    # Rate limits and bad requests say nothing about the provider's health
+    return openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError
+
+
+class CircuitBreaker:
+    """Closed -> open on a spike in provider errors; open -> half-open after a cooldown; one probe decides"""
+
+    def __init__(self, enabled: bool, error_rate: float, min_calls: int, window: float, cooldown: float):
+        self.enabled = enabled
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (monotonic time, failed)
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.transitions: Deque[dict] = deque(maxlen=20)
+
+    def _transition(self, state: str, reason: str):
+        logger.warning("LLM circuit breaker %s -> %s (%s)", self.state, state, reason)
+        self.state = state
+        self.transitions.append({"at": time.time(), "state": state, "reason": reason})
+        breaker_transitions.inc(state)
+
+    def retry_after(self) -> float:
+        return max(1.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def reject(self):
+        self.rejected += 1
+        if BREAKER_FALLBACK == "local":
+            raise CircuitOpenError("AI service circuit breaker is open")
+        raise LLMUnavailableError("AI service is unavailable, please retry shortly", self.retry_after())
+
+    def check(self):
+        """Fail fast, before queueing for the rate budget, while the breaker is open"""
+        if self.enabled and self.state == OPEN and time.monotonic() - self._opened_at < self.cooldown:
+            self.reject()
+
+    def acquire(self) -> bool:
+        """Permission for one provider call; True means this call is the half-open probe"""
+        if not self.enabled or self.state == CLOSED:
+            return False
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._transition(HALF_OPEN, "cooldown elapsed")
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.reject()
+
+    def record(self, probe: bool, failed: Optional[bool]):
+        """Record a call's outcome; None means it ended without saying anything about the provider"""
+        if not self.enabled:
+            return
+        if probe:
+            self._probing = False
+            if failed is True:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN, "probe failed")
+            elif failed is False:
+                self._outcomes.clear()
+                self._transition(CLOSED, "probe succeeded")
+            return
+        if failed is None or self.state != CLOSED:
+            return
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        calls = len(self._outcomes)
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        if calls >= self.min_calls and failures / calls >= self.error_rate:
+            self._opened_at = now
+            self._transition(OPEN, f"{failures}/{calls} calls failed in {self.window:.0f}s")
+
+    def stats(self) -> dict:
+        calls = len(self._outcomes)
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "fallback": BREAKER_FALLBACK,
+            "window_calls": calls,
+            "window_error_rate": round(failures / calls, 4) if calls else 0.0,
+            "rejected": self.rejected,
+            "transitions": list(self.transitions)
+        }
+
+
+class LatencyTracker:
+    """Recent provider latencies per (operation, model), for the adaptive hedge delay"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._latencies: Dict[tuple, Deque[float]] = {}
+
+    def record(self, key: tuple, seconds: float):
+        self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, key: tuple) -> float:
+        latencies = self._latencies.get(key)
+        if latencies is None or len(latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_MAX_DELAY
+        ordered = sorted(latencies)
+        percentile = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, percentile))
+
+    def stats(self) -> dict:
+        return {
+            f"{operation}:{model}": round(self.hedge_delay((operation, model)), 3)
+            for operation, model in self._latencies
+        }
+
+
+class LLMResilience:
+    """Per-attempt timeouts, hedged requests and a circuit breaker around provider calls"""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(BREAKER_ENABLED, BREAKER_ERROR_RATE, BREAKER_MIN_CALLS, BREAKER_WINDOW,
+                                      BREAKER_COOLDOWN)
+        self.latency = LatencyTracker(HEDGE_WINDOW)
+        self._recent: Deque[bool] = deque(maxlen=HEDGE_WINDOW)  # whether each recent call was hedged
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+        self.timeouts = 0
+
+    def check(self):
+        self.breaker.check()
+
+    async def call(self, create: Callable[[], Awaitable], operation: str, model: str, tokens: int,
+                   hedge: bool = True):
+        """One provider attempt, run inside the scheduler's retry loop"""
+        probe = self.breaker.acquire()
+        failed = None
+        try:
+            if hedge and HEDGE_ENABLED and not probe:
+                result = await self._hedged(create, (operation, model), tokens)
+            else:
+                result = await self._timed(create, (operation, model))
+            failed = False
+            return result
+        except provider_failure_types():
+            failed = True
+            raise
+        finally:
+            self.breaker.record(probe, failed)
+
+    async def _timed(self, create: Callable[[], Awaitable], key: tuple):
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(create(), LLM_ATTEMPT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise self._timeout(key[0])
+        self.latency.record(key, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, create: Callable[[], Awaitable], key: tuple, tokens: int):
+        self.calls += 1
+        started = time.monotonic()
+        delay = self.latency.hedge_delay(key)
+        attempts = {asyncio.ensure_future(create()): started}
+        hedged = False
+        try:
+            done, pending = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                hedged = await self._start_hedge(create, attempts, delay, tokens)
+            errors = []
+            pending = set(attempts) - done
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        self.latency.record(key, time.monotonic() - attempts[task])
+                        if hedged:
+                            won = task is not next(iter(attempts))
+                            self.hedge_wins += won
+                            hedges.inc("won" if won else "lost")
+                        return task.result()
+                    errors.append(task.exception())
+                if not pending:
+                    if hedged:
+                        hedges.inc("failed")
+                    raise errors[0]
+                remaining = LLM_ATTEMPT_TIMEOUT - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise self._timeout(key[0])
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._recent.append(hedged)
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark a loser's error as seen so asyncio doesn't log it
+                    task.exception()
+            if hedged:
+                # Only one answer is used, and the caller settles the winner's usage against its own estimate
+                await llm_scheduler.refund(tokens)
+
+    async def _start_hedge(self, create: Callable[[], Awaitable], attempts: dict, delay: float, tokens: int) -> bool:
+        if sum(self._recent) >= HEDGE_MAX_RATE * max(len(self._recent), 1):
+            self.skipped += 1
+            hedges.inc("skipped_rate")
+            return False
+        # A hedge is optional work, so it never waits in the queue ahead of other callers
+        if not await llm_scheduler.try_acquire(tokens):
+            self.skipped += 1
+            hedges.inc("skipped_budget")
+            return False
+        with span("llm.hedge", after_seconds=round(delay, 3)):
+            attempts[asyncio.ensure_future(create())] = time.monotonic()
+        self.hedged += 1
+        return True
+
+    def _timeout(self, operation: str) -> Exception:
+        import openai  # already loaded by the client making the call
+        self.timeouts += 1
+        attempt_timeouts.inc(operation)
+        # A timeout is a connection error to the scheduler, so it is retried with backoff
+        return openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    def stats(self) -> dict:
+        return {
+            "attempt_timeout_seconds": LLM_ATTEMPT_TIMEOUT,
+            "timeouts": self.timeouts,
+            "hedging": {
+                "enabled": HEDGE_ENABLED,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "wins": self.hedge_wins,
+                "win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+                "skipped": self.skipped,
+                "delay_seconds": self.latency.stats()
+            },
+            "breaker": self.breaker.stats()
+        }
+
+
+llm_resilience = LLMResilience()
+
+registry.gauge("llm_circuit_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+               function=lambda: STATE_VALUES[llm_resilience.breaker.state])
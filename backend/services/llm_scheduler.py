@@ -0,0 +1,328 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+from dotenv import load_dotenv
+from services.prompt_templates import count_tokens
+from services.metrics import registry
+from services.tracing import span
+
+if TYPE_CHECKING:
+    import openai
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Budgets for the whole process, or for every process sharing LLM_BUDGET_DB; 0 (the default) disables a limit,
+# so set them to the account's provider quota to throttle before the provider starts rejecting
+RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+# SQLite file the API workers draw one rate budget from, so N workers don't get N times the provider limit
+LLM_BUDGET_DB = os.getenv("LLM_BUDGET_DB") or os.getenv("SHARED_STATE_DB") or None
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Lower values are served first
+INTERACTIVE = 0
+BATCH = 1
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(level: int):
+    """Run the enclosed completions at the given priority, e.g. BATCH for bulk work"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMUnavailableError(Exception):
+    """The provider kept rejecting a completion after every retry"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` units per minute up to one minute of burst"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available"""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        # Requests larger than the whole bucket wait for a full bucket instead of forever
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    def take(self, amount: float):
+        if self.per_minute > 0:
+            self.level -= amount
+
+    def refund(self, amount: float):
+        if self.per_minute > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class SharedRateBudget:
+    """Request and token buckets kept in a SQLite file so every worker process draws from one budget"""
+
+    def __init__(self, db_path: str, rpm_limit: int, tpm_limit: int):
+        self.db_path = db_path
+        self.limits = {"requests": rpm_limit, "tokens": tpm_limit}
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_budget (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+        return self._db
+
+    def _update(self, change: Callable[[dict, float], float]) -> float:
+        """Apply `change` to the buckets and shared pause inside one write transaction"""
+        with self._lock:
+            db = self._connection()
+            # BEGIN IMMEDIATE serialises budget updates across processes
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Wall-clock time, since the rows are shared between processes
+                now = time.time()
+                rows = {
+                    name: (level, updated)
+                    for name, level, updated in db.execute("SELECT name, level, updated FROM llm_budget")
+                }
+                buckets = {}
+                for name, per_minute in self.limits.items():
+                    bucket = buckets[name] = TokenBucket(per_minute)
+                    bucket.level, bucket.updated = rows.get(name, (bucket.capacity, now))
+                    bucket._refill(now)
+                buckets["paused_until"] = rows.get("paused_until", (0.0, now))[0]
+                result = change(buckets, now)
+                db.executemany(
+                    "INSERT OR REPLACE INTO llm_budget (name, level, updated) VALUES (?, ?, ?)",
+                    [(name, buckets[name].level, now) for name in self.limits] + [("paused_until", buckets["paused_until"], now)]
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return result
+
+    @staticmethod
+    def _reserve(buckets: dict, now: float, tokens: int) -> float:
+        delay = max(buckets["paused_until"] - now, buckets["requests"].delay(1, now), buckets["tokens"].delay(tokens, now))
+        if delay <= 0:
+            buckets["requests"].take(1)
+            buckets["tokens"].take(tokens)
+        return delay
+
+    async def reserve(self, tokens: int) -> float:
+        """Take one request and `tokens` from the budget, or return the seconds to wait before trying again"""
+        return await asyncio.to_thread(self._update, lambda buckets, now: self._reserve(buckets, now, tokens))
+
+    async def refund(self, tokens: int):
+        await asyncio.to_thread(self._update, lambda buckets, now: buckets["tokens"].refund(tokens))
+
+    async def pause(self, seconds: float):
+        def change(buckets, now):
+            buckets["paused_until"] = max(buckets["paused_until"], now + seconds)
+        await asyncio.to_thread(self._update, change)
+
+
+def completion_budget(kwargs: dict) -> int:
+    return kwargs.get("max_tokens") or 1000
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Tokens a completion can consume: its prompt plus the completion budget"""
+    prompt_tokens = sum(count_tokens(message.get("content") or "") for message in kwargs.get("messages", []))
+    return prompt_tokens + completion_budget(kwargs)
+
+
+def retry_after_seconds(error: "openai.APIStatusError") -> Optional[float]:
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff so retries from a burst spread out"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class LLMScheduler:
+    """Admits completions in priority order within the request and token budgets, retrying rejections"""
+
+    def __init__(self, rpm_limit: int, tpm_limit: int, shared_db: Optional[str] = None):
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        # With a shared budget the local buckets are unused; priority order still applies within this process
+        self.shared = SharedRateBudget(shared_db, rpm_limit, tpm_limit) if shared_db and (rpm_limit or tpm_limit) else None
+        self._queue: List[tuple] = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._paused_until = 0.0
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait(self, timeout: Optional[float]):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def acquire(self, tokens: int, priority: int):
+        """Wait until this caller is first in line and both budgets allow it"""
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._queue, entry)
+        enqueued = time.monotonic()
+        try:
+            while True:
+                timeout = None
+                if self._queue[0] == entry:
+                    timeout = await self._reserve(tokens)
+                    if timeout <= 0:
+                        break
+                await self._wait(timeout)
+        finally:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._notify()
+        waited = time.monotonic() - enqueued
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    async def _reserve(self, tokens: int) -> float:
+        now = time.monotonic()
+        if self.shared is not None:
+            local_pause = self._paused_until - now
+            if local_pause > 0:
+                return local_pause
+            return await self.shared.reserve(tokens)
+        timeout = max(self._paused_until - now, self.requests.delay(1, now), self.tokens.delay(tokens, now))
+        if timeout <= 0:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        return timeout
+
+    async def try_acquire(self, tokens: int) -> bool:
+        """Take budget for optional extra work, e.g. a hedged request, only if nobody is waiting for it"""
+        if self._queue or await self._reserve(tokens) > 0:
+            return False
+        self.admitted += 1
+        return True
+
+    def pause(self, seconds: float):
+        """Hold every queued completion back, e.g. for a provider Retry-After"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._notify()
+
+    async def run(self, call: Callable[[], Awaitable], tokens: int):
+        import openai  # already loaded by the client that made `call`
+        priority = _priority.get()
+        for attempt in range(MAX_RETRIES + 1):
+            with span("llm.queue", attempt=attempt, queue_depth=len(self._queue)):
+                await self.acquire(tokens, priority)
+            try:
+                return await call()
+            except openai.RateLimitError as e:
+                # An exhausted quota will not recover by waiting
+                if e.code == "insufficient_quota":
+                    raise
+                self.rate_limited += 1
+                delay = retry_after_seconds(e) or backoff_delay(attempt)
+                # Everyone shares the budget the provider just rejected, so pause the whole queue
+                pause = delay + random.uniform(0, 0.1 * delay)
+                self.pause(pause)
+                if self.shared is not None:
+                    await self.shared.pause(pause)
+                delay = 0.0
+                error = e
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                delay = backoff_delay(attempt)
+                error = e
+            if attempt == MAX_RETRIES:
+                break
+            self.retries += 1
+            if delay:
+                await asyncio.sleep(delay)
+        self.failed += 1
+        logger.error("Giving up on completion after %d attempts: %s", MAX_RETRIES + 1, error)
+        retry_after = max(1.0, self._paused_until - time.monotonic(), BACKOFF_BASE * 2 ** MAX_RETRIES)
+        raise LLMUnavailableError("AI service is busy, please retry shortly", min(retry_after, BACKOFF_MAX))
+
+    async def refund(self, tokens: int):
+        """Return the part of an estimate a completion did not use"""
+        if tokens > 0:
+            if self.shared is not None:
+                await self.shared.refund(tokens)
+            else:
+                self.tokens.refund(tokens)
+            self._notify()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "rpm_limit": self.requests.per_minute,
+            "tpm_limit": self.tokens.per_minute,
+            "shared_budget_db": self.shared.db_path if self.shared is not None else None,
+            "queue_depth": len(self._queue),
+            "queued_batch": sum(1 for priority, _ in self._queue if priority >= BATCH),
+            "admitted": self.admitted,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "avg_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 4),
+            "paused_seconds": round(max(0.0, self._paused_until - now), 3)
+        }
+
+
+llm_scheduler = LLMScheduler(RPM_LIMIT, TPM_LIMIT, LLM_BUDGET_DB)
+
+registry.gauge("llm_scheduler_queue_depth", "Completions waiting for the rate budget",
+               function=lambda: len(llm_scheduler._queue))
@@ -0,0 +1,229 @@
+import bisect
+import functools
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from models.assessment import AssessmentType
+from services.tracing import span
+
+# Seconds; spans cached/pre-screened answers (~ms) up to multi-call prompt evaluations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+SCORE_BUCKETS = (10, 20, 30, 40, 50, 60, 70, 75, 80, 90, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """A named family of samples keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        # Gauges backed by a function are read when /metrics is scraped rather than kept up to date
+        self._function = function
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            return self.header() + [f"{self.name} {_format_value(self._function())}"]
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        entry = self._values.get(label_values)
+        if entry is None:
+            entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, function))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"])
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled by route", ["route"])
+
+llm_requests = registry.counter(
+    "llm_requests_total", "Chat completions by service, model and outcome", ["service", "model", "status"])
+llm_request_duration = registry.histogram(
+    "llm_request_duration_seconds", "Chat completion latency including scheduling and retries", ["service", "model"])
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Tokens used by service, model and kind (prompt, cached_prompt, completion)",
+    ["service", "model", "kind"])
+
+output_parses = registry.counter(
+    "evaluation_output_parse_total", "Model responses by service and parse outcome (parsed, repaired, failed)",
+    ["service", "outcome"])
+fallbacks = registry.counter(
+    "evaluation_fallbacks_total", "Evaluations that returned a fallback result instead of a model grade",
+    ["service", "reason"])
+
+evaluations = registry.counter(
+    "evaluations_total", "Evaluations by assessment type and outcome (ok, provisional, error)",
+    ["assessment_type", "status"])
+evaluation_duration = registry.histogram(
+    "evaluation_duration_seconds", "Evaluation latency by assessment type", ["assessment_type"])
+evaluation_scores = registry.histogram(
+    "evaluation_score", "Overall scores by assessment type", ["assessment_type"], SCORE_BUCKETS)
+
+
+def service_name(operation: str) -> str:
+    """Template names are '<service>_evaluation:<scenario>'; the scenario part is dropped to bound cardinality"""
+    return operation.split(":", 1)[0]
+
+
+def record_llm_call(operation: str, model: str, seconds: float, usage=None, status: str = "ok"):
+    service = service_name(operation)
+    llm_requests.inc(service, model, status)
+    llm_request_duration.observe(seconds, service, model)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        llm_tokens.inc(service, model, "prompt", amount=usage.prompt_tokens or 0)
+        llm_tokens.inc(service, model, "cached_prompt", amount=cached)
+        llm_tokens.inc(service, model, "completion", amount=usage.completion_tokens or 0)
+
+
+def record_fallback(service: str, reason: str):
+    fallbacks.inc(service, reason)
+
+
+def observed_evaluation(assessment_type: AssessmentType):
+    """Record latency, outcome and score of an evaluate_* method, including pre-screened and cached results, and trace it"""
+    label = assessment_type.value
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            started = time.perf_counter()
+            with span(f"evaluate.{label}") as evaluation:
+                try:
+                    result = await func(self, request)
+                except Exception:
+                    evaluations.inc(label, "error")
+                    raise
+                finally:
+                    evaluation_duration.observe(time.perf_counter() - started, label)
+                evaluation.set(score=result.score)
+            if result.provisional:
+                # A placeholder score while the provider is down would drag the score distribution down
+                evaluations.inc(label, "provisional")
+                return result
+            evaluations.inc(label, "ok")
+            evaluation_scores.observe(result.score, label)
+            return result
+
+        return wrapper
+    return decorator
@@ -0,0 +1,169 @@
+import bisect
+import logging
+import os
+import random
+from typing import Dict, List, Optional, Sequence, Type
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from services.json_output import complete_structured, OutputModel
+from services.llm_cassette import llm_cassette
+from services.llm_scheduler import LLMUnavailableError
+from services.llm_resilience import CircuitOpenError
+from services.metrics import registry, service_name
+from services.token_usage import record_evaluation_model
+from services.tracing import span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cheaper models tried before a service's own model, cheapest first (e.g. "gpt-4o-mini"); empty disables the
+# cascade. MODEL_CASCADE_<SERVICE>, e.g. MODEL_CASCADE_WRITING_EVALUATION, overrides it for one service.
+MODEL_CASCADE = os.getenv("MODEL_CASCADE", "")
+# Provisional scores within this many points of a grade boundary go on to the next stage
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "5"))
+# Share of confident early results also graded by the service's own model, to keep measuring agreement
+CASCADE_AUDIT_RATE = float(os.getenv("CASCADE_AUDIT_RATE", "0.02"))
+CASCADE_LOG_EVERY = int(os.getenv("CASCADE_LOG_EVERY", "100"))
+
+# Scores where the outcome changes: the 75 "good" cutoff, and the D/C/B/A steps of the grade ladders
+PASS_BOUNDARIES = (75,)
+GRADE_BOUNDARIES = (60, 70, 75, 80, 90)
+
+cascade_stages = registry.counter(
+    "model_cascade_results_total", "Evaluation results by service and the cascade stage model that produced them",
+    ["service", "model"])
+cascade_comparisons = registry.counter(
+    "model_cascade_comparisons_total",
+    "Early-stage grades checked against the final model, by reason (escalated, audit) and whether they agreed",
+    ["service", "reason", "agreed"])
+
+
+def cascade_models(service: str, final_model: str) -> List[str]:
+    """The models a service's evaluations go through, ending with its own model"""
+    configured = os.getenv(f"MODEL_CASCADE_{service.upper()}", MODEL_CASCADE)
+    stages = [model.strip() for model in configured.split(",") if model.strip() and model.strip() != final_model]
+    return stages + [final_model]
+
+
+def overall_score(output: BaseModel, criteria_model: Type[BaseModel]) -> int:
+    scores = [getattr(output, field) for field in criteria_model.model_fields]
+    return sum(scores) // len(scores)
+
+
+def boundary_distance(score: int, boundaries: Sequence[int]) -> float:
+    return min(abs(score - boundary) for boundary in boundaries)
+
+
+def grade_band(score: int, boundaries: Sequence[int]) -> int:
+    """Scores in the same band get the same grade and pass flag"""
+    return bisect.bisect_right(boundaries, score)
+
+
+class CascadeStats:
+    """Per service: which stage produced each result, and how often early grades matched the final model"""
+
+    def __init__(self):
+        self._services: Dict[str, dict] = {}
+
+    def _service(self, service: str) -> dict:
+        return self._services.setdefault(service, {
+            "results": 0, "stages": {}, "escalated": 0, "audited": 0,
+            "compared": {"escalated": [0, 0], "audit": [0, 0]}  # reason -> [agreed, total]
+        })
+
+    def record_result(self, service: str, model: str, escalated: bool, audited: bool):
+        entry = self._service(service)
+        entry["results"] += 1
+        entry["stages"][model] = entry["stages"].get(model, 0) + 1
+        entry["escalated"] += escalated
+        entry["audited"] += audited
+        cascade_stages.inc(service, model)
+        if CASCADE_LOG_EVERY and entry["results"] % CASCADE_LOG_EVERY == 0:
+            logger.info("Model cascade %s: %s", service, self.service_stats(service))
+
+    def record_comparison(self, service: str, reason: str, agreed: bool):
+        counts = self._service(service)["compared"][reason]
+        counts[0] += agreed
+        counts[1] += 1
+        cascade_comparisons.inc(service, reason, "true" if agreed else "false")
+
+    def service_stats(self, service: str) -> dict:
+        entry = self._service(service)
+        results = entry["results"]
+        return {
+            "results": results,
+            "stage_share": {model: round(count / results, 4) for model, count in entry["stages"].items()} if results else {},
+            "escalation_rate": round(entry["escalated"] / results, 4) if results else 0.0,
+            "audited": entry["audited"],
+            **{
+                f"{reason}_agreement": round(agreed / total, 4) if total else None
+                for reason, (agreed, total) in entry["compared"].items()
+            }
+        }
+
+    def stats(self) -> dict:
+        return {
+            "default_stages": [model.strip() for model in MODEL_CASCADE.split(",") if model.strip()],
+            "margin": CASCADE_MARGIN,
+            "audit_rate": 0.0 if llm_cassette.active else CASCADE_AUDIT_RATE,
+            "services": {service: self.service_stats(service) for service in self._services}
+        }
+
+
+cascade_stats = CascadeStats()
+
+
+def should_audit() -> bool:
+    # A random audit asks for a completion that a recorded run may never have made, so replays would miss
+    return not llm_cassette.active and random.random() < CASCADE_AUDIT_RATE
+
+
+async def cascade_structured(output_model: Type[OutputModel], criteria_model: Type[BaseModel],
+                             boundaries: Sequence[int], operation: str, model: str, **kwargs) -> OutputModel:
+    """complete_structured through the service's model cascade
+
+    Each cheaper stage grades the submission first; its result is kept when the provisional score is at
+    least CASCADE_MARGIN points from every grade boundary, otherwise the next stage grades it. The last
+    stage is always `model`, so borderline grades come from the same model as without a cascade. The
+    model that produced the returned grade is recorded with the evaluation's result.
+    """
+    service = service_name(operation)
+    stages = cascade_models(service, model)
+    if len(stages) == 1:
+        return await complete_structured(output_model, operation=operation, model=model, **kwargs)
+
+    provisional: Optional[int] = None
+    audited = False
+    for stage, stage_model in enumerate(stages[:-1]):
+        with span("cascade.stage", stage=stage, model=stage_model) as current:
+            try:
+                output = await complete_structured(output_model, operation=operation, model=stage_model, **kwargs)
+            except (LLMUnavailableError, CircuitOpenError):
+                raise
+            except Exception as e:
+                # A cheap model that can't produce a usable grade is just another reason to escalate
+                logger.warning("Cascade stage %s failed for %s, escalating: %s", stage_model, operation, e)
+                current.set(outcome="failed")
+                continue
+            provisional = overall_score(output, criteria_model)
+            distance = boundary_distance(provisional, boundaries)
+            confident = distance >= CASCADE_MARGIN
+            current.set(score=provisional, boundary_distance=distance, outcome="kept" if confident else "escalated")
+        if confident:
+            if not should_audit():
+                cascade_stats.record_result(service, stage_model, escalated=stage > 0, audited=False)
+                record_evaluation_model(stage_model)
+                return output
+            audited = True
+            break
+
+    with span("cascade.stage", stage=len(stages) - 1, model=model):
+        output = await complete_structured(output_model, operation=operation, model=model, **kwargs)
+    if provisional is not None:
+        agreed = grade_band(provisional, boundaries) == grade_band(overall_score(output, criteria_model), boundaries)
+        cascade_stats.record_comparison(service, "audit" if audited else "escalated", agreed)
+    cascade_stats.record_result(service, model, escalated=not audited, audited=audited)
+    record_evaluation_model(model)
+    return output
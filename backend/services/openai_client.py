@@ -0,0 +1,115 @@
+import os
+import time
+from typing import TYPE_CHECKING
+import httpx
+from dotenv import load_dotenv
+from services.token_usage import record_usage
+from services.llm_scheduler import llm_scheduler, estimate_tokens, completion_budget
+from services.prompt_templates import count_tokens
+from services.llm_resilience import llm_resilience
+from services.llm_cassette import llm_cassette
+from services.metrics import record_llm_call
+from services.tracing import span
+
+if TYPE_CHECKING:
+    import openai
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool settings shared by every evaluator service
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+_client = None
+
+
+def get_openai_client() -> "openai.AsyncOpenAI":
+    """Return the process-wide async OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        # Imported here because the SDK takes most of a second to import and many processes never call it
+        import openai
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+        )
+        # Retries are handled by the scheduler so they respect the shared rate budget
+        _client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+    return _client
+
+
+async def create_chat_completion(operation: str = "chat", **kwargs):
+    """Run a chat completion on the shared client without blocking the event loop
+
+    `operation` names the prompt template the call was built from and is used for token accounting.
+    Calls are admitted by the shared scheduler, which enforces rate budgets and retries rejections; each
+    attempt has a timeout, is hedged when slow (unless streamed) and is refused while the circuit is open.
+    With LLM_CASSETTE_MODE the provider call itself is recorded, or replayed without a client or network.
+    """
+    client = None if llm_cassette.replaying else get_openai_client()
+    llm_resilience.check()
+    tokens = estimate_tokens(kwargs)
+    model = kwargs.get("model", "")
+    create = llm_cassette.wrap(lambda: client.chat.completions.create(**kwargs), operation, kwargs)
+    started = time.perf_counter()
+    with span("llm.completion", operation=operation, model=model, stream=bool(kwargs.get("stream"))) as call:
+        try:
+            if kwargs.get("stream"):
+                kwargs.setdefault("stream_options", {"include_usage": True})
+                stream = await llm_scheduler.run(lambda: llm_resilience.call(
+                    create, operation, model, tokens, hedge=False
+                ), tokens)
+                return _record_stream_usage(operation, model, started, stream, tokens, completion_budget(kwargs))
+            # A hedged replay would use up a second recorded answer and make the run order-dependent
+            response = await llm_scheduler.run(lambda: llm_resilience.call(
+                create, operation, model, tokens, hedge=not llm_cassette.replaying
+            ), tokens)
+        except Exception:
+            record_llm_call(operation, model, time.perf_counter() - started, status="error")
+            raise
+        if response.usage is not None:
+            call.set(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+    record_usage(operation, response.usage)
+    record_llm_call(operation, model, time.perf_counter() - started, response.usage)
+    if response.usage is not None:
+        await llm_scheduler.refund(tokens - response.usage.total_tokens)
+    return response
+
+
+async def _record_stream_usage(operation: str, model: str, started: float, stream, tokens: int, budget: int):
+    # The usage block arrives on the final chunk of a streamed completion
+    usage = None
+    streamed = []
+    try:
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+                record_usage(operation, usage)
+            for choice in getattr(chunk, "choices", None) or []:
+                streamed.append(getattr(choice.delta, "content", None) or "")
+            yield chunk
+        record_llm_call(operation, model, time.perf_counter() - started, usage)
+    finally:
+        if usage is not None:
+            await llm_scheduler.refund(tokens - usage.total_tokens)
+        else:
+            # Aborted before the usage block, e.g. the client disconnected: only the completion so far was spent
+            await llm_scheduler.refund(budget - count_tokens("".join(streamed)))
+
+
+async def close_openai_client():
+    """Close the shared client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
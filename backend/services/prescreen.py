@@ -0,0 +1,213 @@
+import functools
+import hashlib
+import logging
+import os
+import re
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from models.assessment import (
+    AssessmentType,
+    EvaluationCriteria,
+    WritingCriteria,
+    TaskManagementCriteria,
+    DataAnalysisCriteria,
+    PresentationCriteria,
+    ProductivityCriteria,
+    EvaluationResponse,
+    WritingEvaluationResponse,
+    TaskManagementEvaluationResponse,
+    DataAnalysisEvaluationResponse,
+    PresentationEvaluationResponse,
+    ProductivityEvaluationResponse
+)
+from services.submissions import submission_parts, normalize_text
+from services.copy_detection import scenario_index, submission_index, SUBMISSION_INDEX_ENABLED, Submission
+from services.llm_resilience import CircuitOpenError
+from services.metrics import record_fallback
+from services.tracing import span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+
+# Share of a submission's word shingles that may come from the scenario text before it counts as a copy
+COPY_THRESHOLD = float(os.getenv("PRESCREEN_COPY_THRESHOLD", "0.8"))
+
+# Words that carry no answer on their own ("okay", "yes", "test", ...)
+FILLER_WORDS = {
+    "ok", "okay", "yes", "no", "yeah", "sure", "good", "fine", "nice", "great", "hello", "hi", "hey",
+    "test", "testing", "abc", "123", "asdf", "qwerty", "idk", "nothing", "none", "na", "n/a", "thanks"
+}
+
+# Templated feedback for each pre-screen outcome
+FEEDBACK = {
+    "empty": "No answer was submitted, so there is nothing to evaluate. Describe your approach in a few complete sentences.",
+    "too_short": "The response is too short to show how you would approach the task. Explain the steps you would take and the AI tools you would use.",
+    "meaningless": "The response does not address the task. Describe a concrete approach, the AI tools you would use and how they improve the result.",
+    "copying": "The submission restates the question instead of answering it. Write your own instructions or approach rather than copying the task text.",
+    "unavailable": "The AI grader is temporarily unavailable, so this answer has not been evaluated yet and the score is provisional. Submit it again in a few minutes for a full evaluation."
+}
+
+SUGGESTIONS = [
+    "Describe your approach step by step",
+    "Name the specific AI tools you would use and what each one does",
+    "Explain how your approach saves time or improves quality"
+]
+
+# Response model, criteria model, pass flag, extra fields and LLM calls avoided for each assessment
+RESPONSE_SPECS = {
+    AssessmentType.PROMPT_ENGINEERING: (
+        EvaluationResponse, EvaluationCriteria, "isGoodPrompt",
+        {"answer": "No answer was generated because the prompt did not contain usable instructions."}, 2
+    ),
+    AssessmentType.WRITING_AUTOMATION: (
+        WritingEvaluationResponse, WritingCriteria, "isGoodWork", {}, 1
+    ),
+    AssessmentType.TASK_MANAGEMENT: (
+        TaskManagementEvaluationResponse, TaskManagementCriteria, "isGoodApproach",
+        {"efficiency_rating": "Needs Improvement"}, 1
+    ),
+    AssessmentType.DATA_ANALYSIS: (
+        DataAnalysisEvaluationResponse, DataAnalysisCriteria, "isGoodAnalysis",
+        {"insight_quality": "Needs Improvement", "recommended_tools": ["Microsoft Copilot in Excel", "Power BI", "ChatGPT"]}, 1
+    ),
+    AssessmentType.AI_PRESENTATIONS: (
+        PresentationEvaluationResponse, PresentationCriteria, "isGoodPresentation",
+        {"engagement_level": "Needs Improvement", "recommended_tools": ["Microsoft Copilot in PowerPoint", "Canva Magic Design", "ChatGPT"]}, 1
+    ),
+    AssessmentType.WORKFLOW_AUTOMATION: (
+        ProductivityEvaluationResponse, ProductivityCriteria, "isGoodAutomation",
+        {"efficiency_gain": "Minimal", "recommended_tools": ["Microsoft Power Automate", "Microsoft Copilot", "ChatGPT"],
+         "implementation_timeline": "Not assessed"}, 1
+    ),
+}
+
+
+class PrescreenStats:
+    """Counts how many submissions were scored locally instead of by the model"""
+
+    def __init__(self):
+        self.screened = {}  # assessment type -> count
+        self.passed = {}
+        self.reasons = {}
+        self.llm_calls_saved = 0
+
+    def record(self, assessment_type: AssessmentType, reason: Optional[str]):
+        counts = self.passed if reason is None else self.screened
+        counts[assessment_type.value] = counts.get(assessment_type.value, 0) + 1
+        if reason is not None:
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            self.llm_calls_saved += RESPONSE_SPECS[assessment_type][4]
+
+    def stats(self) -> dict:
+        screened = sum(self.screened.values())
+        total = screened + sum(self.passed.values())
+        return {
+            "screened": screened,
+            "passed_to_llm": total - screened,
+            "hit_rate": round(screened / total, 4) if total else 0.0,
+            "llm_calls_saved": self.llm_calls_saved,
+            "screened_by_type": dict(self.screened),
+            "screened_by_reason": dict(self.reasons)
+        }
+
+
+prescreen_stats = PrescreenStats()
+
+
+def screen_text(text: str) -> Optional[Tuple[str, int]]:
+    """Classify submissions that fail regardless of the rubric, returning (reason, score)"""
+    stripped = text.strip()
+    if not stripped:
+        return "empty", 0
+    words = [re.sub(r"[^\w/]", "", word) for word in stripped.lower().split()]
+    words = [word for word in words if word]
+    if len(stripped) < 10 or len(words) <= 1:
+        return "too_short", 5
+    if all(word in FILLER_WORDS for word in words):
+        return "meaningless", 5
+    return None
+
+
+def build_response(assessment_type: AssessmentType, reason: str, score: int, provisional: bool = False):
+    """Build a complete, valid response for a pre-screened submission"""
+    response_model, criteria_model, pass_flag, extra_fields, _ = RESPONSE_SPECS[assessment_type]
+    fields = {
+        pass_flag: False,
+        "score": score,
+        "criteria": criteria_model(**{name: score for name in criteria_model.model_fields}),
+        "feedback": FEEDBACK[reason],
+        "provisional": provisional,
+        **extra_fields
+    }
+    if "suggestions" in response_model.model_fields:
+        fields["suggestions"] = list(SUGGESTIONS)
+    if "grade" in response_model.model_fields:
+        fields["grade"] = "F"
+    return response_model(**fields)
+
+
+def check_prior_submissions(assessment_type: AssessmentType, scenario_id: str, text: str, submission: Submission):
+    """Flag near-copies of earlier candidates' submissions and add this one to the index"""
+    scope = (assessment_type.value, scenario_id)
+    submission_id = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()[:16]
+    matches = [match for match in submission_index.query(scope, submission) if match[0] != submission_id]
+    if matches:
+        logger.warning("Possible copied %s submission %s: %d prior near-copies, closest %s (%.0f%% similar)",
+                       assessment_type.value, submission_id, len(matches), matches[0][0], matches[0][1] * 100)
+    submission_index.add(scope, submission_id, submission)
+
+
+def prescreened(assessment_type: AssessmentType):
+    """Score trivially failing submissions locally before any cache lookup or model call"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            if not PRESCREEN_ENABLED:
+                return await func(self, request)
+
+            with span("prescreen") as screening:
+                scenario_id, text = submission_parts(assessment_type, request)
+                outcome = screen_text(text)
+                submission = Submission(text)
+                if outcome is None and scenario_index.copied_fraction(assessment_type, scenario_id, submission) >= COPY_THRESHOLD:
+                    outcome = "copying", 10
+                # Services can add their own local checks, e.g. copying the prompt requirements
+                if outcome is None and hasattr(self, "screen_submission"):
+                    outcome = self.screen_submission(request)
+                if outcome is None and SUBMISSION_INDEX_ENABLED:
+                    check_prior_submissions(assessment_type, scenario_id, text, submission)
+                screening.set(outcome=outcome[0] if outcome else "passed")
+
+            if outcome is None:
+                prescreen_stats.record(assessment_type, None)
+                return await func(self, request)
+
+            reason, score = outcome
+            prescreen_stats.record(assessment_type, reason)
+            return build_response(assessment_type, reason, score)
+
+        return wrapper
+    return decorator
+
+
+def circuit_fallback(assessment_type: AssessmentType):
+    """Score a submission locally while the circuit breaker is open with LLM_BREAKER_FALLBACK=local
+
+    Wraps recorded_evaluation, so the result is neither cached nor recorded as a grade. It is flagged
+    `provisional`, which keeps it out of score metrics and overall scores and makes evaluation jobs retry.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            try:
+                return await func(self, request)
+            except CircuitOpenError:
+                record_fallback(assessment_type.value, "circuit_open")
+                return build_response(assessment_type, "unavailable", 0, provisional=True)
+
+        return wrapper
+    return decorator
@@ -1,20 +1,22 @@
-import openai
-import json
-import os
 from dotenv import load_dotenv
 from typing import List
-from models.assessment import PresentationRequest, PresentationEvaluationResponse, PresentationCriteria
+from services.model_cascade import cascade_structured, GRADE_BOUNDARIES
+from services.evaluation_cache import cached_evaluation
+from services.prescreen import prescreened, circuit_fallback
+from services.metrics import observed_evaluation
+from services.results_store import recorded_evaluation
+from services.copy_detection import scenario_index
+from services.prompt_templates import PromptTemplate
+from models.assessment import PresentationRequest, PresentationEvaluationResponse, PresentationCriteria, PresentationEvaluationOutput, AssessmentType
 
 # Load environment variables
 load_dotenv()
 
 class PresentationEvaluatorService:
     def __init__(self):
-        # Initialize OpenAI client properly with error handling
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.model = "gpt-3.5-turbo"
+        # Bump whenever the evaluation prompt changes so cached results are not reused
+        self.prompt_version = "2"
         
         self.presentation_scenarios = {
             "executive_briefing": {
@@ -108,61 +110,89 @@ Time limit: 20 minutes with 10 minutes for Q&A""",
                 "prompt": "How would you use AI tools to create this personalized client presentation? Detail your approach to client research, content customization, visual design, and presentation optimization using AI assistance."
             }
         }
+        
+        # Precompute copy-detection shingles for every scenario once at startup
+        for presentation_type, scenario in self.presentation_scenarios.items():
+            scenario_index.register(AssessmentType.AI_PRESENTATIONS, presentation_type, [scenario["scenario"], scenario["prompt"]] + scenario["requirements"], default=presentation_type == "executive_briefing")
+        
+        # Build each scenario's evaluation template once so its prefix stays byte-identical across requests
+        self.templates = {presentation_type: self.build_template(presentation_type, scenario) for presentation_type, scenario in self.presentation_scenarios.items()}
 
     def get_presentation_scenario(self, presentation_type: str) -> dict:
         return self.presentation_scenarios.get(presentation_type, self.presentation_scenarios["executive_briefing"])
 
+    def build_template(self, presentation_type: str, scenario: dict) -> PromptTemplate:
+        """Rubric and scenario form a stable prefix; the user's response is the only per-request content"""
+        return PromptTemplate(
+            f"presentation_evaluation:{presentation_type}",
+            system="You are a presentation design and communication expert evaluating AI-enhanced presentation development skills. Always respond with valid JSON.",
+            static_context="""
+            You are evaluating an AI-powered presentation development assessment for AI literacy.
+            
+            SCENARIO: {title}
+            DESCRIPTION: {description}
+            AUDIENCE: {audience_context}
+            CONTEXT: {scenario}
+            QUESTION: {prompt}
+            
+            REQUIREMENTS:
+            {requirements}
+            
+            EVALUATION CRITERIA (score each out of 100):
+            1. Content Structure: How well-organized and logical is the presentation structure and flow?
+            2. Visual Design: Does the approach show effective use of AI for visual design and aesthetics?
+            3. AI Integration: How effectively are AI tools integrated into the presentation development process?
+            4. Audience Engagement: Does the approach consider audience needs and engagement strategies?
+            5. Storytelling: How well does the approach create a compelling narrative and story arc?
+            
+            Please respond in this exact JSON format:
+            {{
+                "content_structure": <score 0-100>,
+                "visual_design": <score 0-100>,
+                "ai_integration": <score 0-100>,
+                "audience_engagement": <score 0-100>,
+                "storytelling": <score 0-100>,
+                "feedback": "<detailed feedback about the presentation approach and AI usage>",
+                "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
+                "engagement_level": "<Excellent/Good/Fair/Needs Improvement>",
+                "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
+                "grade_justification": "<explanation of the overall grade>"
+            }}
+            """,
+            request_template="""
+            USER'S APPROACH:
+            {submission}
+            """,
+            title=scenario["title"],
+            description=scenario["description"],
+            audience_context=scenario["audience_context"],
+            scenario=scenario["scenario"],
+            prompt=scenario["prompt"],
+            requirements="\n".join(f"- {req}" for req in scenario["requirements"])
+        )
+
+    def get_template(self, presentation_type: str) -> PromptTemplate:
+        return self.templates.get(presentation_type, self.templates["executive_briefing"])
+
+    @observed_evaluation(AssessmentType.AI_PRESENTATIONS)
+    @circuit_fallback(AssessmentType.AI_PRESENTATIONS)
+    @recorded_evaluation(AssessmentType.AI_PRESENTATIONS)
+    @prescreened(AssessmentType.AI_PRESENTATIONS)
+    @cached_evaluation(AssessmentType.AI_PRESENTATIONS)
     async def evaluate_presentation(self, request: PresentationRequest) -> PresentationEvaluationResponse:
-        scenario_info = self.get_presentation_scenario(request.presentation_type)
-        
-        evaluation_prompt = f"""
-        You are evaluating an AI-powered presentation development assessment for AI literacy.
+        template = self.get_template(request.presentation_type)
         
-        SCENARIO: {scenario_info['title']}
-        DESCRIPTION: {scenario_info['description']}
-        AUDIENCE: {scenario_info['audience_context']}
-        CONTEXT: {scenario_info['scenario']}
-        QUESTION: {scenario_info['prompt']}
-        
-        REQUIREMENTS:
-        {chr(10).join(f"- {req}" for req in scenario_info['requirements'])}
-        
-        USER'S APPROACH:
-        {request.content_approach}
-        
-        EVALUATION CRITERIA (score each out of 100):
-        1. Content Structure: How well-organized and logical is the presentation structure and flow?
-        2. Visual Design: Does the approach show effective use of AI for visual design and aesthetics?
-        3. AI Integration: How effectively are AI tools integrated into the presentation development process?
-        4. Audience Engagement: Does the approach consider audience needs and engagement strategies?
-        5. Storytelling: How well does the approach create a compelling narrative and story arc?
-        
-        Please respond in this exact JSON format:
-        {{
-            "content_structure": <score 0-100>,
-            "visual_design": <score 0-100>,
-            "ai_integration": <score 0-100>,
-            "audience_engagement": <score 0-100>,
-            "storytelling": <score 0-100>,
-            "feedback": "<detailed feedback about the presentation approach and AI usage>",
-            "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
-            "engagement_level": "<Excellent/Good/Fair/Needs Improvement>",
-            "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
-            "grade_justification": "<explanation of the overall grade>"
-        }}
-        """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a presentation design and communication expert evaluating AI-enhanced presentation development skills. Always respond with valid JSON."},
-                {"role": "user", "content": evaluation_prompt}
-            ],
+        output = await cascade_structured(
+            PresentationEvaluationOutput,
+            PresentationCriteria,
+            GRADE_BOUNDARIES,
+            operation=template.name,
+            model=self.model,
+            messages=template.messages(submission=request.content_approach),
             temperature=0.3,
             max_tokens=1500
         )
-        
-        result = json.loads(response.choices[0].message.content)
+        result = output.model_dump()
         
         criteria_scores = {
             "content_structure": result["content_structure"],
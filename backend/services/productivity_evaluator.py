@@ -1,20 +1,22 @@
-import openai
-import json
-import os
 from dotenv import load_dotenv
 from typing import List
-from models.assessment import ProductivityRequest, ProductivityEvaluationResponse, ProductivityCriteria
+from services.model_cascade import cascade_structured, GRADE_BOUNDARIES
+from services.evaluation_cache import cached_evaluation
+from services.prescreen import prescreened, circuit_fallback
+from services.metrics import observed_evaluation
+from services.results_store import recorded_evaluation
+from services.copy_detection import scenario_index
+from services.prompt_templates import PromptTemplate
+from models.assessment import ProductivityRequest, ProductivityEvaluationResponse, ProductivityCriteria, ProductivityEvaluationOutput, AssessmentType
 
 # Load environment variables
 load_dotenv()
 
 class ProductivityEvaluatorService:
     def __init__(self):
-        # Initialize OpenAI client properly with error handling
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.model = "gpt-3.5-turbo"
+        # Bump whenever the evaluation prompt changes so cached results are not reused
+        self.prompt_version = "2"
         
         self.automation_scenarios = {
             "email_automation": {
@@ -107,76 +109,104 @@ Total time: 60 minutes per application × 500 applications = 500 hours monthly""
                 "prompt": "How would you implement AI-driven document processing automation for this scenario? Detail your approach to document analysis, data extraction, workflow automation, and the specific AI technologies you would deploy."
             }
         }
+        
+        # Precompute copy-detection shingles for every scenario once at startup
+        for automation_type, scenario in self.automation_scenarios.items():
+            scenario_index.register(AssessmentType.WORKFLOW_AUTOMATION, automation_type, [scenario["current_process"], scenario["scenario"], scenario["prompt"]] + scenario["requirements"], default=automation_type == "email_automation")
+        
+        # Build each scenario's evaluation template once so its prefix stays byte-identical across requests
+        self.templates = {automation_type: self.build_template(automation_type, scenario) for automation_type, scenario in self.automation_scenarios.items()}
 
     def get_automation_scenario(self, automation_type: str) -> dict:
         return self.automation_scenarios.get(automation_type, self.automation_scenarios["email_automation"])
 
+    def build_template(self, automation_type: str, scenario: dict) -> PromptTemplate:
+        """Rubric and scenario form a stable prefix; the user's response is the only per-request content"""
+        return PromptTemplate(
+            f"productivity_evaluation:{automation_type}",
+            system="You are a workflow automation and productivity expert evaluating AI-driven process improvement solutions. Always respond with valid JSON.",
+            static_context="""
+            You are evaluating a workflow automation and productivity enhancement assessment for AI literacy.
+            
+            SCENARIO: {title}
+            DESCRIPTION: {description}
+            CURRENT PROCESS: {current_process}
+            BUSINESS CONTEXT: {scenario}
+            QUESTION: {prompt}
+            
+            REQUIREMENTS:
+            {requirements}
+            
+            EVALUATION CRITERIA (score each out of 100):
+            1. Process Analysis: How well does the user understand the current process and identify improvement opportunities?
+            2. Automation Strategy: Is the automation approach comprehensive and well-planned?
+            3. AI Tool Selection: How appropriate and effective are the chosen AI tools and technologies?
+            4. Efficiency Improvement: Does the solution demonstrate significant productivity gains?
+            5. Implementation Feasibility: How realistic and practical is the proposed implementation?
+            
+            STRICT SCORING RULES:
+            - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
+            - If NO AI tools mentioned: Maximum 25% on all criteria
+            - If only basic Excel mentioned: Maximum 35% on all criteria
+            - If mentions "AI" but no specific tools: Maximum 45% on all criteria
+            - If mentions specific AI tools (Copilot, Power Automate): Can score 60-75%
+            - If mentions automation + AI insights + specific implementation: Can score 76-100%
+            - Random or very short responses: Maximum 10% on all criteria
+            
+            CRITICAL: Check response length and meaningfulness:
+            - Responses under 10 characters or single words: Maximum 5%
+            - Responses like "okay", "yes", "good", "fine": Maximum 5%
+            - Responses under 50 characters with no substance: Maximum 15%
+            
+            Please respond in this exact JSON format:
+            {{
+                "process_analysis": <score 0-100>,
+                "automation_strategy": <score 0-100>,
+                "ai_tool_selection": <score 0-100>,
+                "efficiency_improvement": <score 0-100>,
+                "implementation_feasibility": <score 0-100>,
+                "feedback": "<detailed feedback about the automation approach and AI usage>",
+                "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
+                "efficiency_gain": "<High/Medium/Low/Minimal>",
+                "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
+                "implementation_timeline": "<estimated timeline for implementation>",
+                "grade_justification": "<explanation of the overall grade>"
+            }}
+            """,
+            request_template="""
+            USER'S WORKFLOW DESCRIPTION:
+            {submission}
+            """,
+            title=scenario["title"],
+            description=scenario["description"],
+            current_process=scenario["current_process"],
+            scenario=scenario["scenario"],
+            prompt=scenario["prompt"],
+            requirements="\n".join(f"- {req}" for req in scenario["requirements"])
+        )
+
+    def get_template(self, automation_type: str) -> PromptTemplate:
+        return self.templates.get(automation_type, self.templates["email_automation"])
+
+    @observed_evaluation(AssessmentType.WORKFLOW_AUTOMATION)
+    @circuit_fallback(AssessmentType.WORKFLOW_AUTOMATION)
+    @recorded_evaluation(AssessmentType.WORKFLOW_AUTOMATION)
+    @prescreened(AssessmentType.WORKFLOW_AUTOMATION)
+    @cached_evaluation(AssessmentType.WORKFLOW_AUTOMATION)
     async def evaluate_productivity(self, request: ProductivityRequest) -> ProductivityEvaluationResponse:
-        scenario_info = self.get_automation_scenario(request.automation_type)
-        
-        evaluation_prompt = f"""
-        You are evaluating a workflow automation and productivity enhancement assessment for AI literacy.
-        
-        SCENARIO: {scenario_info['title']}
-        DESCRIPTION: {scenario_info['description']}
-        CURRENT PROCESS: {scenario_info['current_process']}
-        BUSINESS CONTEXT: {scenario_info['scenario']}
-        QUESTION: {scenario_info['prompt']}
+        template = self.get_template(request.automation_type)
         
-        REQUIREMENTS:
-        {chr(10).join(f"- {req}" for req in scenario_info['requirements'])}
-        
-        USER'S WORKFLOW DESCRIPTION:
-        {request.workflow_description}
-        
-        EVALUATION CRITERIA (score each out of 100):
-        1. Process Analysis: How well does the user understand the current process and identify improvement opportunities?
-        2. Automation Strategy: Is the automation approach comprehensive and well-planned?
-        3. AI Tool Selection: How appropriate and effective are the chosen AI tools and technologies?
-        4. Efficiency Improvement: Does the solution demonstrate significant productivity gains?
-        5. Implementation Feasibility: How realistic and practical is the proposed implementation?
-        
-        STRICT SCORING RULES:
-        - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
-        - If NO AI tools mentioned: Maximum 25% on all criteria
-        - If only basic Excel mentioned: Maximum 35% on all criteria
-        - If mentions "AI" but no specific tools: Maximum 45% on all criteria
-        - If mentions specific AI tools (Copilot, Power Automate): Can score 60-75%
-        - If mentions automation + AI insights + specific implementation: Can score 76-100%
-        - Random or very short responses: Maximum 10% on all criteria
-        
-        CRITICAL: Check response length and meaningfulness:
-        - Responses under 10 characters or single words: Maximum 5%
-        - Responses like "okay", "yes", "good", "fine": Maximum 5%
-        - Responses under 50 characters with no substance: Maximum 15%
-        
-        Please respond in this exact JSON format:
-        {{
-            "process_analysis": <score 0-100>,
-            "automation_strategy": <score 0-100>,
-            "ai_tool_selection": <score 0-100>,
-            "efficiency_improvement": <score 0-100>,
-            "implementation_feasibility": <score 0-100>,
-            "feedback": "<detailed feedback about the automation approach and AI usage>",
-            "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
-            "efficiency_gain": "<High/Medium/Low/Minimal>",
-            "recommended_tools": ["<tool 1>", "<tool 2>", "<tool 3>"],
-            "implementation_timeline": "<estimated timeline for implementation>",
-            "grade_justification": "<explanation of the overall grade>"
-        }}
-        """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a workflow automation and productivity expert evaluating AI-driven process improvement solutions. Always respond with valid JSON."},
-                {"role": "user", "content": evaluation_prompt}
-            ],
+        output = await cascade_structured(
+            ProductivityEvaluationOutput,
+            ProductivityCriteria,
+            GRADE_BOUNDARIES,
+            operation=template.name,
+            model=self.model,
+            messages=template.messages(submission=request.workflow_description),
             temperature=0.3,
             max_tokens=1500
         )
-        
-        result = json.loads(response.choices[0].message.content)
+        result = output.model_dump()
         
         criteria_scores = {
             "process_analysis": result["process_analysis"],
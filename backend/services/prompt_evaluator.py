@@ -1,21 +1,40 @@
-import openai
-import json
+import asyncio
+import logging
 import os
-import re
 from dotenv import load_dotenv
-from typing import Dict, Any
-from models.assessment import PromptRequest, EvaluationResponse, EvaluationCriteria
+from typing import Dict, List, Optional, Tuple
+from services.openai_client import create_chat_completion
+from services.evaluation_cache import cached_evaluation, mark_uncacheable
+from services.prescreen import prescreened, circuit_fallback
+from services.copy_detection import scenario_index, ReferenceText, Submission
+from services.submissions import DEFAULT_SCENARIO_ID
+from services.prompt_templates import PromptTemplate
+from services.event_stream import is_streaming, publish
+from services.json_output import OutputParseError
+from services.model_cascade import cascade_structured, PASS_BOUNDARIES
+from services.llm_scheduler import LLMUnavailableError
+from services.llm_resilience import CircuitOpenError
+from services.token_usage import mark_fallback_evaluation
+from services.metrics import observed_evaluation, record_fallback
+from services.results_store import recorded_evaluation
+from services.tracing import span, traced
+from models.assessment import PromptRequest, EvaluationResponse, EvaluationCriteria, PromptEvaluationOutput, AssessmentType
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class PromptEvaluatorService:
     def __init__(self):
-        # Initialize OpenAI client properly with error handling
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.model = "gpt-3.5-turbo"
+        # Bump whenever the evaluation prompt changes so cached results are not reused
+        self.prompt_version = "2"
+        
+        # Grade the prompt concurrently with answer generation instead of sequentially
+        self.pipelined = os.getenv("PROMPT_EVALUATION_PIPELINED", "false").lower() == "true"
+        if self.pipelined:
+            self.prompt_version += "-pipelined"
         
         self.sample_data = """
 Employee_ID | First_Name | Last_Name | Department | Position | Salary | Years_Experience | Manager_ID | Project_Code | Performance_Rating | Location | Join_Date
@@ -52,6 +71,24 @@ E015 | Esperance | Mukandayisenga | HR | Specialist | 48000 | 5 | E004 | PROJ_C
             "Find employees hired in the same year who work on different projects, and show their salary differences"
         ]
         
+        # Precompute copy-detection word sets and shingles once instead of on every request
+        references = scenario_index.register(
+            AssessmentType.PROMPT_ENGINEERING,
+            DEFAULT_SCENARIO_ID,
+            [self.assessment_question] + self.question_requirements
+        )
+        self.question_reference = references[0]
+        self.requirement_references = references[1:]
+        self.indicator_references = [ReferenceText(indicator) for indicator in [
+            "analyze the employee database and provide",
+            "comprehensive report that includes",
+            "for each department, identify the highest-paid employee and their manager",
+            "calculate the average salary for employees with performance ratings above 4.0",
+            "list all employees who earn more than their direct manager",
+            "identify departments where the average salary is above 60,000",
+            "find employees hired in the same year who work on different projects"
+        ]]
+        
         self.correct_answer = """**COMPREHENSIVE EMPLOYEE ANALYSIS REPORT**
 
 **1. Highest-Paid Employee per Department with Manager:**
@@ -80,270 +117,297 @@ E015 | Esperance | Mukandayisenga | HR | Specialist | 48000 | 5 | E004 | PROJ_C
 **5. Same-Year Hires on Different Projects:**
 - 2019: James Mugisha (PROJ_A, $70,000) vs Esperance Mukandayisenga (PROJ_C, $48,000) - Difference: $22,000
 - 2023: Paul Nkurunziza (PROJ_A, $35,000) vs Robert Bizimana (PROJ_B, $32,000) - Difference: $3,000"""
+        
+        # Static data, question, answer key and rubric form a stable prefix; the user's prompt comes last
+        self.answer_template = PromptTemplate(
+            "prompt_answer",
+            system="You are a helpful assistant that follows user prompts exactly to analyze data.",
+            static_context="""
+            Given this data table:
+            {sample_data}
+            """,
+            request_template="""
+            User's prompt: "{prompt}"
+            
+            Please follow the user's prompt exactly and provide the answer they are asking for.
+            """,
+            sample_data=self.sample_data.strip()
+        )
+        self.evaluation_template = PromptTemplate(
+            "prompt_evaluation",
+            system="You are a helpful AI literacy assessment evaluator. Always respond with valid JSON.",
+            static_context="""
+            You are an AI literacy assessment evaluator. Evaluate the user prompt given at the end based on these criteria:
+            
+            CONTEXT:
+            - Data Table: 
+            {sample_data}
+            - Question to Answer: "{assessment_question}"
+            
+            The correct answer should be:
+            {correct_answer}
+            
+            MANDATORY EVALUATION RULES:
+            1. IF COPYING DETECTED: ALL scores must be 0-25% maximum
+            2. IF TOO SHORT OR MEANINGLESS (like "hello", "test", "abc"): ALL scores must be 0-15% maximum
+            3. IF NO AI INSTRUCTION PHRASES: Maximum 30% on all criteria
+            4. IF DOESN'T ADDRESS REQUIREMENTS: Maximum 40% on all criteria
+            5. ONLY prompts that are proper AI instructions AND address the requirements can score above 60%
+            
+            EXAMPLES THAT MUST SCORE 0-15%:
+            - "hello"
+            - "test"
+            - "abc"
+            - "hi there"
+            - Any single word or meaningless phrase
+            
+            EXAMPLES OF COPYING (must score 0-25%):
+            - "For each department, identify the highest-paid employee and their manager"
+            - "Calculate the average salary for employees with performance ratings above 4.0"
+            - Any direct copying of the numbered requirements
+            - Lists that match the original question structure
+            
+            EXAMPLES OF POOR PROMPTS (must score 0-40%):
+            - "Show me the data"
+            - "Give me information"
+            - "What is this?"
+            - Prompts without specific instructions
+            
+            EXAMPLES OF DECENT PROMPTS (can score 50-75%):
+            - "Please analyze the employee data and show me salary information"
+            - "Can you help me understand the employee database?"
+            
+            EXAMPLES OF GOOD PROMPTS (can score 75-100%):
+            - "Please systematically analyze the employee database. Start by examining each department to find who earns the most and identify their reporting manager..."
+            - "I need you to perform a comprehensive analysis of this employee data. Begin by processing departmental salary information..."
+            - "Based on the employee table, can you help me understand the salary and performance relationships by first looking at..."
+            
+            EVALUATION CRITERIA (score each out of 100):
+            1. Clarity: Is it clear and written as AI instructions (NOT copying)?
+            2. Specificity: Does it specify HOW to analyze, not just WHAT to find?
+            3. Completeness: Complete instructions without copying requirements?
+            4. Relevance: Proper AI prompt structure, not question restatement?
+            
+            STRICT SCORING RULES:
+            - If meaningless/too short: Maximum 15% on all criteria
+            - If copying detected: Maximum 25% on all criteria
+            - If no AI instruction phrases: Maximum 30% on all criteria
+            - If doesn't address requirements: Maximum 40% on all criteria
+            - If just listing requirements: Maximum 50% on all criteria
+            - Only comprehensive AI prompts addressing all requirements can score above 75%
+            
+            IMPORTANT: Be extremely strict. Most prompts should score below 50%. Only truly excellent prompts that demonstrate real prompt engineering skills should score above 75%.
+            
+            Please respond in this exact JSON format:
+            {{
+                "clarity": <score 0-100>,
+                "specificity": <score 0-100>,
+                "completeness": <score 0-100>,
+                "relevance": <score 0-100>,
+                "feedback": "<detailed feedback about the prompt quality and whether it actually answers the question correctly>"
+            }}
+            """,
+            request_template="""
+            User's Prompt: "{prompt}"
+            {answer_section}
+            CRITICAL ANALYSIS:
+            - Copying detected: {is_copying}
+            - Too short/meaningless: {is_too_short_or_meaningless}
+            - Has AI instruction phrases: {has_ai_instructions}
+            - Addresses actual requirements: {addresses_requirements}
+            """,
+            sample_data=self.sample_data.strip(),
+            assessment_question=self.assessment_question,
+            correct_answer=self.correct_answer
+        )
 
-    def sanitize_json_string(self, text: str) -> str:
-        """Remove invalid control characters from JSON string"""
-        # Remove control characters except for \n, \r, \t
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-        # Escape any remaining problematic characters
-        text = text.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-        return text
-
-    def extract_json_from_response(self, response_text: str) -> dict:
-        """Extract and parse JSON from OpenAI response with error handling"""
-        try:
-            # First, try to parse as-is
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            try:
-                # Sanitize the text and try again
-                sanitized = self.sanitize_json_string(response_text)
-                return json.loads(sanitized)
-            except json.JSONDecodeError:
-                try:
-                    # Try to extract JSON from within the response
-                    json_start = response_text.find('{')
-                    json_end = response_text.rfind('}') + 1
-                    if json_start != -1 and json_end > json_start:
-                        json_part = response_text[json_start:json_end]
-                        sanitized_json = self.sanitize_json_string(json_part)
-                        return json.loads(sanitized_json)
-                except json.JSONDecodeError:
-                    pass
-                
-                # If all else fails, return a default structure
-                return {
-                    "clarity": 20,
-                    "specificity": 20,
-                    "completeness": 20,
-                    "relevance": 20,
-                    "feedback": "Unable to properly evaluate this prompt due to formatting issues. Please try a clearer, more structured prompt.",
-                    "answer": "Error: Could not generate answer due to prompt formatting issues."
-                }
-
-    def similarity_ratio(self, str1, str2):
-        """Calculate similarity ratio between two strings"""
-        words1 = set(str1.lower().split())
-        words2 = set(str2.lower().split())
-        if not words1 or not words2:
-            return 0
-        intersection = words1.intersection(words2)
-        return len(intersection) / min(len(words1), len(words2))
-
-    def is_copying_question(self, user_prompt, question_text, requirements_list):
+    def is_copying_question(self, user_prompt: str) -> bool:
         """Detect if user is copying the question instead of writing a proper AI prompt"""
-        user_lower = user_prompt.lower().strip()
-        question_lower = question_text.lower().strip()
+        submission = Submission(user_prompt)
         
         # Check if user prompt contains large portions of the original question
-        if len(user_lower) > 50:  # Only check substantial prompts
-            # Check for direct copying of question text
-            question_words = set(question_lower.split())
-            user_words = set(user_lower.split())
-            overlap_ratio = len(question_words.intersection(user_words)) / len(question_words)
-            
-            if overlap_ratio > 0.6:  # More than 60% word overlap
+        if len(submission.text) > 50:  # Only check substantial prompts
+            if submission.word_coverage(self.question_reference) > 0.6:  # More than 60% word overlap
                 return True
         
         # Check if user copied individual requirements
-        for requirement in requirements_list:
-            req_lower = requirement.lower().strip()
+        for requirement in self.requirement_references:
             # Check for exact or near-exact matches of requirements
-            if req_lower in user_lower or self.similarity_ratio(req_lower, user_lower) > 0.8:
+            if requirement.text in submission.text or submission.word_similarity(requirement) > 0.8:
                 return True
         
         # Check for common copying patterns
-        copying_indicators = [
-            "analyze the employee database and provide",
-            "comprehensive report that includes",
-            "for each department, identify the highest-paid employee and their manager",
-            "calculate the average salary for employees with performance ratings above 4.0",
-            "list all employees who earn more than their direct manager",
-            "identify departments where the average salary is above 60,000",
-            "find employees hired in the same year who work on different projects"
-        ]
-        
-        for indicator in copying_indicators:
-            if indicator in user_lower:
-                return True
-        
-        return False
+        return any(indicator.text in submission.text for indicator in self.indicator_references)
 
-    async def evaluate_prompt(self, request: PromptRequest) -> EvaluationResponse:
-        # First, let's test the user's prompt by generating an answer
-        answer_prompt = f"""
-        Given this data table:
-        {self.sample_data}
-        
-        User's prompt: "{request.prompt}"
-        
-        Please follow the user's prompt exactly and provide the answer they are asking for.
-        """
+    def analyze_prompt(self, prompt: str) -> Dict[str, bool]:
+        """Run the local heuristics, none of which depend on the generated answer"""
+        prompt_lower = prompt.lower().strip()
+        return {
+            # Check if user is copying
+            "is_copying": self.is_copying_question(prompt),
+            # Check if prompt is too short or meaningless
+            "is_too_short": len(prompt.strip().split()) < 5,
+            "is_meaningless": any(word in prompt_lower for word in ['hello', 'hi', 'test', 'abc', '123']),
+            # Check if prompt has proper AI instruction structure
+            "has_ai_instructions": any(phrase in prompt_lower for phrase in [
+                'please', 'analyze', 'based on', 'i need', 'can you', 'help me',
+                'examine', 'look at', 'find', 'identify', 'calculate', 'list',
+                'show me', 'tell me', 'determine', 'extract'
+            ]),
+            # Check if prompt addresses the actual requirements
+            "addresses_requirements": any(keyword in prompt_lower for keyword in [
+                'department', 'salary', 'employee', 'manager', 'performance', 'rating',
+                'experience', 'project', 'hire', 'year'
+            ])
+        }
+
+    def needs_generated_answer(self, checks: Dict[str, bool]) -> bool:
+        """Copied or too-short prompts are capped by the rubric, so running them is wasted work"""
+        # is_meaningless matches substrings such as "hi" in "this", so it can't rule a prompt out on its own
+        return not (checks["is_copying"] or checks["is_too_short"])
+
+    def screen_submission(self, request: PromptRequest) -> Optional[Tuple[str, int]]:
+        """Pre-screen hook: copied and too-short prompts are scored locally within the rubric caps"""
+        with span("prompt.heuristics") as heuristics:
+            checks = self.analyze_prompt(request.prompt)
+            heuristics.set(**checks)
+        if checks["is_copying"]:
+            return "copying", 20
+        if checks["is_too_short"]:
+            return "too_short", 10
+        return None
+
+    @traced("prompt.generate_answer")
+    async def generate_answer(self, prompt: str) -> str:
+        """Test the user's prompt by having the model follow it against the data table"""
+        messages = self.answer_template.messages(prompt=prompt)
         
         try:
-            # Generate answer using user's prompt
-            answer_response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that follows user prompts exactly to analyze data."},
-                    {"role": "user", "content": answer_prompt}
-                ],
+            if is_streaming():
+                # Forward answer tokens to the client as they arrive
+                stream = await create_chat_completion(
+                    operation=self.answer_template.name,
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=500,
+                    stream=True
+                )
+                parts = []
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        publish("answer_delta", {"text": delta})
+                return "".join(parts).strip()
+            
+            answer_response = await create_chat_completion(
+                operation=self.answer_template.name,
+                model=self.model,
+                messages=messages,
                 temperature=0.1,
                 max_tokens=500
             )
             
-            generated_answer = answer_response.choices[0].message.content.strip()
+            return answer_response.choices[0].message.content.strip()
             
+        except (LLMUnavailableError, CircuitOpenError):
+            # Let the route answer 503, or circuit_fallback score locally, instead of giving a fallback grade
+            raise
         except Exception as e:
-            print(f"Error generating answer: {e}")
-            generated_answer = "Error: Could not generate answer with the provided prompt."
-        
-        # Check if user is copying
-        is_copying = self.is_copying_question(request.prompt, self.assessment_question, self.question_requirements)
-        
-        # Check if prompt is too short or meaningless
-        is_too_short = len(request.prompt.strip().split()) < 5
-        is_meaningless = any(word in request.prompt.lower().strip() for word in ['hello', 'hi', 'test', 'abc', '123'])
-        
-        # Check if prompt has proper AI instruction structure
-        has_ai_instructions = any(phrase in request.prompt.lower() for phrase in [
-            'please', 'analyze', 'based on', 'i need', 'can you', 'help me',
-            'examine', 'look at', 'find', 'identify', 'calculate', 'list',
-            'show me', 'tell me', 'determine', 'extract'
-        ])
-        
-        # Check if prompt addresses the actual requirements
-        addresses_requirements = any(keyword in request.prompt.lower() for keyword in [
-            'department', 'salary', 'employee', 'manager', 'performance', 'rating',
-            'experience', 'project', 'hire', 'year'
-        ])
-        
-        # Now evaluate the prompt quality
-        evaluation_prompt = f"""
-        You are an AI literacy assessment evaluator. Evaluate the following user prompt based on these criteria:
-        
-        CONTEXT:
-        - Data Table: 
-        {self.sample_data}
-        - Question to Answer: "{self.assessment_question}"
-        - User's Prompt: "{request.prompt}"
-        
-        The correct answer should be:
-        {self.correct_answer}
-        
-        Generated answer from user's prompt:
-        {generated_answer}
-        
-        CRITICAL ANALYSIS:
-        - Copying detected: {is_copying}
-        - Too short/meaningless: {is_too_short or is_meaningless}
-        - Has AI instruction phrases: {has_ai_instructions}
-        - Addresses actual requirements: {addresses_requirements}
-        
-        MANDATORY EVALUATION RULES:
-        1. IF COPYING DETECTED: ALL scores must be 0-25% maximum
-        2. IF TOO SHORT OR MEANINGLESS (like "hello", "test", "abc"): ALL scores must be 0-15% maximum
-        3. IF NO AI INSTRUCTION PHRASES: Maximum 30% on all criteria
-        4. IF DOESN'T ADDRESS REQUIREMENTS: Maximum 40% on all criteria
-        5. ONLY prompts that are proper AI instructions AND address the requirements can score above 60%
-        
-        EXAMPLES THAT MUST SCORE 0-15%:
-        - "hello"
-        - "test"
-        - "abc"
-        - "hi there"
-        - Any single word or meaningless phrase
-        
-        EXAMPLES OF COPYING (must score 0-25%):
-        - "For each department, identify the highest-paid employee and their manager"
-        - "Calculate the average salary for employees with performance ratings above 4.0"
-        - Any direct copying of the numbered requirements
-        - Lists that match the original question structure
-        
-        EXAMPLES OF POOR PROMPTS (must score 0-40%):
-        - "Show me the data"
-        - "Give me information"
-        - "What is this?"
-        - Prompts without specific instructions
-        
-        EXAMPLES OF DECENT PROMPTS (can score 50-75%):
-        - "Please analyze the employee data and show me salary information"
-        - "Can you help me understand the employee database?"
-        
-        EXAMPLES OF GOOD PROMPTS (can score 75-100%):
-        - "Please systematically analyze the employee database. Start by examining each department to find who earns the most and identify their reporting manager..."
-        - "I need you to perform a comprehensive analysis of this employee data. Begin by processing departmental salary information..."
-        - "Based on the employee table, can you help me understand the salary and performance relationships by first looking at..."
-        
-        EVALUATION CRITERIA (score each out of 100):
-        1. Clarity: Is it clear and written as AI instructions (NOT copying)?
-        2. Specificity: Does it specify HOW to analyze, not just WHAT to find?
-        3. Completeness: Complete instructions without copying requirements?
-        4. Relevance: Proper AI prompt structure, not question restatement?
-        
-        STRICT SCORING RULES:
-        - If meaningless/too short: Maximum 15% on all criteria
-        - If copying detected: Maximum 25% on all criteria
-        - If no AI instruction phrases: Maximum 30% on all criteria
-        - If doesn't address requirements: Maximum 40% on all criteria
-        - If just listing requirements: Maximum 50% on all criteria
-        - Only comprehensive AI prompts addressing all requirements can score above 75%
-        
-        User Prompt: "{request.prompt}"
-        Copying Detected: {is_copying}
-        Too Short/Meaningless: {is_too_short or is_meaningless}
-        Has AI Instructions: {has_ai_instructions}
-        Addresses Requirements: {addresses_requirements}
-        
-        IMPORTANT: Be extremely strict. Most prompts should score below 50%. Only truly excellent prompts that demonstrate real prompt engineering skills should score above 75%.
-        
-        Please respond in this exact JSON format:
-        {{
-            "clarity": <score 0-100>,
-            "specificity": <score 0-100>,
-            "completeness": <score 0-100>,
-            "relevance": <score 0-100>,
-            "feedback": "<detailed feedback about the prompt quality and whether it actually answers the question correctly>",
-            "answer": "{generated_answer}"
-        }}
-        """
-        
+            logger.error("Error generating answer: %s", e)
+            mark_uncacheable()
+            mark_fallback_evaluation()
+            record_fallback(self.answer_template.name, "answer_error")
+            return "Error: Could not generate answer with the provided prompt."
+
+    def build_evaluation_messages(self, prompt: str, checks: Dict[str, bool], generated_answer: Optional[str] = None) -> List[dict]:
+        """Build the grading messages; without a generated answer the model only judges the prompt itself"""
+        answer_section = ""
+        if generated_answer is not None:
+            answer_section = f"\nGenerated answer from user's prompt:\n{generated_answer}\n"
+        return self.evaluation_template.messages(
+            prompt=prompt,
+            answer_section=answer_section,
+            is_copying=checks["is_copying"],
+            is_too_short_or_meaningless=checks["is_too_short"] or checks["is_meaningless"],
+            has_ai_instructions=checks["has_ai_instructions"],
+            addresses_requirements=checks["addresses_requirements"]
+        )
+
+    @traced("prompt.run_evaluation")
+    async def run_evaluation(self, messages: List[dict]) -> dict:
+        """Ask the model to grade the prompt, falling back to low scores if that fails"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI literacy assessment evaluator. Always respond with valid JSON."},
-                    {"role": "user", "content": evaluation_prompt}
-                ],
+            output = await cascade_structured(
+                PromptEvaluationOutput,
+                EvaluationCriteria,
+                PASS_BOUNDARIES,
+                operation=self.evaluation_template.name,
+                model=self.model,
+                messages=messages,
                 temperature=0.3,
                 max_tokens=1000
             )
+            return output.model_dump()
             
-            response_content = response.choices[0].message.content.strip()
-            result = self.extract_json_from_response(response_content)
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error after all attempts: {e}")
+        except OutputParseError as e:
+            logger.error("JSON decode error after repair attempt: %s", e.msg)
+            mark_uncacheable()
+            mark_fallback_evaluation()
+            record_fallback(self.evaluation_template.name, "parse_error")
             # Fallback evaluation
-            result = {
+            return {
                 "clarity": 20,
                 "specificity": 20,
                 "completeness": 20,
                 "relevance": 20,
-                "feedback": "Error evaluating prompt due to formatting issues. Please ensure your prompt uses standard characters and try again.",
-                "answer": generated_answer
+                "feedback": "Error evaluating prompt due to formatting issues. Please ensure your prompt uses standard characters and try again."
             }
+        except (LLMUnavailableError, CircuitOpenError):
+            # Let the route answer 503, or circuit_fallback score locally, instead of giving a fallback grade
+            raise
         except Exception as e:
-            print(f"Error in evaluation: {e}")
+            logger.error("Error in evaluation: %s", e)
+            mark_uncacheable()
+            mark_fallback_evaluation()
+            record_fallback(self.evaluation_template.name, "evaluation_error")
             # Fallback evaluation
-            result = {
+            return {
                 "clarity": 20,
                 "specificity": 20,
                 "completeness": 20,
                 "relevance": 20,
-                "feedback": f"Error evaluating prompt: {str(e)}",
-                "answer": generated_answer
+                "feedback": f"Error evaluating prompt: {str(e)}"
             }
+
+    @observed_evaluation(AssessmentType.PROMPT_ENGINEERING)
+    @circuit_fallback(AssessmentType.PROMPT_ENGINEERING)
+    @recorded_evaluation(AssessmentType.PROMPT_ENGINEERING)
+    @prescreened(AssessmentType.PROMPT_ENGINEERING)
+    @cached_evaluation(AssessmentType.PROMPT_ENGINEERING)
+    async def evaluate_prompt(self, request: PromptRequest) -> EvaluationResponse:
+        with span("prompt.heuristics") as heuristics:
+            checks = self.analyze_prompt(request.prompt)
+            heuristics.set(**checks)
+        
+        if not self.pipelined:
+            # First, test the user's prompt by generating an answer, then grade it
+            generated_answer = await self.generate_answer(request.prompt)
+            result = await self.run_evaluation(self.build_evaluation_messages(request.prompt, checks, generated_answer))
+        else:
+            # Grade the prompt while its answer is generated instead of waiting for it
+            messages = self.build_evaluation_messages(request.prompt, checks)
+            if self.needs_generated_answer(checks):
+                result, generated_answer = await asyncio.gather(
+                    self.run_evaluation(messages),
+                    self.generate_answer(request.prompt)
+                )
+            else:
+                generated_answer = "No answer was generated because the prompt copies the question or is too short to follow."
+                result = await self.run_evaluation(messages)
+        # The answer comes straight from generation rather than being echoed back by the grader
+        result["answer"] = generated_answer
         
         criteria_scores = {
             "clarity": result["clarity"],
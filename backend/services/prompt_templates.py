@@ -0,0 +1,55 @@
+import functools
+import textwrap
+from typing import Dict, List
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    # Loaded on first use: reading the BPE ranks takes a noticeable part of startup
+    try:
+        import tiktoken
+    except ImportError:  # optional: fall back to a character-based estimate
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens locally, estimating ~4 characters per token without tiktoken"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+class PromptTemplate:
+    """A chat prompt whose static content forms a byte-stable prefix and whose per-request content comes last
+
+    The system message holds the role, rubric, scenario and data so that repeated requests share an
+    identical prefix the provider can cache; only the final user message changes between requests.
+    """
+
+    def __init__(self, name: str, system: str, static_context: str, request_template: str, **static_values):
+        self.name = name
+        # Dedent before filling in values so multi-line values (data tables, scenarios) keep their layout
+        static_context = textwrap.dedent(static_context).strip().format(**static_values)
+        self.prefix = textwrap.dedent(system).strip() + "\n\n" + static_context
+        self.request_template = textwrap.dedent(request_template).strip()
+        self.prefix_tokens = count_tokens(self.prefix)
+        templates[name] = self
+
+    def messages(self, **values) -> List[dict]:
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": self.request_template.format(**values)}
+        ]
+
+
+# Every template built by the services, by name, for token reporting
+templates: Dict[str, PromptTemplate] = {}
+
+
+def template_stats() -> Dict[str, dict]:
+    return {
+        name: {"prefix_tokens": template.prefix_tokens, "prefix_bytes": len(template.prefix.encode("utf-8"))}
+        for name, template in templates.items()
+    }
@@ -0,0 +1,34 @@
+import json
+import os
+from typing import Any
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: compact stdlib JSON is used without orjson
+    orjson = None
+
+# Load environment variables
+load_dotenv()
+
+# Serialize dict-returning routes (results pages, stats) with orjson, skipping FastAPI's jsonable_encoder pass;
+# routes with a response_model are already serialized straight to JSON bytes by pydantic and keep that path
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson when installed, otherwise by compact stdlib JSON"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(content: Any) -> JSONResponse:
+    """Response for a route returning plain JSON types, rendered by FastJSONResponse when enabled"""
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(content)
+    return JSONResponse(jsonable_encoder(content))
@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from models.assessment import AssessmentType
+from services.submissions import submission_parts
+from services.token_usage import track_evaluation_usage
+from services.tracing import current_trace_id
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Every evaluation is recorded here for reporting; set RESULTS_DB= (empty) to disable
+RESULTS_DB = os.getenv("RESULTS_DB", "assessment_results.sqlite3")
+RESULTS_BATCH_SIZE = int(os.getenv("RESULTS_BATCH_SIZE", "200"))
+RESULTS_FLUSH_INTERVAL = float(os.getenv("RESULTS_FLUSH_INTERVAL", "1.0"))
+# Results waiting to be written beyond this are dropped (and counted) rather than held in memory
+RESULTS_MAX_PENDING = int(os.getenv("RESULTS_MAX_PENDING", "20000"))
+RESULTS_MAX_PAGE = 1000
+
+COLUMNS = (
+    "created_at", "candidate_id", "cohort_id", "assessment_type", "scenario_id", "score", "grade", "criteria",
+    "latency_ms", "model", "prompt_tokens", "completion_tokens", "trace_id"
+)
+
+# (candidate id, cohort id) of the request being served, from the X-Candidate-Id / X-Cohort-Id headers
+_result_context: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar("result_context", default=(None, None))
+
+
+def set_result_context(candidate_id: Optional[str], cohort_id: Optional[str]):
+    """Attribute results recorded in the current context to this candidate and cohort"""
+    return _result_context.set((candidate_id or None, cohort_id or None))
+
+
+def reset_result_context(token):
+    _result_context.reset(token)
+
+
+class ResultsStore:
+    """Evaluation results in a SQLite WAL database, written in batches by a background task"""
+
+    def __init__(self, db_path: Optional[str], batch_size: int = 200, flush_interval: float = 1.0,
+                 max_pending: int = 20000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[tuple] = []
+        self._db = None
+        self._lock = threading.Lock()
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.fallbacks_skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL stays consistent after a crash and avoids an fsync per batch
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS assessment_results ("
+                "id INTEGER PRIMARY KEY, created_at REAL NOT NULL, candidate_id TEXT, cohort_id TEXT, "
+                "assessment_type TEXT NOT NULL, scenario_id TEXT, score INTEGER NOT NULL, grade TEXT, "
+                "criteria TEXT NOT NULL, latency_ms REAL NOT NULL, model TEXT, prompt_tokens INTEGER NOT NULL, "
+                "completion_tokens INTEGER NOT NULL, trace_id TEXT)"
+            )
+            # Reports filter by candidate or cohort, usually per assessment type, over a time range
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS assessment_results_candidate ON assessment_results (candidate_id, created_at)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS assessment_results_cohort "
+                "ON assessment_results (cohort_id, assessment_type, created_at)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS assessment_results_type ON assessment_results (assessment_type, created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS assessment_results_time ON assessment_results (created_at)")
+            self._db.commit()
+        return self._db
+
+    def record(self, assessment_type: AssessmentType, scenario_id: str, result, latency: float, model: str,
+               prompt_tokens: int, completion_tokens: int):
+        """Queue one evaluation result for the next batch; never blocks the request"""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        candidate_id, cohort_id = _result_context.get()
+        criteria = result.criteria.model_dump() if hasattr(result.criteria, "model_dump") else dict(result.criteria)
+        self._pending.append((
+            time.time(), candidate_id, cohort_id, assessment_type.value, scenario_id, result.score,
+            getattr(result, "grade", None), json.dumps(criteria), round(latency * 1000, 3), model,
+            prompt_tokens, completion_tokens, current_trace_id()
+        ))
+        self.recorded += 1
+        self._ensure_writer()
+        if len(self._pending) >= self.batch_size:
+            self._flush_now.set()
+
+    def _ensure_writer(self):
+        if self._writer is None or self._writer.done():
+            self._flush_now = asyncio.Event()
+            self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def _write_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything recorded so far in batches of at most batch_size"""
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            try:
+                await asyncio.to_thread(self._write, batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.write_errors += 1
+                self.dropped += len(batch)
+                logger.error("Could not write %d assessment results: %s", len(batch), e)
+
+    def _write(self, rows: List[tuple]):
+        with self._lock:
+            db = self._connection()
+            db.executemany(
+                f"INSERT INTO assessment_results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                rows
+            )
+            db.commit()
+
+    async def close(self):
+        """Stop the writer and write out what is still pending"""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+
+    @staticmethod
+    def _filters(candidate_id, cohort_id, assessment_type, since, until) -> Tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (("candidate_id", candidate_id), ("cohort_id", cohort_id), ("assessment_type", assessment_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, filters: tuple, limit: int, offset: int) -> List[dict]:
+        where, params = self._filters(*filters)
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM assessment_results{where} "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        results = []
+        for row in rows:
+            result = dict(zip(("id",) + COLUMNS, row))
+            result["criteria"] = json.loads(result["criteria"])
+            results.append(result)
+        return results
+
+    def _summary(self, filters: tuple) -> List[dict]:
+        where, params = self._filters(*filters)
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT assessment_type, COUNT(*), COUNT(DISTINCT candidate_id), AVG(score), MIN(score), MAX(score), "
+                "AVG(latency_ms), SUM(prompt_tokens), SUM(completion_tokens) "
+                f"FROM assessment_results{where} GROUP BY assessment_type ORDER BY assessment_type",
+                params
+            ).fetchall()
+        return [
+            {
+                "assessment_type": row[0], "results": row[1], "candidates": row[2],
+                "avg_score": round(row[3], 2), "min_score": row[4], "max_score": row[5],
+                "avg_latency_ms": round(row[6], 1), "prompt_tokens": row[7], "completion_tokens": row[8]
+            }
+            for row in rows
+        ]
+
+    async def query(self, candidate_id: Optional[str] = None, cohort_id: Optional[str] = None,
+                    assessment_type: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+                    limit: int = 100, offset: int = 0) -> List[dict]:
+        """Most recent results first, filtered by any of candidate, cohort, type and time range"""
+        filters = (candidate_id, cohort_id, assessment_type, since, until)
+        return await asyncio.to_thread(self._query, filters, min(limit, RESULTS_MAX_PAGE), offset)
+
+    async def summary(self, candidate_id: Optional[str] = None, cohort_id: Optional[str] = None,
+                      assessment_type: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None) -> List[dict]:
+        """Result counts, score and token aggregates per assessment type"""
+        filters = (candidate_id, cohort_id, assessment_type, since, until)
+        return await asyncio.to_thread(self._summary, filters)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "db_path": self.db_path,
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "fallbacks_skipped": self.fallbacks_skipped
+        }
+
+
+results_store = ResultsStore(RESULTS_DB or None, RESULTS_BATCH_SIZE, RESULTS_FLUSH_INTERVAL, RESULTS_MAX_PENDING)
+
+
+def recorded_evaluation(assessment_type: AssessmentType):
+    """Record each result of an evaluate_* method, including pre-screened and cached ones, in the results store
+
+    Fallback grades given when the model could not grade the submission are left out.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            if not results_store.enabled:
+                return await func(self, request)
+            started = time.perf_counter()
+            with track_evaluation_usage() as usage:
+                result = await func(self, request)
+            if usage.fallback:
+                # An error grade would count as a failing candidate in cohort reports
+                results_store.fallbacks_skipped += 1
+                return result
+            scenario_id, _ = submission_parts(assessment_type, request)
+            # A cheaper cascade stage may have produced the grade; cached results report the service's model
+            results_store.record(assessment_type, scenario_id, result, time.perf_counter() - started,
+                                 usage.model or self.model, usage.prompt_tokens, usage.completion_tokens)
+            return result
+
+        return wrapper
+    return decorator
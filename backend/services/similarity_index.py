@@ -0,0 +1,182 @@
+import os
+import random
+import zlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from services.llm_cassette import llm_cassette
+from services.metrics import registry
+from services.submissions import normalize_text
+
+try:
+    import numpy as np
+except ImportError:  # optional: near-duplicate reuse is disabled without numpy
+    np = None
+
+# Load environment variables
+load_dotenv()
+
+# Reuse the grade of an earlier, nearly identical submission to the same scenario instead of calling the model
+SIMILAR_REUSE_ENABLED = os.getenv("SIMILAR_REUSE_ENABLED", "false").lower() == "true"
+SIMILAR_REUSE_THRESHOLD = float(os.getenv("SIMILAR_REUSE_THRESHOLD", "0.9"))
+# Assessment types graded on free-text answers, where a reworded answer earns the same grade
+SIMILAR_REUSE_TYPES = os.getenv("SIMILAR_REUSE_TYPES", "task_management,ai_presentations,workflow_automation")
+# Graded submissions kept per scenario; the oldest are overwritten first
+SIMILAR_INDEX_SIZE = int(os.getenv("SIMILAR_INDEX_SIZE", "2000"))
+SIMILAR_INDEX_SCENARIOS = int(os.getenv("SIMILAR_INDEX_SCENARIOS", "64"))
+SIMILAR_INDEX_DIM = int(os.getenv("SIMILAR_INDEX_DIM", "1024"))
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "5"))
+# Share of reusable submissions graded anyway, to measure how far reused scores drift from fresh ones
+SIMILAR_AUDIT_RATE = float(os.getenv("SIMILAR_AUDIT_RATE", "0.05"))
+
+NGRAM_SIZES = (3, 4, 5)
+# Prompt engineering grades the wording itself, and its result includes the model's answer to that prompt
+NEVER_REUSED_TYPES = ("prompt_engineering",)
+
+similar_lookups = registry.counter(
+    "evaluation_similar_lookups_total",
+    "Near-duplicate lookups after an exact cache miss, by outcome (reused, audited, miss)",
+    ["assessment_type", "outcome"])
+
+
+def vectorize(text: str, dim: int) -> "np.ndarray":
+    """L2-normalized signed hashing of character 3-5-grams; rewordings keep most of their n-grams"""
+    text = f" {normalize_text(text).lower()} "
+    encoded = text.encode("utf-8")
+    hashes = [
+        zlib.crc32(encoded[i:i + size])
+        for size in NGRAM_SIZES
+        for i in range(len(encoded) - size + 1)
+    ]
+    if not hashes:
+        return np.zeros(dim, dtype=np.float32)
+    hashes = np.array(hashes, dtype=np.uint32)
+    # The top bit picks the sign so colliding n-grams cancel out instead of inflating similarity
+    signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+    vector = np.bincount(hashes % dim, weights=signs, minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ScenarioVectors:
+    """Vectors of graded submissions for one scenario in a single float32 matrix, used as a ring buffer"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(64, capacity), dim), dtype=np.float32)
+        self.values: List[dict] = []
+        self._next = 0
+
+    def add(self, vector: "np.ndarray", value: dict):
+        if len(self.values) < self.capacity:
+            if len(self.values) == len(self.vectors):
+                grown = np.zeros((min(len(self.vectors) * 2, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+                grown[:len(self.vectors)] = self.vectors
+                self.vectors = grown
+            self.vectors[len(self.values)] = vector
+            self.values.append(value)
+            return
+        self.vectors[self._next] = vector
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+
+    def search(self, vector: "np.ndarray", k: int) -> List[Tuple[float, dict]]:
+        """Top-k (cosine similarity, value) pairs, most similar first"""
+        count = len(self.values)
+        if not count:
+            return []
+        similarities = self.vectors[:count] @ vector
+        k = min(k, count)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(float(similarities[i]), self.values[i]) for i in top]
+
+
+class SimilarityIndex:
+    """Per-scenario hashed n-gram vectors of graded submissions, for reusing grades of near-duplicates"""
+
+    def __init__(self, enabled: bool, threshold: float, capacity: int, max_scenarios: int, dim: int,
+                 top_k: int, audit_rate: float, assessment_types: str):
+        self.enabled = enabled and np is not None
+        self.threshold = threshold
+        self.assessment_types = frozenset(
+            name.strip() for name in assessment_types.split(",") if name.strip() and name.strip() not in NEVER_REUSED_TYPES
+        )
+        self.capacity = capacity
+        self.max_scenarios = max_scenarios
+        self.dim = dim
+        self.top_k = top_k
+        self.audit_rate = audit_rate
+        self._scenarios: "OrderedDict[tuple, ScenarioVectors]" = OrderedDict()
+        self.queries = 0
+        self.reused = 0
+        self.audited = 0
+        self._drifts: List[int] = []  # fresh score minus reused score, per audit (last 1000)
+
+    def applies_to(self, assessment_type: str) -> bool:
+        return self.enabled and assessment_type in self.assessment_types
+
+    def should_audit(self) -> bool:
+        """Grade a near-duplicate anyway to measure drift; never while completions are recorded or replayed"""
+        return not llm_cassette.active and random.random() < self.audit_rate
+
+    def vector(self, text: str) -> "np.ndarray":
+        return vectorize(text, self.dim)
+
+    def match(self, scope: tuple, vector: "np.ndarray") -> Optional[Tuple[float, dict, int]]:
+        """The most similar graded submission above the threshold as (similarity, value, neighbours above it)"""
+        self.queries += 1
+        vectors = self._scenarios.get(scope)
+        if vectors is None:
+            return None
+        self._scenarios.move_to_end(scope)
+        matches = [match for match in vectors.search(vector, self.top_k) if match[0] >= self.threshold]
+        if not matches:
+            return None
+        similarity, value = matches[0]
+        return similarity, value, len(matches)
+
+    def add(self, scope: tuple, vector: "np.ndarray", value: dict):
+        vectors = self._scenarios.get(scope)
+        if vectors is None:
+            vectors = self._scenarios[scope] = ScenarioVectors(self.dim, self.capacity)
+            # Scenario ids come from requests, so the number of scenarios is bounded too
+            while len(self._scenarios) > self.max_scenarios:
+                self._scenarios.popitem(last=False)
+        self._scenarios.move_to_end(scope)
+        vectors.add(vector, value)
+
+    def record_lookup(self, assessment_type: str, outcome: str):
+        if outcome == "reused":
+            self.reused += 1
+        elif outcome == "audited":
+            self.audited += 1
+        similar_lookups.inc(assessment_type, outcome)
+
+    def record_drift(self, reused_score: int, fresh_score: int):
+        self._drifts.append(fresh_score - reused_score)
+        del self._drifts[:-1000]
+
+    def stats(self) -> dict:
+        drifts = self._drifts
+        return {
+            "enabled": self.enabled,
+            "numpy_available": np is not None,
+            "threshold": self.threshold,
+            "assessment_types": sorted(self.assessment_types),
+            "scenarios": len(self._scenarios),
+            "vectors": sum(len(vectors.values) for vectors in self._scenarios.values()),
+            "queries": self.queries,
+            "reused": self.reused,
+            "reuse_rate": round(self.reused / self.queries, 4) if self.queries else 0.0,
+            "audited": self.audited,
+            "drift_mean": round(sum(drifts) / len(drifts), 2) if drifts else None,
+            "drift_mean_abs": round(sum(abs(d) for d in drifts) / len(drifts), 2) if drifts else None,
+            "drift_max_abs": max(abs(d) for d in drifts) if drifts else None
+        }
+
+
+similarity_index = SimilarityIndex(
+    SIMILAR_REUSE_ENABLED, SIMILAR_REUSE_THRESHOLD, SIMILAR_INDEX_SIZE, SIMILAR_INDEX_SCENARIOS,
+    SIMILAR_INDEX_DIM, SIMILAR_TOP_K, SIMILAR_AUDIT_RATE, SIMILAR_REUSE_TYPES
+)
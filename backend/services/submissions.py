@@ -0,0 +1,27 @@
+from typing import Tuple
+from models.assessment import AssessmentType
+
+# Request fields holding the scenario id and the candidate's submission text for each assessment
+SUBMISSION_FIELDS = {
+    AssessmentType.PROMPT_ENGINEERING: (None, "prompt"),
+    AssessmentType.WRITING_AUTOMATION: ("task_type", "content"),
+    AssessmentType.TASK_MANAGEMENT: ("scenario_type", "user_response"),
+    AssessmentType.DATA_ANALYSIS: ("analysis_type", "user_approach"),
+    AssessmentType.AI_PRESENTATIONS: ("presentation_type", "content_approach"),
+    AssessmentType.WORKFLOW_AUTOMATION: ("automation_type", "workflow_description"),
+}
+
+# The prompt engineering assessment has a single fixed scenario
+DEFAULT_SCENARIO_ID = "default"
+
+
+def submission_parts(assessment_type: AssessmentType, request) -> Tuple[str, str]:
+    """Return the (scenario id, submission text) pair for an evaluation request"""
+    scenario_field, text_field = SUBMISSION_FIELDS[assessment_type]
+    scenario_id = getattr(request, scenario_field) if scenario_field else DEFAULT_SCENARIO_ID
+    return scenario_id, getattr(request, text_field)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a submission compare equal"""
+    return " ".join(text.split())
@@ -1,20 +1,22 @@
-import openai
-import json
-import os
 from dotenv import load_dotenv
 from typing import List
-from models.assessment import TaskManagementRequest, TaskManagementEvaluationResponse, TaskManagementCriteria
+from services.model_cascade import cascade_structured, GRADE_BOUNDARIES
+from services.evaluation_cache import cached_evaluation
+from services.prescreen import prescreened, circuit_fallback
+from services.metrics import observed_evaluation
+from services.results_store import recorded_evaluation
+from services.copy_detection import scenario_index
+from services.prompt_templates import PromptTemplate
+from models.assessment import TaskManagementRequest, TaskManagementEvaluationResponse, TaskManagementCriteria, TaskManagementEvaluationOutput, AssessmentType
 
 # Load environment variables
 load_dotenv()
 
 class TaskManagementEvaluatorService:
     def __init__(self):
-        # Initialize OpenAI client properly with error handling
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.model = "gpt-3.5-turbo"
+        # Bump whenever the evaluation prompt changes so cached results are not reused
+        self.prompt_version = "2"
         
         self.scenarios = {
             "team_workflow": {
@@ -25,88 +27,113 @@ class TaskManagementEvaluatorService:
             "prompt": "You are leading a 3-person team on a project with 5 deadlines over 2 weeks. Tasks include writing, reviewing, and submitting reports. How would you organize the workflow to make sure nothing is missed?"
         }
         }
+        
+        # Precompute copy-detection shingles for every scenario once at startup
+        for scenario_type, scenario in self.scenarios.items():
+            scenario_index.register(AssessmentType.TASK_MANAGEMENT, scenario_type, [scenario["scenario"], scenario["prompt"]] + scenario["requirements"], default=scenario_type == "team_workflow")
+        
+        # Build each scenario's evaluation template once so its prefix stays byte-identical across requests
+        self.templates = {scenario_type: self.build_template(scenario_type, scenario) for scenario_type, scenario in self.scenarios.items()}
 
     def get_scenario(self, scenario_type: str) -> dict:
         return self.scenarios.get(scenario_type, self.scenarios["team_workflow"])
 
+    def build_template(self, scenario_type: str, scenario: dict) -> PromptTemplate:
+        """Rubric and scenario form a stable prefix; the user's response is the only per-request content"""
+        return PromptTemplate(
+            f"task_management_evaluation:{scenario_type}",
+            system="You are a productivity and workflow optimization expert evaluating task management skills with AI integration. Always respond with valid JSON.",
+            static_context="""
+            You are evaluating a task management and workflow efficiency assessment for AI literacy.
+            
+            SCENARIO: {title}
+            DESCRIPTION: {description}
+            CONTEXT: {scenario}
+            QUESTION: {prompt}
+            
+            EVALUATION FRAMEWORK:
+            Analyze the user's response to determine their AI literacy level based on the tools and approaches they mention:
+            
+            EXPLORER LEVEL (0-50%): Basic/manual approaches ONLY
+            - Examples: "I'd just email or WhatsApp reminders", basic spreadsheets, manual tracking
+            - Shows minimal or NO awareness of AI/digital tools for project management
+            - Manual processes, basic communication tools
+            - No mention of project management software or AI assistance
+            
+            PRACTITIONER LEVEL (51-75%): Some digital/AI tools mentioned
+            - Examples: "I'd use Teams/Planner to assign tasks, set deadlines", Trello, basic project management tools
+            - Must mention specific tools like Teams, Planner, Trello
+            - Shows some understanding of digital project management
+            
+            INNOVATOR LEVEL (76-100%): Advanced AI integration and automation ONLY
+            - Examples: "I'd set up Planner/Asana with task dependencies, automate reminders with Copilot/Power Automate, track progress dashboards"
+            - Must mention automation, AI tools like Copilot/Power Automate
+            - Shows sophisticated understanding of AI-powered workflow automation
+            
+            STRICT SCORING RULES:
+            - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
+            - If NO digital tools mentioned: Maximum 25% on all criteria
+            - If only basic communication (email/WhatsApp): Maximum 30% on all criteria
+            - If mentions project tools but no AI: Maximum 50% on all criteria
+            - If mentions AI tools like Copilot/Power Automate: Can score 70-85%
+            - If mentions full automation + AI + dashboards: Can score 85-100%
+            - Random or very short responses: Maximum 10% on all criteria
+            
+            CRITICAL: Check response length and meaningfulness:
+            - Responses under 10 characters or single words: Maximum 5%
+            - Responses like "okay", "yes", "good", "fine": Maximum 5%
+            - Responses under 50 characters with no substance: Maximum 15%
+            
+            EVALUATION CRITERIA (score each out of 100):
+            1. Organization: How well-structured and logical is the approach to task/project management?
+            2. Prioritization: Does the response show effective prioritization and decision-making skills?
+            3. AI Integration: How effectively are AI tools integrated into the workflow/management process?
+            4. Efficiency: Does the solution demonstrate clear efficiency improvements and time savings?
+            
+            Please respond in this exact JSON format:
+            {{
+                "organization": <score 0-100>,
+                "prioritization": <score 0-100>,
+                "ai_integration": <score 0-100>,
+                "efficiency": <score 0-100>,
+                "feedback": "<detailed feedback about the task management approach and AI usage>",
+                "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
+                "efficiency_rating": "<Excellent/Good/Fair/Needs Improvement>",
+                "grade_justification": "<explanation of the overall grade>"
+            }}
+            """,
+            request_template="""
+            USER'S RESPONSE:
+            {submission}
+            """,
+            title=scenario["title"],
+            description=scenario["description"],
+            scenario=scenario["scenario"],
+            prompt=scenario["prompt"]
+        )
+
+    def get_template(self, scenario_type: str) -> PromptTemplate:
+        return self.templates.get(scenario_type, self.templates["team_workflow"])
+
+    @observed_evaluation(AssessmentType.TASK_MANAGEMENT)
+    @circuit_fallback(AssessmentType.TASK_MANAGEMENT)
+    @recorded_evaluation(AssessmentType.TASK_MANAGEMENT)
+    @prescreened(AssessmentType.TASK_MANAGEMENT)
+    @cached_evaluation(AssessmentType.TASK_MANAGEMENT)
     async def evaluate_task_management(self, request: TaskManagementRequest) -> TaskManagementEvaluationResponse:
-        scenario_info = self.get_scenario(request.scenario_type)
-        
-        evaluation_prompt = f"""
-        You are evaluating a task management and workflow efficiency assessment for AI literacy.
-        
-        SCENARIO: {scenario_info['title']}
-        DESCRIPTION: {scenario_info['description']}
-        CONTEXT: {scenario_info['scenario']}
-        QUESTION: {scenario_info['prompt']}
-        
-        USER'S RESPONSE:
-        {request.user_response}
-        
-        EVALUATION FRAMEWORK:
-        Analyze the user's response to determine their AI literacy level based on the tools and approaches they mention:
-        
-        EXPLORER LEVEL (0-50%): Basic/manual approaches ONLY
-        - Examples: "I'd just email or WhatsApp reminders", basic spreadsheets, manual tracking
-        - Shows minimal or NO awareness of AI/digital tools for project management
-        - Manual processes, basic communication tools
-        - No mention of project management software or AI assistance
-        
-        PRACTITIONER LEVEL (51-75%): Some digital/AI tools mentioned
-        - Examples: "I'd use Teams/Planner to assign tasks, set deadlines", Trello, basic project management tools
-        - Must mention specific tools like Teams, Planner, Trello
-        - Shows some understanding of digital project management
-        
-        INNOVATOR LEVEL (76-100%): Advanced AI integration and automation ONLY
-        - Examples: "I'd set up Planner/Asana with task dependencies, automate reminders with Copilot/Power Automate, track progress dashboards"
-        - Must mention automation, AI tools like Copilot/Power Automate
-        - Shows sophisticated understanding of AI-powered workflow automation
-        
-        STRICT SCORING RULES:
-        - If meaningless/single word responses (like "okay", "yes", "good"): Maximum 5% on all criteria
-        - If NO digital tools mentioned: Maximum 25% on all criteria
-        - If only basic communication (email/WhatsApp): Maximum 30% on all criteria
-        - If mentions project tools but no AI: Maximum 50% on all criteria
-        - If mentions AI tools like Copilot/Power Automate: Can score 70-85%
-        - If mentions full automation + AI + dashboards: Can score 85-100%
-        - Random or very short responses: Maximum 10% on all criteria
-        
-        CRITICAL: Check response length and meaningfulness:
-        - Responses under 10 characters or single words: Maximum 5%
-        - Responses like "okay", "yes", "good", "fine": Maximum 5%
-        - Responses under 50 characters with no substance: Maximum 15%
-        
-        EVALUATION CRITERIA (score each out of 100):
-        1. Organization: How well-structured and logical is the approach to task/project management?
-        2. Prioritization: Does the response show effective prioritization and decision-making skills?
-        3. AI Integration: How effectively are AI tools integrated into the workflow/management process?
-        4. Efficiency: Does the solution demonstrate clear efficiency improvements and time savings?
-        
-        
-        Please respond in this exact JSON format:
-        {{
-            "organization": <score 0-100>,
-            "prioritization": <score 0-100>,
-            "ai_integration": <score 0-100>,
-            "efficiency": <score 0-100>,
-            "feedback": "<detailed feedback about the task management approach and AI usage>",
-            "suggestions": ["<suggestion 1>", "<suggestion 2>", "<suggestion 3>"],
-            "efficiency_rating": "<Excellent/Good/Fair/Needs Improvement>",
-            "grade_justification": "<explanation of the overall grade>"
-        }}
-        """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a productivity and workflow optimization expert evaluating task management skills with AI integration. Always respond with valid JSON."},
-                {"role": "user", "content": evaluation_prompt}
-            ],
+        template = self.get_template(request.scenario_type)
+        
+        output = await cascade_structured(
+            TaskManagementEvaluationOutput,
+            TaskManagementCriteria,
+            GRADE_BOUNDARIES,
+            operation=template.name,
+            model=self.model,
+            messages=template.messages(submission=request.user_response),
             temperature=0.3,
             max_tokens=1200
         )
-        
-        result = json.loads(response.choices[0].message.content)
+        result = output.model_dump()
         
         criteria_scores = {
             "organization": result["organization"],
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class UsageTotals:
+    """Prompt, cached-prompt and completion token counts"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        # For an evaluation: the model whose output its grade came from, when that is not the service's own,
+        # and whether the grade is a fallback rather than the model's
+        self.model: Optional[str] = None
+        self.fallback = False
+
+    def add(self, prompt_tokens: int, cached_prompt_tokens: int, completion_tokens: int):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_prompt_tokens += cached_prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "uncached_prompt_tokens": self.prompt_tokens - self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "prompt_cache_ratio": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0
+        }
+
+
+# Usage of the HTTP request currently being served, if it is being tracked
+_request_usage: ContextVar[Optional[UsageTotals]] = ContextVar("request_usage", default=None)
+
+# Usage of the evaluation currently running, for per-result accounting
+_evaluation_usage: ContextVar[Optional[UsageTotals]] = ContextVar("evaluation_usage", default=None)
+
+# Process-wide usage per operation (template name)
+usage_by_operation = {}
+
+
+def track_request_usage() -> UsageTotals:
+    """Start collecting token usage for the current request and everything it awaits"""
+    usage = UsageTotals()
+    _request_usage.set(usage)
+    return usage
+
+
+@contextmanager
+def track_evaluation_usage():
+    """Collect token usage of the enclosed evaluation, alongside its request's totals"""
+    usage = UsageTotals()
+    token = _evaluation_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _evaluation_usage.reset(token)
+
+
+def record_evaluation_model(model: str):
+    """Note which model graded the evaluation in progress, e.g. a cheaper model cascade stage"""
+    evaluation_usage = _evaluation_usage.get()
+    if evaluation_usage is not None:
+        evaluation_usage.model = model
+
+
+def mark_fallback_evaluation():
+    """Flag the evaluation in progress as a fallback grade, so it is not reported as the candidate's result"""
+    evaluation_usage = _evaluation_usage.get()
+    if evaluation_usage is not None:
+        evaluation_usage.fallback = True
+
+
+def current_request_usage() -> Optional[UsageTotals]:
+    return _request_usage.get()
+
+
+def current_evaluation_usage() -> Optional[UsageTotals]:
+    return _evaluation_usage.get()
+
+
+def record_usage(operation: str, usage):
+    """Record the `usage` block of a chat completion against its operation and the current request"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    counts = (usage.prompt_tokens or 0, cached, usage.completion_tokens or 0)
+
+    usage_by_operation.setdefault(operation, UsageTotals()).add(*counts)
+    request_usage = _request_usage.get()
+    if request_usage is not None:
+        request_usage.add(*counts)
+    evaluation_usage = _evaluation_usage.get()
+    if evaluation_usage is not None:
+        evaluation_usage.add(*counts)
+
+
+def usage_stats() -> dict:
+    return {operation: totals.to_dict() for operation, totals in usage_by_operation.items()}
@@ -0,0 +1,197 @@
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Where finished traces go: "none", "stdout" or "file" (TRACE_FILE); TRACE_SAMPLE_RATE of them are exported
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# Requests slower than this keep their full span tree, whatever the exporter settings
+SLOW_TRACE_THRESHOLD_MS = float(os.getenv("SLOW_TRACE_THRESHOLD_MS", "5000"))
+SLOW_TRACE_SAMPLE_RATE = float(os.getenv("SLOW_TRACE_SAMPLE_RATE", "1.0"))
+SLOW_TRACE_FILE = os.getenv("SLOW_TRACE_FILE") or None
+SLOW_TRACE_KEEP = int(os.getenv("SLOW_TRACE_KEEP", "50"))
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed step of a request; child spans nest under the span active when they start"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "children", "started_at", "_start", "duration", "error")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attributes = attributes
+        self.children: List[Span] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self, root_start: Optional[float] = None) -> dict:
+        root_start = self._start if root_start is None else root_start
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start_offset_ms": round((self._start - root_start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+        }
+        if self.parent is None:
+            data["trace_id"] = self.trace_id
+            data["timestamp"] = self.started_at
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(root_start) for child in self.children]
+        return data
+
+
+class StdoutExporter:
+    def export(self, trace: dict):
+        sys.stdout.write(json.dumps(trace, default=str) + "\n")
+        sys.stdout.flush()
+
+
+class FileExporter:
+    """Append each trace as a JSON line; works offline and is easy to grep or load later"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: dict):
+        line = json.dumps(trace, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+exporters = []
+if TRACE_EXPORTER == "stdout":
+    exporters.append(StdoutExporter())
+elif TRACE_EXPORTER == "file":
+    exporters.append(FileExporter(TRACE_FILE))
+
+slow_traces = deque(maxlen=SLOW_TRACE_KEEP)
+_slow_exporter = FileExporter(SLOW_TRACE_FILE) if SLOW_TRACE_FILE else None
+
+
+def add_exporter(exporter):
+    """Send finished traces to `exporter`, any object with an export(trace: dict) method"""
+    exporters.append(exporter)
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace_id if active is not None else None
+
+
+def _export(root: Span):
+    trace = None
+    if exporters and random.random() < TRACE_SAMPLE_RATE:
+        trace = root.to_dict()
+        for exporter in exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                logger.warning("Trace exporter %s failed: %s", type(exporter).__name__, e)
+    if root.duration * 1000 >= SLOW_TRACE_THRESHOLD_MS and random.random() < SLOW_TRACE_SAMPLE_RATE:
+        trace = trace or root.to_dict()
+        slow_traces.append(trace)
+        logger.warning("Slow request %s took %.0f ms (trace %s)", root.name, root.duration * 1000, root.trace_id)
+        if _slow_exporter is not None:
+            _slow_exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a child of the active span, or as a new trace if there is none"""
+    parent = _current_span.get()
+    trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+    current = Span(name, trace_id, parent, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        if parent is None:
+            _export(current)
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None, **attributes):
+    """Start a new trace, e.g. for an incoming request, continuing the caller's trace id if given"""
+    token = _current_span.set(None)
+    try:
+        with span(name, **attributes) as root:
+            if trace_id:
+                root.trace_id = trace_id
+            yield root
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator form of span() for async functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp every log record with the trace id of the request that emitted it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+def configure_logging(level: str = None):
+    """Log to stderr with the active trace id on every line"""
+    root = logging.getLogger()
+    if any(isinstance(f, TraceIdFilter) for handler in root.handlers for f in handler.filters):
+        return
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+logger = logging.getLogger(__name__)
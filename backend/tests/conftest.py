@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the backend's modules the way the app does, from the backend directory: cd backend && pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nothing a test evaluates is written to the results store, and no test reaches the provider
+os.environ.setdefault("RESULTS_DB", "")
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,97 @@
+import pytest
+from models.assessment import AssessmentType
+from services.copy_detection import Submission, SubmissionIndex, scenario_index
+from services.prescreen import COPY_THRESHOLD
+from services.prompt_evaluator import PromptEvaluatorService
+from services.submissions import DEFAULT_SCENARIO_ID
+
+
+def baseline_is_copying_question(user_prompt, question_text, requirements_list):
+    """The copy check as it was before the precomputed index, kept as the reference for its verdicts"""
+    def similarity_ratio(str1, str2):
+        words1 = set(str1.lower().split())
+        words2 = set(str2.lower().split())
+        if not words1 or not words2:
+            return 0
+        intersection = words1.intersection(words2)
+        return len(intersection) / min(len(words1), len(words2))
+
+    user_lower = user_prompt.lower().strip()
+    question_lower = question_text.lower().strip()
+    if len(user_lower) > 50:
+        question_words = set(question_lower.split())
+        user_words = set(user_lower.split())
+        if len(question_words.intersection(user_words)) / len(question_words) > 0.6:
+            return True
+    for requirement in requirements_list:
+        req_lower = requirement.lower().strip()
+        if req_lower in user_lower or similarity_ratio(req_lower, user_lower) > 0.8:
+            return True
+    copying_indicators = [
+        "analyze the employee database and provide",
+        "comprehensive report that includes",
+        "for each department, identify the highest-paid employee and their manager",
+        "calculate the average salary for employees with performance ratings above 4.0",
+        "list all employees who earn more than their direct manager",
+        "identify departments where the average salary is above 60,000",
+        "find employees hired in the same year who work on different projects"
+    ]
+    return any(indicator in user_lower for indicator in copying_indicators)
+
+
+@pytest.fixture(scope="module")
+def service() -> PromptEvaluatorService:
+    return PromptEvaluatorService()
+
+
+COPIED = {
+    "whole question": None,  # filled in from the service
+    "one requirement": "List all employees who earn more than their direct manager (if applicable)",
+    "requirement in a sentence": "Please find out the following. Calculate the average salary for employees with "
+                                 "performance ratings above 4.0, grouped by years of experience (0-2 years, 3-5 years, 6+ years)",
+    "opening line": "Analyze the employee database and provide everything it asks for",
+    "indicator in upper case": "IDENTIFY DEPARTMENTS WHERE THE AVERAGE SALARY IS ABOVE 60,000 please",
+    "requirement words reordered": "their manager (if they have one) and for each department, identify the highest-paid employee",
+}
+
+ORIGINAL = {
+    "structured prompt": "You are a data analyst. Using the employee table above, group rows by Department and return the "
+                         "top earner in each with their Manager_ID resolved to a name. Then bucket staff with "
+                         "Performance_Rating > 4.0 into 0-2, 3-5 and 6+ years of experience and give the mean salary "
+                         "per bucket. Present each answer as a markdown table.",
+    "short request": "Can you help me compare salaries across departments?",
+    "paraphrased requirement": "Show which staff members are paid more than the person they report to.",
+    # Same words as an indicator but punctuated differently: the original substring check does not match it
+    "indicator without punctuation": "For each department identify the highest paid employee and their manager, and "
+                                     "explain how you worked it out step by step using the Manager_ID column.",
+    "numbers without the question text": "Average salary above 60000 by department, with project codes, please.",
+    "empty": "",
+}
+
+
+def locally_flagged(service: PromptEvaluatorService, prompt: str) -> bool:
+    """Whether the pre-screen or the prompt service's own check treats the prompt as a copy"""
+    submission = Submission(prompt)
+    copied = scenario_index.copied_fraction(AssessmentType.PROMPT_ENGINEERING, DEFAULT_SCENARIO_ID, submission)
+    return copied >= COPY_THRESHOLD or service.is_copying_question(prompt)
+
+
+@pytest.mark.parametrize("name", [*COPIED, *ORIGINAL])
+def test_copy_verdicts_match_the_original_check(service, name):
+    prompt = service.assessment_question if name == "whole question" else {**COPIED, **ORIGINAL}[name]
+    expected = baseline_is_copying_question(prompt, service.assessment_question, service.question_requirements)
+    assert expected == (name in COPIED)
+    assert service.is_copying_question(prompt) == expected
+    assert locally_flagged(service, prompt) == expected
+
+
+def test_submission_index_finds_near_copies_only_within_a_scope():
+    index = SubmissionIndex(max_entries=10, threshold=0.8)
+    text = ("I would list every task in a shared board, sort them with an Eisenhower matrix and ask Copilot "
+            "to draft the weekly status email from the board each Friday afternoon.")
+    index.add(("task_management", "priority_matrix"), "first", Submission(text))
+
+    assert [match[0] for match in index.query(("task_management", "priority_matrix"), Submission(text + " Thanks."))] == ["first"]
+    assert index.query(("task_management", "project_planning"), Submission(text)) == []
+    unrelated = "Use Power Automate to file invoice attachments from Outlook into SharePoint by supplier name."
+    assert index.query(("task_management", "priority_matrix"), Submission(unrelated)) == []
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from models.assessment import AssessmentType, WritingEvaluationResponse, WritingRequest
+from services import evaluation_cache as cache_module
+from services.evaluation_cache import EvaluationCache, cached_evaluation, mark_uncacheable
+from services.prescreen import build_response
+from services.token_usage import mark_fallback_evaluation, track_evaluation_usage
+
+
+@pytest.fixture
+def cache(monkeypatch) -> EvaluationCache:
+    cache = EvaluationCache(max_entries=16)
+    monkeypatch.setattr(cache_module, "evaluation_cache", cache)
+    return cache
+
+
+class Service:
+    """Writing evaluator stand-in whose evaluations wait until `release` is set"""
+
+    prompt_version = "v1"
+    model = "m"
+
+    def __init__(self, fail: bool = False, fallback: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.fallback = fallback
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    @cached_evaluation(AssessmentType.WRITING_AUTOMATION)
+    async def evaluate(self, request: WritingRequest) -> WritingEvaluationResponse:
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("model output could not be parsed")
+        if self.fallback:
+            mark_uncacheable()
+            mark_fallback_evaluation()
+        return build_response(AssessmentType.WRITING_AUTOMATION, "too_short", 40 + self.calls)
+
+
+def request(content: str = "Dear team, the launch moves to Friday.") -> WritingRequest:
+    return WritingRequest(task_type="email", content=content, requirements=[])
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_submissions_share_one_evaluation(cache):
+    async def run():
+        service = Service()
+        tasks = [asyncio.create_task(service.evaluate(request())) for _ in range(5)]
+        # Whitespace differences are the same submission
+        tasks.append(asyncio.create_task(service.evaluate(request("  Dear team,\n the launch moves to Friday. "))))
+        await service.started.wait()
+        await settle()
+        service.release.set()
+        return service, await asyncio.gather(*tasks)
+
+    service, results = asyncio.run(run())
+    assert service.calls == 1
+    assert {result.score for result in results} == {41}
+    assert (cache.misses, cache.coalesced, len(cache._entries), len(cache._inflight)) == (1, 5, 1, 0)
+
+
+def test_cancelled_leader_hands_the_evaluation_to_a_follower(cache):
+    async def run():
+        service = Service()
+        leader = asyncio.create_task(service.evaluate(request()))
+        await service.started.wait()
+        followers = [asyncio.create_task(service.evaluate(request())) for _ in range(3)]
+        await settle()
+        # The leader's client disconnects while the followers are waiting for its result
+        service.started.clear()
+        leader.cancel()
+        await service.started.wait()
+        await settle()
+        service.release.set()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return service, results
+
+    service, results = asyncio.run(run())
+    # One evaluation was cancelled with its leader; the first follower ran the second and shared it
+    assert service.calls == 2
+    assert {result.score for result in results} == {42}
+    assert len(cache._entries) == 1 and not cache._inflight
+
+
+def test_cancelled_follower_does_not_take_over_the_evaluation(cache):
+    async def run():
+        service = Service()
+        leader = asyncio.create_task(service.evaluate(request()))
+        await service.started.wait()
+        follower = asyncio.create_task(service.evaluate(request()))
+        await settle()
+        follower.cancel()
+        await settle()
+        service.release.set()
+        result = await leader
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return service, result
+
+    service, result = asyncio.run(run())
+    assert service.calls == 1 and result.score == 41
+
+
+def test_failed_leader_does_not_poison_the_cache(cache):
+    async def run():
+        service = Service(fail=True)
+        tasks = [asyncio.create_task(service.evaluate(request())) for _ in range(3)]
+        await service.started.wait()
+        await settle()
+        service.release.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        assert not cache._entries and not cache._inflight
+
+        # The next submission is evaluated again rather than answered with the error
+        service.fail = False
+        return service, outcomes, await service.evaluate(request())
+
+    service, outcomes, retried = asyncio.run(run())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert service.calls == 2 and retried.score == 42
+    assert len(cache._entries) == 1
+
+
+def test_followers_of_a_fallback_grade_are_not_recorded_or_cached(cache):
+    async def evaluate_tracked(service: Service) -> bool:
+        with track_evaluation_usage() as usage:
+            await service.evaluate(request())
+        return usage.fallback
+
+    async def run():
+        service = Service(fallback=True)
+        tasks = [asyncio.create_task(evaluate_tracked(service)) for _ in range(3)]
+        await service.started.wait()
+        await settle()
+        service.release.set()
+        return service, await asyncio.gather(*tasks)
+
+    service, fallbacks = asyncio.run(run())
+    assert service.calls == 1
+    assert fallbacks == [True, True, True]
+    assert not cache._entries
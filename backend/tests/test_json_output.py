@@ -0,0 +1,135 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from models.assessment import PromptEvaluationOutput
+from services import json_output
+from services.json_output import IncrementalJSONParser, OutputParseError, parse_output
+
+GRADE = {"clarity": 80, "specificity": 70, "completeness": 60, "relevance": 90, "feedback": "Clear"}
+
+
+def parse(*chunks: str) -> dict:
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.result()
+
+
+def test_plain_object():
+    assert parse(json.dumps(GRADE)) == GRADE
+
+
+def test_prose_and_code_fences_are_skipped():
+    text = f"Here is the evaluation:\n```json\n{json.dumps(GRADE)}\n```\nLet me know if you need more."
+    assert parse(text) == GRADE
+
+
+def test_raw_control_characters_in_strings_are_escaped():
+    assert parse('{"feedback": "line one\nline two\tand\r more"}') == {"feedback": "line one\nline two\tand\r more"}
+    # Other control characters have no JSON short escape and are dropped
+    assert parse('{"feedback": "bell\x07 here"}') == {"feedback": "bell here"}
+
+
+def test_trailing_commas_are_dropped():
+    assert parse('{"suggestions": ["a", "b", ], "score": 1 , \n}') == {"suggestions": ["a", "b"], "score": 1}
+
+
+def test_commas_and_braces_inside_strings_are_kept():
+    value = {"feedback": "Use {braces}, [brackets], and a trailing comma,", "quote": 'say "hi" \\ ok'}
+    assert parse(json.dumps(value)) == value
+
+
+def test_chunks_split_anywhere():
+    text = 'Sure! {"feedback": "a \\"quoted\\" word", "nested": {"list": [1, 2,]}, "score": 5} trailing prose'
+    expected = {"feedback": 'a "quoted" word', "nested": {"list": [1, 2]}, "score": 5}
+    assert parse(*text) == expected
+    assert parse(text[:17], text[17:18], text[18:]) == expected
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"a": 1} {"b": 2}')
+    assert parser.feed("more") is True
+    assert parser.result() == {"a": 1}
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"feedback": "cut off', '{"a": [1, 2}'])
+def test_incomplete_or_invalid_objects_raise(text):
+    with pytest.raises(OutputParseError):
+        parse(text)
+
+
+def test_invalid_json_inside_the_object_raises():
+    with pytest.raises(OutputParseError):
+        parse("{'single': 'quotes'}")
+
+
+def test_parse_output_validates_against_the_model():
+    assert parse_output(json.dumps(GRADE), PromptEvaluationOutput).clarity == 80
+    with pytest.raises(OutputParseError, match="does not match PromptEvaluationOutput"):
+        parse_output('{"clarity": 80}', PromptEvaluationOutput)
+    with pytest.raises(OutputParseError):
+        parse_output(None, PromptEvaluationOutput)
+
+
+def completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def fake_completions(monkeypatch, *contents: str) -> list:
+    """Answer successive create_chat_completion calls with `contents`, returning the calls made"""
+    calls = []
+    answers = list(contents)
+
+    async def create_chat_completion(operation: str, **kwargs):
+        calls.append({"operation": operation, **kwargs})
+        return completion(answers.pop(0))
+
+    monkeypatch.setattr(json_output, "create_chat_completion", create_chat_completion)
+    return calls
+
+
+def complete(**kwargs):
+    return asyncio.run(json_output.complete_structured(
+        PromptEvaluationOutput, operation="prompt_evaluation", model="gpt-test",
+        messages=[{"role": "user", "content": "grade"}], max_tokens=300, **kwargs
+    ))
+
+
+def test_one_repair_call_fixes_a_broken_response(monkeypatch):
+    calls = fake_completions(monkeypatch, '{"clarity": 80, "feedback": "cut', json.dumps(GRADE))
+    repaired_before = json_output.parse_stats.repaired
+
+    assert complete() == PromptEvaluationOutput(**GRADE)
+    assert [call["operation"] for call in calls] == ["prompt_evaluation", "prompt_evaluation:repair"]
+    repair = calls[1]
+    assert repair["model"] == "gpt-test" and repair["max_tokens"] == 300 and repair["temperature"] == 0
+    # Only the broken output and the schema are sent back, not the original conversation
+    assert '"feedback": "cut' in repair["messages"][1]["content"]
+    assert "grade" not in [message["content"] for message in repair["messages"]]
+    assert json_output.parse_stats.repaired == repaired_before + 1
+
+
+def test_a_failed_repair_raises(monkeypatch):
+    fake_completions(monkeypatch, "not json", "still not json")
+    failed_before = json_output.parse_stats.failed
+
+    with pytest.raises(OutputParseError):
+        complete()
+    assert json_output.parse_stats.failed == failed_before + 1
+
+
+def test_repair_can_be_disabled(monkeypatch):
+    calls = fake_completions(monkeypatch, "not json")
+    monkeypatch.setattr(json_output, "REPAIR_RETRY_ENABLED", False)
+
+    with pytest.raises(OutputParseError):
+        complete()
+    assert len(calls) == 1
+
+
+def test_a_valid_response_needs_no_repair(monkeypatch):
+    calls = fake_completions(monkeypatch, f"```json\n{json.dumps(GRADE)}\n```")
+    assert complete().relevance == 90
+    assert len(calls) == 1
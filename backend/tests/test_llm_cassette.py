@@ -0,0 +1,124 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from models.assessment import WritingCriteria, WritingEvaluationOutput
+from services import model_cascade, openai_client
+from services.llm_cassette import CassetteMissError, LLMCassette
+from services.model_cascade import GRADE_BOUNDARIES, cascade_structured
+
+
+def completion(content: str, model: str = "m") -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    })
+
+
+def chunk(content: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "m",
+        "choices": [{"index": 0, "delta": {"content": content}}]
+    })
+
+
+def request(text: str, **extra) -> dict:
+    return dict(model="m", messages=[{"role": "user", "content": text}], **extra)
+
+
+def test_replay_serves_recorded_completions_in_order(tmp_path):
+    path = str(tmp_path / "cassette.sqlite3")
+    answers = iter(["first", "second", "other"])
+
+    async def record():
+        recorder = LLMCassette("record", path, 0)
+        for kwargs in (request("a"), request("a"), request("b")):
+            content = next(answers)
+
+            async def create(content=content):
+                return completion(content)
+
+            await recorder.wrap(create, "op", kwargs)()
+        return recorder.recorded
+
+    async def replay():
+        player = LLMCassette("replay", path, 0)
+        replayed = [(await player.wrap(None, "op", kwargs)()).choices[0].message.content
+                    for kwargs in (request("b"), request("a"), request("a"), request("a"))]
+        with pytest.raises(CassetteMissError):
+            await player.wrap(None, "op", request("never recorded"))()
+        return replayed, player
+
+    assert asyncio.run(record()) == 3
+    replayed, player = asyncio.run(replay())
+    # Identical requests get their answers in recorded order, cycling when a replay makes more of them
+    assert replayed == ["other", "first", "second", "first"]
+    assert (player.replayed, player.misses) == (4, 1)
+
+
+def test_replay_serves_recorded_streams_chunk_by_chunk(tmp_path):
+    path = str(tmp_path / "cassette.sqlite3")
+    kwargs = request("a", stream=True)
+
+    async def create():
+        async def stream():
+            for text in ("Hel", "lo"):
+                yield chunk(text)
+        return stream()
+
+    async def consume(cassette: LLMCassette, create) -> str:
+        stream = await cassette.wrap(create, "op", kwargs)()
+        return "".join([item.choices[0].delta.content async for item in stream])
+
+    assert asyncio.run(consume(LLMCassette("record", path, 0), create)) == "Hello"
+    assert asyncio.run(consume(LLMCassette("replay", path, 0), None)) == "Hello"
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """A cheap stage ahead of the writing model, auditing every confident result when no cassette is active"""
+    monkeypatch.setattr(model_cascade, "MODEL_CASCADE", "cheap")
+    monkeypatch.setattr(model_cascade, "CASCADE_AUDIT_RATE", 1.0)
+    calls = []
+    grade = json.dumps({"structure": 95, "professionalism": 95, "ai_utilization": 95, "completeness": 95,
+                        "feedback": "Clear", "suggestions": []})
+
+    async def create(**kwargs):
+        calls.append(kwargs["model"])
+        return completion(grade, kwargs["model"])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(openai_client, "get_openai_client", lambda: client)
+
+    def use(cassette: LLMCassette):
+        monkeypatch.setattr(openai_client, "llm_cassette", cassette)
+        monkeypatch.setattr(model_cascade, "llm_cassette", cassette)
+
+    async def grade_submission():
+        return await cascade_structured(WritingEvaluationOutput, WritingCriteria, GRADE_BOUNDARIES,
+                                        operation="writing_evaluation:email", model="final",
+                                        messages=[{"role": "user", "content": "grade this"}], max_tokens=100)
+
+    return SimpleNamespace(calls=calls, use=use, grade=grade_submission)
+
+
+def test_cascade_audits_are_off_while_recording_and_replaying(tmp_path, cascade):
+    cascade.use(LLMCassette("off", "unused", 0))
+    asyncio.run(cascade.grade())
+    assert cascade.calls == ["cheap", "final"]
+
+    path = str(tmp_path / "cassette.sqlite3")
+    cascade.calls.clear()
+    cascade.use(LLMCassette("record", path, 0))
+    recorded = asyncio.run(cascade.grade())
+    assert cascade.calls == ["cheap"]
+
+    cascade.calls.clear()
+    player = LLMCassette("replay", path, 0)
+    cascade.use(player)
+    for _ in range(5):
+        assert asyncio.run(cascade.grade()) == recorded
+    assert cascade.calls == []
+    assert (player.replayed, player.misses) == (5, 0)
@@ -0,0 +1,346 @@
+import asyncio
+import httpx
+import openai
+import pytest
+from services import llm_resilience as resilience
+from services.llm_resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, LLMResilience, CLOSED, OPEN, HALF_OPEN
+from services.llm_scheduler import LLMUnavailableError
+
+
+class Clock:
+    """Stands in for time.monotonic so cooldowns and windows pass instantly"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def breaker(**overrides) -> CircuitBreaker:
+    settings = dict(enabled=True, error_rate=0.5, min_calls=4, window=60, cooldown=30)
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def record(breaker: CircuitBreaker, *outcomes):
+    for failed in outcomes:
+        breaker.record(breaker.acquire(), failed)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    record(breaker, True, True, True, True)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_until_enough_calls(clock):
+    b = breaker()
+    record(b, True, True, True)
+    assert b.state == CLOSED
+    b.check()
+    assert b.acquire() is False
+
+
+def test_opens_when_the_error_rate_is_reached(clock):
+    b = breaker()
+    record(b, False, False, True)
+    assert b.state == CLOSED
+    record(b, True)
+    assert b.state == OPEN
+    assert [t["state"] for t in b.transitions] == [OPEN]
+
+
+def test_stays_closed_below_the_error_rate(clock):
+    b = breaker()
+    record(b, False, False, False, True, False, True)
+    assert b.state == CLOSED
+
+
+def test_outcomes_without_provider_signal_are_ignored(clock):
+    # Rate limits and bad requests are recorded as None
+    b = breaker()
+    record(b, None, None, None, None, True, True)
+    assert b.state == CLOSED
+    assert b.stats()["window_calls"] == 2
+
+
+def test_failures_outside_the_window_are_forgotten(clock):
+    b = breaker()
+    record(b, True, True, True)
+    clock.now += 61
+    record(b, True)
+    assert b.state == CLOSED
+    assert b.stats()["window_calls"] == 1
+
+
+def test_open_breaker_fails_fast_with_retry_after(clock):
+    b = breaker()
+    open_breaker(b)
+    clock.now += 10
+    with pytest.raises(LLMUnavailableError) as error:
+        b.check()
+    assert error.value.retry_after == pytest.approx(20)
+    with pytest.raises(LLMUnavailableError):
+        b.acquire()
+    assert b.rejected == 2
+
+
+def test_local_fallback_raises_circuit_open(clock, monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKER_FALLBACK", "local")
+    b = breaker()
+    open_breaker(b)
+    with pytest.raises(CircuitOpenError):
+        b.check()
+
+
+def test_one_probe_after_the_cooldown_closes_the_breaker(clock):
+    b = breaker()
+    open_breaker(b)
+    clock.now += 30
+    b.check()  # the cooldown is over, so callers may queue for the probe
+    assert b.acquire() is True
+    assert b.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(LLMUnavailableError):
+        b.acquire()
+    b.record(True, False)
+    assert b.state == CLOSED
+    assert b.stats()["window_calls"] == 0
+    assert [t["state"] for t in b.transitions] == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probe_reopens_for_another_cooldown(clock):
+    b = breaker()
+    open_breaker(b)
+    clock.now += 30
+    assert b.acquire() is True
+    b.record(True, True)
+    assert b.state == OPEN
+    clock.now += 29
+    with pytest.raises(LLMUnavailableError):
+        b.check()
+    clock.now += 1
+    assert b.acquire() is True
+
+
+def test_probe_without_provider_signal_allows_another_probe(clock):
+    b = breaker()
+    open_breaker(b)
+    clock.now += 30
+    assert b.acquire() is True
+    b.record(True, None)
+    assert b.state == HALF_OPEN
+    assert b.acquire() is True
+
+
+def test_disabled_breaker_never_rejects(clock):
+    b = breaker(enabled=False)
+    record(b, True, True, True, True, True)
+    assert b.state == CLOSED
+    b.check()
+
+
+def connection_error() -> openai.APIConnectionError:
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+def test_call_records_provider_failures(clock):
+    layer = LLMResilience()
+    layer.breaker = breaker()
+
+    async def failing():
+        raise connection_error()
+
+    async def bad_request():
+        raise ValueError("not a provider failure")
+
+    async def run():
+        for create in (bad_request, failing, failing, failing, failing):
+            with pytest.raises((openai.APIConnectionError, ValueError)):
+                await layer.call(create, "op", "m", 10, hedge=False)
+
+    asyncio.run(run())
+    assert layer.breaker.state == OPEN
+
+
+def test_hedge_delay_follows_the_recent_percentile(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MIN_SAMPLES", 10)
+    monkeypatch.setattr(resilience, "HEDGE_PERCENTILE", 90)
+    monkeypatch.setattr(resilience, "HEDGE_MIN_DELAY", 0.5)
+    monkeypatch.setattr(resilience, "HEDGE_MAX_DELAY", 5)
+    tracker = LatencyTracker(window=10)
+    key = ("op", "m")
+    assert tracker.hedge_delay(key) == 5  # too few samples yet
+    for seconds in range(1, 11):
+        tracker.record(key, seconds / 10)
+    assert tracker.hedge_delay(key) == 1.0
+    for _ in range(10):
+        tracker.record(key, 0.01)
+    assert tracker.hedge_delay(key) == 0.5
+    for _ in range(20):
+        tracker.record(key, 60)
+    assert tracker.hedge_delay(key) == 5
+
+
+@pytest.fixture
+def fast_hedging(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MAX_DELAY", 0.05)
+    monkeypatch.setattr(resilience, "HEDGE_MAX_RATE", 1.0)
+    monkeypatch.setattr(resilience, "LLM_ATTEMPT_TIMEOUT", 2.0)
+
+    refunds = []
+
+    async def try_acquire(tokens: int) -> bool:
+        return True
+
+    async def refund(tokens: int):
+        refunds.append(tokens)
+
+    monkeypatch.setattr(resilience.llm_scheduler, "try_acquire", try_acquire)
+    monkeypatch.setattr(resilience.llm_scheduler, "refund", refund)
+    return refunds
+
+
+def scripted(*delays: float):
+    """A create callable whose successive attempts answer after the given delays"""
+    remaining = list(delays)
+    started = []
+
+    async def create():
+        attempt = len(started)
+        started.append(attempt)
+        await asyncio.sleep(remaining.pop(0))
+        return f"attempt {attempt}"
+
+    return create, started
+
+
+def test_slow_call_is_hedged_and_the_hedge_wins(fast_hedging):
+    layer = LLMResilience()
+    create, started = scripted(1.0, 0.01)
+    assert asyncio.run(layer.call(create, "op", "m", 10)) == "attempt 1"
+    assert started == [0, 1]
+    assert (layer.hedged, layer.hedge_wins) == (1, 1)
+    # The hedge's budget goes back; the caller settles the winner's usage against the first estimate
+    assert fast_hedging == [10]
+
+
+def test_fast_call_is_not_hedged(fast_hedging):
+    layer = LLMResilience()
+    create, started = scripted(0.001)
+    assert asyncio.run(layer.call(create, "op", "m", 10)) == "attempt 0"
+    assert started == [0]
+    assert layer.hedged == 0
+    assert fast_hedging == []
+
+
+def test_primary_can_still_win_after_hedging(fast_hedging):
+    layer = LLMResilience()
+    create, _ = scripted(0.1, 1.0)
+    assert asyncio.run(layer.call(create, "op", "m", 10)) == "attempt 0"
+    assert (layer.hedged, layer.hedge_wins) == (1, 0)
+    assert fast_hedging == [10]
+
+
+def test_hedges_stay_under_the_rate_cap(fast_hedging, monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MAX_RATE", 0.0)
+    layer = LLMResilience()
+    create, started = scripted(0.1)
+    assert asyncio.run(layer.call(create, "op", "m", 10)) == "attempt 0"
+    assert started == [0]
+    assert layer.skipped == 1
+
+
+def test_attempt_timeout_is_a_retryable_connection_error(fast_hedging, monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_ATTEMPT_TIMEOUT", 0.05)
+    layer = LLMResilience()
+    create, _ = scripted(1.0)
+    with pytest.raises(openai.APITimeoutError):
+        asyncio.run(layer.call(create, "op", "m", 10, hedge=False))
+    assert layer.timeouts == 1
+
+
+def test_open_breaker_gives_a_provisional_local_result():
+    from models.assessment import AssessmentType, WritingEvaluationResponse
+    from services.prescreen import circuit_fallback
+
+    class Service:
+        @circuit_fallback(AssessmentType.WRITING_AUTOMATION)
+        async def evaluate(self, request):
+            raise CircuitOpenError("AI service circuit breaker is open")
+
+    result = asyncio.run(Service().evaluate(None))
+    assert isinstance(result, WritingEvaluationResponse)
+    assert (result.score, result.isGoodWork, result.provisional) == (0, False, True)
+    assert "temporarily unavailable" in result.feedback
+
+
+def provisional_result(assessment_type):
+    from services.prescreen import build_response
+    return build_response(assessment_type, "unavailable", 0, provisional=True)
+
+
+def test_provisional_results_stay_out_of_the_score_histogram():
+    from models.assessment import AssessmentType
+    from services.metrics import evaluation_scores, evaluations, observed_evaluation
+
+    class Service:
+        @observed_evaluation(AssessmentType.DATA_ANALYSIS)
+        async def evaluate(self, request):
+            return provisional_result(AssessmentType.DATA_ANALYSIS)
+
+    before = evaluations._values.get(("data_analysis", "provisional"), 0)
+    scores = evaluation_scores._values.get(("data_analysis",), [None, 0.0, 0])[2]
+    asyncio.run(Service().evaluate(None))
+    assert evaluations._values[("data_analysis", "provisional")] == before + 1
+    assert evaluation_scores._values.get(("data_analysis",), [None, 0.0, 0])[2] == scores
+
+
+def test_provisional_step_leaves_the_full_assessment_without_an_overall_score(monkeypatch):
+    from models.assessment import AssessmentType, FullAssessmentRequest
+    from services import full_assessment
+    from services.prescreen import build_response
+
+    def get_evaluator(assessment_type):
+        async def evaluate(request):
+            if assessment_type == AssessmentType.DATA_ANALYSIS:
+                return provisional_result(assessment_type)
+            return build_response(assessment_type, "too_short", 80)
+        return None, evaluate
+
+    monkeypatch.setattr(full_assessment, "get_evaluator", get_evaluator)
+    request = FullAssessmentRequest.model_construct(**{field: None for field in full_assessment.STEPS})
+    response = asyncio.run(full_assessment.evaluate_all(request))
+    assert (response.overall_score, response.level) == (None, None)
+    assert list(response.errors) == ["data_analysis"]
+    assert response.data_analysis.provisional
+
+
+def test_job_with_a_provisional_result_is_retried(monkeypatch):
+    from models.assessment import AssessmentType, EvaluationJob, JobStatus, WritingRequest
+    from services import job_queue
+
+    def get_evaluator(assessment_type):
+        async def evaluate(request):
+            return provisional_result(assessment_type)
+        return WritingRequest, evaluate
+
+    async def run() -> EvaluationJob:
+        store = job_queue.InMemoryJobStore()
+        runner = job_queue.JobRunner(store, workers=1)
+        job = await runner.submit(AssessmentType.WRITING_AUTOMATION,
+                                  {"task_type": "email", "content": "x", "requirements": []})
+        await runner.run(*await store.claim())
+        assert runner.retried == 1
+        return await store.get(job.id)
+
+    monkeypatch.setattr(job_queue, "get_evaluator", get_evaluator)
+    job = asyncio.run(run())
+    assert (job.status, job.attempts, job.result) == (JobStatus.QUEUED, 1, None)
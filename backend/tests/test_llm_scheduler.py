@@ -0,0 +1,241 @@
+import asyncio
+import time
+import httpx
+import openai
+import pytest
+from services import llm_scheduler as scheduler_module
+from services.llm_scheduler import LLMScheduler, LLMUnavailableError, SharedRateBudget, TokenBucket, BATCH, INTERACTIVE, llm_priority
+
+
+def test_bucket_starts_full_and_refills_continuously():
+    bucket = TokenBucket(600)  # 10 per second
+    assert bucket.delay(600, bucket.updated) == 0
+    bucket.take(600)
+    assert bucket.delay(5, bucket.updated) == pytest.approx(0.5)
+    assert bucket.delay(5, bucket.updated + 0.5) == pytest.approx(0)
+    assert bucket.level == pytest.approx(5)
+
+
+def test_bucket_refill_stops_at_one_minute_of_burst():
+    bucket = TokenBucket(600)
+    bucket.take(100)
+    bucket.delay(0, bucket.updated + 3600)
+    assert bucket.level == 600
+
+
+def test_oversized_requests_wait_for_a_full_bucket_not_forever():
+    bucket = TokenBucket(600)
+    bucket.take(600)
+    assert bucket.delay(10_000, bucket.updated) == pytest.approx(60)
+
+
+def test_refund_is_capped_at_capacity():
+    bucket = TokenBucket(600)
+    bucket.take(100)
+    bucket.refund(500)
+    assert bucket.level == 600
+
+
+def test_zero_limit_is_unlimited():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 9)
+    assert bucket.delay(10 ** 9, time.monotonic()) == 0
+
+
+def test_acquire_waits_for_the_token_budget():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=600)
+        await scheduler.acquire(600, INTERACTIVE)
+        started = time.monotonic()
+        await scheduler.acquire(3, INTERACTIVE)
+        return time.monotonic() - started, scheduler
+
+    waited, scheduler = asyncio.run(run())
+    assert 0.2 <= waited < 1.0
+    assert scheduler.admitted == 2
+
+
+def test_interactive_calls_are_admitted_before_queued_batch_calls():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=600)
+        await scheduler.acquire(600, INTERACTIVE)
+        order = []
+
+        async def call(name: str, priority: int):
+            await scheduler.acquire(2, priority)
+            order.append(name)
+
+        batch = [asyncio.create_task(call(f"batch {i}", BATCH)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(call("interactive", INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "batch 0", "batch 1"]
+
+
+def test_try_acquire_never_jumps_the_queue():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=600)
+        assert await scheduler.try_acquire(500)
+        assert not await scheduler.try_acquire(500)  # would have to wait
+        waiting = asyncio.create_task(scheduler.acquire(500, BATCH))
+        await asyncio.sleep(0.01)
+        assert not await scheduler.try_acquire(1)  # budget left, but someone is waiting
+        waiting.cancel()
+
+    asyncio.run(run())
+
+
+def rate_limit_error(code=None, retry_after_ms: str = "20") -> openai.RateLimitError:
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"),
+                              headers={"retry-after-ms": retry_after_ms})
+    return openai.RateLimitError("Rate limit reached", response=response, body={"code": code} if code else None)
+
+
+def failing_then(errors: list, result: str = "ok"):
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return call, calls
+
+
+def test_rate_limits_pause_the_queue_and_retry():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=0)
+        call, calls = failing_then([rate_limit_error(), rate_limit_error()])
+        started = time.monotonic()
+        result = await scheduler.run(call, 10)
+        return result, calls, time.monotonic() - started, scheduler
+
+    result, calls, waited, scheduler = asyncio.run(run())
+    assert result == "ok" and len(calls) == 3
+    assert waited >= 0.04  # each retry waited out the provider's Retry-After
+    assert (scheduler.rate_limited, scheduler.retries) == (2, 2)
+
+
+def test_exhausted_quota_is_not_retried():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=0)
+        call, calls = failing_then([rate_limit_error("insufficient_quota")])
+        with pytest.raises(openai.RateLimitError):
+            await scheduler.run(call, 10)
+        return calls
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "MAX_RETRIES", 2)
+    monkeypatch.setattr(scheduler_module, "BACKOFF_BASE", 0.001)
+    connection_error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=0)
+        call, calls = failing_then([connection_error] * 5)
+        with pytest.raises(LLMUnavailableError) as error:
+            await scheduler.run(call, 10)
+        return calls, error.value, scheduler
+
+    calls, error, scheduler = asyncio.run(run())
+    assert len(calls) == 3
+    assert error.retry_after >= 1
+    assert scheduler.failed == 1
+
+
+def test_priority_context_applies_to_run():
+    async def run():
+        scheduler = LLMScheduler(rpm_limit=0, tpm_limit=600)
+        await scheduler.acquire(600, INTERACTIVE)
+        order = []
+
+        async def evaluate(name: str):
+            call, _ = failing_then([], name)
+            order.append(await scheduler.run(call, 2))
+
+        async def batch_evaluate():
+            with llm_priority(BATCH):
+                await evaluate("batch")
+
+        batch = asyncio.create_task(batch_evaluate())
+        await asyncio.sleep(0.01)
+        await asyncio.gather(batch, evaluate("interactive"))
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "batch"]
+
+
+def test_shared_budget_is_drawn_by_every_process(tmp_path):
+    db_path = str(tmp_path / "budget.sqlite3")
+
+    async def run():
+        first = LLMScheduler(rpm_limit=0, tpm_limit=600, shared_db=db_path)
+        second = LLMScheduler(rpm_limit=0, tpm_limit=600, shared_db=db_path)
+        assert await first.try_acquire(600)
+        # The other worker sees the same, now empty, budget
+        assert not await second.try_acquire(100)
+        delay = await SharedRateBudget(db_path, 0, 600).reserve(100)
+        assert delay == pytest.approx(10, abs=0.5)
+        await first.refund(300)
+        assert await second.try_acquire(200)
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def streamed_completion(monkeypatch):
+    """create_chat_completion against a stub client that streams two content chunks and a usage chunk"""
+    from types import SimpleNamespace
+    from services import openai_client
+
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    async def create(**kwargs):
+        async def stream():
+            yield chunk("hello there")
+            yield chunk("general kenobi")
+            yield chunk(usage=SimpleNamespace(prompt_tokens=30, completion_tokens=20, total_tokens=50))
+        return stream()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    scheduler = LLMScheduler(rpm_limit=0, tpm_limit=600)
+    monkeypatch.setattr(openai_client, "get_openai_client", lambda: client)
+    monkeypatch.setattr(openai_client, "llm_scheduler", scheduler)
+    kwargs = dict(model="m", max_tokens=200, messages=[{"role": "user", "content": "say hello"}])
+    return scheduler, kwargs
+
+
+def test_streamed_completion_refunds_the_unused_estimate(streamed_completion):
+    from services.openai_client import create_chat_completion
+    scheduler, kwargs = streamed_completion
+
+    async def run():
+        stream = await create_chat_completion("op", stream=True, **kwargs)
+        async for _ in stream:
+            pass
+
+    asyncio.run(run())
+    assert scheduler.tokens.level == pytest.approx(600 - 50, abs=1)
+
+
+def test_aborted_stream_refunds_the_completion_budget_not_yet_spent(streamed_completion):
+    from services.openai_client import create_chat_completion
+    from services.prompt_templates import count_tokens
+    scheduler, kwargs = streamed_completion
+    prompt_tokens = scheduler_module.estimate_tokens(kwargs) - 200
+
+    async def run():
+        stream = await create_chat_completion("op", stream=True, **kwargs)
+        async for _ in stream:
+            break
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert scheduler.tokens.level == pytest.approx(600 - prompt_tokens - count_tokens("hello there"), abs=1)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from openai.types.chat import ChatCompletion
+from models.assessment import WritingCriteria, WritingEvaluationOutput
+from services import json_output, model_cascade, openai_client
+from services.model_cascade import (
+    CascadeStats, GRADE_BOUNDARIES, PASS_BOUNDARIES, boundary_distance, cascade_models, cascade_structured, grade_band
+)
+from services.token_usage import track_evaluation_usage
+
+
+def test_boundary_distance_and_grade_bands():
+    assert boundary_distance(73, GRADE_BOUNDARIES) == 2
+    assert boundary_distance(40, GRADE_BOUNDARIES) == 20
+    assert boundary_distance(50, PASS_BOUNDARIES) == 25
+    # 70-74 is one grade, 75 starts the next
+    assert grade_band(70, GRADE_BOUNDARIES) == grade_band(74, GRADE_BOUNDARIES) != grade_band(75, GRADE_BOUNDARIES)
+    assert grade_band(0, GRADE_BOUNDARIES) == 0 and grade_band(100, GRADE_BOUNDARIES) == len(GRADE_BOUNDARIES)
+
+
+def test_cascade_stages_end_with_the_services_model(monkeypatch):
+    monkeypatch.setattr(model_cascade, "MODEL_CASCADE", "tiny, final ,small")
+    assert cascade_models("writing_evaluation", "final") == ["tiny", "small", "final"]
+    monkeypatch.setenv("MODEL_CASCADE_WRITING_EVALUATION", "")
+    assert cascade_models("writing_evaluation", "final") == ["final"]
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """One cheap stage ahead of the service's model; `scores` sets the criterion score each model answers with"""
+    monkeypatch.setattr(model_cascade, "MODEL_CASCADE", "cheap")
+    monkeypatch.setattr(model_cascade, "CASCADE_AUDIT_RATE", 0.0)
+    monkeypatch.setattr(model_cascade, "CASCADE_MARGIN", 5)
+    monkeypatch.setattr(model_cascade, "cascade_stats", CascadeStats())
+    state = SimpleNamespace(calls=[], scores={"cheap": 40, "final": 40})
+
+    async def create(**kwargs):
+        model = kwargs["model"]
+        state.calls.append(model)
+        score = state.scores[model]
+        content = "not json" if score is None else json.dumps({
+            "structure": score, "professionalism": score, "ai_utilization": score, "completeness": score,
+            "feedback": f"graded by {model}", "suggestions": []
+        })
+        return ChatCompletion.model_validate({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+        })
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(openai_client, "get_openai_client", lambda: client)
+
+    async def grade():
+        with track_evaluation_usage() as usage:
+            output = await cascade_structured(WritingEvaluationOutput, WritingCriteria, GRADE_BOUNDARIES,
+                                              operation="writing_evaluation:email", model="final",
+                                              messages=[{"role": "user", "content": "grade this"}], max_tokens=100)
+        return output, usage.model
+
+    state.grade = lambda: asyncio.run(grade())
+    return state
+
+
+@pytest.mark.parametrize("score", [40, 85, 95, 100])
+def test_clear_cut_scores_keep_the_cheap_grade(cascade, score):
+    cascade.scores["cheap"] = score
+    output, model = cascade.grade()
+    assert cascade.calls == ["cheap"]
+    assert (output.feedback, model) == ("graded by cheap", "cheap")
+    stats = model_cascade.cascade_stats.service_stats("writing_evaluation")
+    assert (stats["stage_share"], stats["escalation_rate"]) == ({"cheap": 1.0}, 0.0)
+
+
+@pytest.mark.parametrize("score", [56, 60, 64, 73, 78, 87])
+def test_borderline_scores_escalate_to_the_services_model(cascade, score):
+    cascade.scores.update(cheap=score, final=score)
+    output, model = cascade.grade()
+    assert cascade.calls == ["cheap", "final"]
+    assert (output.feedback, model) == ("graded by final", "final")
+    stats = model_cascade.cascade_stats.service_stats("writing_evaluation")
+    assert (stats["escalation_rate"], stats["escalated_agreement"]) == (1.0, 1.0)
+
+
+def test_escalated_grades_that_cross_a_boundary_count_as_disagreements(cascade):
+    cascade.scores.update(cheap=73, final=76)
+    cascade.grade()
+    assert model_cascade.cascade_stats.service_stats("writing_evaluation")["escalated_agreement"] == 0.0
+
+
+def test_unusable_cheap_output_escalates(cascade, monkeypatch):
+    monkeypatch.setattr(json_output, "REPAIR_RETRY_ENABLED", False)
+    cascade.scores["cheap"] = None
+    output, model = cascade.grade()
+    assert cascade.calls == ["cheap", "final"] and model == "final"
+
+
+def test_audits_regrade_clear_cut_results_with_the_services_model(cascade, monkeypatch):
+    monkeypatch.setattr(model_cascade, "CASCADE_AUDIT_RATE", 1.0)
+    cascade.scores.update(cheap=40, final=42)
+    output, model = cascade.grade()
+    assert cascade.calls == ["cheap", "final"] and model == "final"
+    stats = model_cascade.cascade_stats.service_stats("writing_evaluation")
+    assert (stats["audited"], stats["escalation_rate"], stats["audit_agreement"]) == (1, 0.0, 1.0)
+
+
+def test_without_stages_only_the_services_model_is_called(cascade, monkeypatch):
+    monkeypatch.setattr(model_cascade, "MODEL_CASCADE", "")
+    output, model = cascade.grade()
+    assert cascade.calls == ["final"]
+    assert model is None  # the service's own model, recorded as such by the results store
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import random
+import signal
+from argparse import Namespace
+import pytest
+import rescore
+from models.assessment import BatchEvaluationResult
+from rescore import Checkpoint, read_rows
+from services import batch_evaluator
+
+
+def test_checkpoint_keeps_a_watermark_and_the_rows_done_out_of_order():
+    checkpoint = Checkpoint("unused", {})
+    for index in (1, 2, 5):
+        checkpoint.mark(index)
+    assert (checkpoint.next_index, checkpoint.done) == (0, {1, 2, 5})
+    checkpoint.mark(0)
+    assert (checkpoint.next_index, checkpoint.done) == (3, {5})
+    assert checkpoint.is_done(2) and checkpoint.is_done(5)
+    assert not checkpoint.is_done(3) and not checkpoint.is_done(6)
+
+
+def test_checkpoint_round_trip_and_source_check(tmp_path):
+    path = str(tmp_path / "out.jsonl.checkpoint")
+    checkpoint = Checkpoint(path, {"input": "a.jsonl", "size": 10})
+    for index in (0, 1, 3):
+        checkpoint.mark(index)
+    checkpoint.save(123)
+    assert not os.path.exists(f"{path}.tmp")
+
+    loaded = Checkpoint(path, {"input": "a.jsonl", "size": 10})
+    assert loaded.load()
+    assert (loaded.next_index, loaded.done, loaded.output_bytes) == (2, {3}, 123)
+    with pytest.raises(SystemExit, match="different input file"):
+        Checkpoint(path, {"input": "a.jsonl", "size": 11}).load()
+    assert not Checkpoint(str(tmp_path / "missing"), {}).load()
+
+
+def test_read_rows_reports_invalid_json_lines(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text('{"id": "a"}\n\nnot json\n{"id": "b"}\n')
+    rows = list(read_rows(str(path), "jsonl"))
+    assert rows[0] == {"id": "a"} and rows[2] == {"id": "b"}
+    assert rows[1]["_error"].startswith("invalid JSON")
+
+
+def test_read_rows_decodes_csv_list_columns(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text('id,content,requirements\na,"Dear team, hello","[""one"", ""two""]"\n')
+    assert list(read_rows(str(path), "csv")) == [{"id": "a", "content": "Dear team, hello", "requirements": ["one", "two"]}]
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    """Stub evaluator that answers after a short random delay and can interrupt the run after N rows"""
+    state = {"calls": [], "interrupt_after": None, "fail": set()}
+
+    async def evaluate_item(index, item):
+        state["calls"].append(index)
+        if index in state["fail"]:
+            raise RuntimeError("evaluator crashed")
+        await asyncio.sleep(random.uniform(0, 0.003))
+        if state["interrupt_after"] is not None and len(state["calls"]) == state["interrupt_after"]:
+            os.kill(os.getpid(), signal.SIGINT)
+        return BatchEvaluationResult(index=index, id=item.id, type=item.type, status="ok", result={"score": index})
+
+    monkeypatch.setattr(batch_evaluator, "evaluate_item", evaluate_item)
+    return state
+
+
+def rescore_args(tmp_path, **overrides) -> Namespace:
+    args = dict(input=str(tmp_path / "in.jsonl"), output=str(tmp_path / "out.jsonl"), format=None, type=None,
+                concurrency=8, checkpoint=None, checkpoint_every=10, progress_interval=0.01, restart=False,
+                no_count=False, record_results=False)
+    args.update(overrides)
+    return Namespace(**args)
+
+
+def write_input(tmp_path, rows: int):
+    with open(tmp_path / "in.jsonl", "w") as f:
+        for index in range(rows):
+            f.write(json.dumps({"type": "writing_automation", "id": f"row-{index}", "content": "x"}) + "\n")
+        f.write("not json\n")
+
+
+def output_indexes(tmp_path) -> list:
+    with open(tmp_path / "out.jsonl") as f:
+        return [json.loads(line)["index"] for line in f]
+
+
+def test_interrupted_run_resumes_without_losing_or_repeating_rows(tmp_path, evaluations):
+    write_input(tmp_path, 300)
+    args = rescore_args(tmp_path)
+
+    evaluations["interrupt_after"] = 120
+    assert asyncio.run(rescore.rescore(args)) == 130
+    assert os.path.exists(f"{args.output}.checkpoint")
+    interrupted = len(output_indexes(tmp_path))
+    assert 0 < interrupted < 301
+
+    evaluations["interrupt_after"] = None
+    evaluations["calls"].clear()
+    assert asyncio.run(rescore.rescore(args)) == 0
+    indexes = output_indexes(tmp_path)
+    assert sorted(indexes) == list(range(301))
+    # Rows written before the checkpoint are not evaluated again
+    assert len(evaluations["calls"]) <= 300 - interrupted + args.concurrency * 3
+    assert not os.path.exists(f"{args.output}.checkpoint")
+
+    with open(tmp_path / "out.jsonl") as f:
+        lines = [json.loads(line) for line in f]
+    errors = [line for line in lines if line["status"] == "error"]
+    assert [line["index"] for line in errors] == [300]
+    assert errors[0]["error"].startswith("invalid JSON")
+
+
+def test_restart_ignores_the_checkpoint(tmp_path, evaluations):
+    write_input(tmp_path, 50)
+    evaluations["interrupt_after"] = 20
+    asyncio.run(rescore.rescore(rescore_args(tmp_path)))
+
+    evaluations["interrupt_after"] = None
+    evaluations["calls"].clear()
+    assert asyncio.run(rescore.rescore(rescore_args(tmp_path, restart=True))) == 0
+    assert sorted(output_indexes(tmp_path)) == list(range(51))
+    assert len(evaluations["calls"]) == 50
+
+
+def test_numeric_ids_and_malformed_rows_are_written_as_results_not_lost(tmp_path, evaluations):
+    rows = [{"type": "writing_automation", "id": index, "content": "x"} for index in range(20)]
+    rows += [["not", "an", "object"], {"type": "unknown", "id": 20}, {"id": 21, "content": "x"}]
+    with open(tmp_path / "in.jsonl", "w") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+    evaluations["fail"] = {3}
+
+    # Workers used to die on these rows and leave the feeder blocked on a full queue
+    args = rescore_args(tmp_path, concurrency=2)
+    assert asyncio.run(asyncio.wait_for(rescore.rescore(args), 10)) == 0
+
+    with open(tmp_path / "out.jsonl") as f:
+        lines = {line["index"]: line for line in map(json.loads, f)}
+    assert sorted(lines) == list(range(23))
+    assert lines[0] == {"index": 0, "id": "0", "type": "writing_automation", "status": "ok", "result": {"score": 0}}
+    assert lines[3]["status"] == "error" and lines[3]["error"] == "evaluator crashed"
+    assert lines[20]["error"] == "row is not an object"
+    assert lines[21]["error"] == "unknown assessment type 'unknown'"
+    assert lines[22]["error"] == "unknown assessment type None"
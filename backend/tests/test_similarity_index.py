@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from models.assessment import AssessmentType, TaskManagementEvaluationResponse, TaskManagementRequest
+from services import evaluation_cache as cache_module
+from services.evaluation_cache import EvaluationCache, cached_evaluation, mark_uncacheable
+from services.prescreen import build_response
+from services.similarity_index import SimilarityIndex, vectorize
+
+pytest.importorskip("numpy")
+
+ANSWER = ("I would list every task on a shared board, rank them with an Eisenhower matrix and ask Copilot "
+          "to draft the weekly status email from the board each Friday afternoon.")
+REWORDED = ("I would list every task on a shared board, rank them using an Eisenhower matrix, and ask Copilot "
+            "to draft the weekly status email from the board every Friday afternoon.")
+# Different answers to the same scenario, the first sharing most of its opening with ANSWER
+UNRELATED = [
+    "I would list every task on a shared board, rank them by deadline and effort, and ask ChatGPT to summarise "
+    "blockers for the Monday stand-up meeting.",
+    "Start with the deadlines: anything due this week goes first, then I block focus time in Outlook and let "
+    "Copilot write the meeting agendas.",
+    "Use Power Automate to file invoice attachments from Outlook into SharePoint by supplier name.",
+]
+
+
+@pytest.fixture
+def index(monkeypatch) -> SimilarityIndex:
+    index = SimilarityIndex(True, 0.9, 100, 8, 1024, 5, 0.0, "task_management,prompt_engineering")
+    monkeypatch.setattr(cache_module, "similarity_index", index)
+    monkeypatch.setattr(cache_module, "evaluation_cache", EvaluationCache(max_entries=16))
+    return index
+
+
+class Service:
+    """Task management evaluator stand-in giving every evaluation a new score"""
+
+    prompt_version = "v1"
+
+    def __init__(self, model: str = "m", uncacheable: bool = False):
+        self.model = model
+        self.uncacheable = uncacheable
+        self.calls = 0
+
+    @cached_evaluation(AssessmentType.TASK_MANAGEMENT)
+    async def evaluate(self, request: TaskManagementRequest) -> TaskManagementEvaluationResponse:
+        self.calls += 1
+        if self.uncacheable:
+            mark_uncacheable()
+        return build_response(AssessmentType.TASK_MANAGEMENT, "too_short", 40 + self.calls)
+
+
+def request(text: str, scenario: str = "priority_matrix") -> TaskManagementRequest:
+    return TaskManagementRequest(scenario_type=scenario, user_response=text, scenario_data="")
+
+
+def grade(service: Service, *requests: TaskManagementRequest) -> list:
+    async def run():
+        return [(await service.evaluate(item)).score for item in requests]
+    return asyncio.run(run())
+
+
+def test_a_reworded_submission_reuses_the_earlier_grade(index):
+    service = Service()
+    assert grade(service, request(ANSWER), request(REWORDED)) == [41, 41]
+    assert service.calls == 1 and index.reused == 1
+
+
+def test_unrelated_submissions_never_share_a_grade(index):
+    service = Service()
+    scores = grade(service, request(ANSWER), *(request(text) for text in UNRELATED))
+    assert service.calls == len(scores) == len(set(scores))
+    assert index.reused == 0
+    vectors = [vectorize(text, index.dim) for text in (ANSWER, *UNRELATED)]
+    assert max(float(a @ b) for i, a in enumerate(vectors) for b in vectors[i + 1:]) < index.threshold
+
+
+def test_grades_are_only_reused_within_one_scenario_and_service(index):
+    service = Service()
+    grade(service, request(ANSWER))
+    # The same wording answering another scenario, or graded by a service using another model
+    assert grade(service, request(REWORDED, scenario="project_planning")) == [42]
+    other = Service(model="other")
+    assert grade(other, request(REWORDED)) == [41]
+    assert (service.calls, other.calls, index.reused) == (2, 1, 0)
+    # Each kept its own grade for its own scope
+    assert grade(service, request(REWORDED, scenario="project_planning"), request(REWORDED)) == [42, 41]
+    assert service.calls == 2
+
+
+def test_grades_kept_out_of_the_cache_are_never_reused(index):
+    service = Service(uncacheable=True)
+    assert grade(service, request(ANSWER), request(REWORDED)) == [41, 42]
+    assert index.stats()["vectors"] == 0
+
+
+def test_prompt_engineering_grades_are_never_reused(index):
+    assert index.applies_to(AssessmentType.TASK_MANAGEMENT.value)
+    assert not index.applies_to(AssessmentType.PROMPT_ENGINEERING.value)
+    assert not SimilarityIndex(False, 0.9, 100, 8, 1024, 5, 0.0, "task_management").applies_to("task_management")
@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import signal
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.job_queue import job_runner, JOB_STORE_DB, JOB_WORKERS
+from services.openai_client import close_openai_client
+from services.results_store import results_store
+from services.tracing import configure_logging
+
+
+async def run_workers(workers: int):
+    """Evaluate jobs from the shared job store until interrupted"""
+    job_runner.workers = workers
+    job_runner.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"Evaluating jobs from {JOB_STORE_DB} with {workers} workers")
+    await stop.wait()
+    await job_runner.stop()
+    await results_store.close()
+    await close_openai_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run evaluation job workers for JOB_WORKER_MODE=external")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="concurrent jobs in this process")
+    args = parser.parse_args()
+    if not JOB_STORE_DB:
+        raise SystemExit("Set JOB_STORE_DB to the SQLite job store shared with the API")
+    configure_logging()
+    asyncio.run(run_workers(args.workers))